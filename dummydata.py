@@ -21,8 +21,7 @@ with open(file_path, "w") as txtfile:
 
     for _ in range(datarows):
         data_group = generate_random_data()
-        for value in data_group:
-            txtfile.write(f"{value:.4f}\n")
-        txtfile.write("\n")  # Write an empty line after each group
+        # Format the whole group at once, with an empty line after it
+        txtfile.write("".join(f"{value:.4f}\n" for value in data_group) + "\n")
 
 print(f"Random data saved to {file_path}")
@@ -3,43 +3,31 @@ MeshProbe Viewer - Refactored Sample Structure
 This is a demonstration of how the code could be restructured for better maintainability
 """
 
+import sys
+from pathlib import Path
 import numpy as np
 import matplotlib.pyplot as plt
 from matplotlib.widgets import Slider, RadioButtons
-from scipy.interpolate import RegularGridInterpolator
 import tkinter as tk
 from tkinter import filedialog, messagebox
-from dataclasses import dataclass
 from typing import Optional, Tuple
 import logging
 
+# Reader and analysis modules are shared with the modelB application
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "modelB"))
+from background import LatestOnlyWorker
+from data_reader import ProbeDataReader
+from grid_eval import evaluate_grid
+from mesh_data import MeshData
+from spline_surface import SPLINE_DEGREES, SplineSurface
+from mesh_cache import MeshCache
+from surface_cache import SurfaceCache
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
-@dataclass
-class MeshData:
-    """Container for mesh probe data"""
-    data: np.ndarray
-    rows: int
-    cols: int
-    
-    @property
-    def shape(self) -> Tuple[int, int]:
-        return (self.rows, self.cols)
-    
-    @property
-    def statistics(self) -> dict:
-        return {
-            'min': np.min(self.data),
-            'max': np.max(self.data),
-            'mean': np.mean(self.data),
-            'std': np.std(self.data),
-            'range': np.max(self.data) - np.min(self.data)
-        }
-
-
 class DataLoader:
     """Handles loading of different data formats"""
     
@@ -47,12 +35,8 @@ class DataLoader:
     def load_custom_format(filepath: str) -> MeshData:
         """Load data in custom format (rows, cols in header)"""
         try:
-            with open(filepath, 'r') as file:
-                num_rows = int(file.readline().strip())
-                num_cols = int(file.readline().strip())
-            
-            data = np.genfromtxt(filepath, skip_header=2)
-            data = data.reshape(num_rows, num_cols)
+            data = ProbeDataReader.read_custom_format(filepath)
+            num_rows, num_cols = data.shape
             
             return MeshData(data=data, rows=num_rows, cols=num_cols)
         except Exception as e:
@@ -61,19 +45,39 @@ class DataLoader:
     
     @staticmethod
     def load_csv_format(filepath: str) -> MeshData:
-        """Load standard CSV format"""
-        # Implementation for CSV loading
-        pass
+        """Load standard CSV format, with metadata from its header row"""
+        try:
+            data, metadata = ProbeDataReader.read_csv_with_metadata(filepath)
+            return MeshData.from_array(data, metadata)
+        except Exception as e:
+            logger.error(f"Failed to load data: {e}")
+            raise
+    
+    @staticmethod
+    def load_file(filepath: str, nc_program: Optional[str] = None,
+                  use_cache: bool = True, dtype=None) -> MeshData:
+        """Load any supported format, reusing the parsed mesh cache when possible"""
+        try:
+            if use_cache:
+                return MeshCache().load(filepath, nc_program=nc_program, dtype=dtype).mesh
+            return ProbeDataReader.read_mesh(filepath, nc_program=nc_program, dtype=dtype)
+        except Exception as e:
+            logger.error(f"Failed to load data: {e}")
+            raise
 
 
 class MeshProbeViewer:
     """Main application class for viewing mesh probe data"""
     
-    def __init__(self):
+    def __init__(self, dtype=np.float64):
+        # np.float32 halves memory for dense surfaces; statistics stay float64
+        self.dtype = dtype
         self.mesh_data: Optional[MeshData] = None
         self.fig = None
         self.ax = None
-        self.interpolator = None
+        self.surface_cache = SurfaceCache()
+        self.spline: Optional[SplineSurface] = None
+        self.worker: Optional[LatestOnlyWorker] = None
         self.interp_method = 'nearest'
         self.mesh_density = 10
         self.z_scale = 1.0
@@ -86,7 +90,7 @@ class MeshProbeViewer:
                 return False
         
         try:
-            self.mesh_data = DataLoader.load_custom_format(filepath)
+            self.mesh_data = DataLoader.load_file(filepath, dtype=self.dtype)
             logger.info(f"Loaded data: {self.mesh_data.shape}")
             return True
         except Exception as e:
@@ -125,6 +129,12 @@ class MeshProbeViewer:
         # Add widgets
         self._add_widgets()
         
+        # Slider changes are computed on a worker thread, drawn from a timer
+        self.worker = LatestOnlyWorker()
+        self.worker_timer = self.fig.canvas.new_timer(interval=50)
+        self.worker_timer.add_callback(self._apply_plot)
+        self.worker_timer.start()
+        
         # Add title and labels
         self._setup_labels()
         
@@ -133,40 +143,56 @@ class MeshProbeViewer:
     
     def _setup_interpolator(self):
         """Setup the interpolation grid"""
-        x = np.linspace(0, self.mesh_data.cols, self.mesh_data.cols)
-        y = np.linspace(0, self.mesh_data.rows, self.mesh_data.rows)
+        self.grid_x = self.mesh_data.x_coords
+        self.grid_y = self.mesh_data.y_coords
+    
+    def _surface(self, method: str, density: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Interpolated (xt, yt, z) over the probed area, reused from the surface cache"""
+        x_extent, y_extent = self.mesh_data.extent
+        xt = np.linspace(0, x_extent, int(self.mesh_data.cols * density))
+        yt = np.linspace(0, y_extent, int(self.mesh_data.rows * density))
         
-        self.interpolator = RegularGridInterpolator(
-            (x, y),
-            self.mesh_data.data.T,
-            method=self.interp_method,
-            bounds_error=False
-        )
+        def evaluate():
+            if method in SPLINE_DEGREES:
+                return self._spline_surface(method).evaluate_grid(xt, yt)
+            return evaluate_grid(self.grid_x, self.grid_y, self.mesh_data.data,
+                                 xt, yt, method)
+        
+        key = (method, density, self.mesh_data.version)
+        return xt, yt, self.surface_cache.get_or_compute(key, evaluate)
+    
+    def _spline_surface(self, method: str) -> SplineSurface:
+        """Spline for method, fitted once per mesh version"""
+        spline = self.spline
+        if (spline is None or spline.method != method
+                or self._spline_version != self.mesh_data.version):
+            spline = SplineSurface(self.grid_x, self.grid_y, self.mesh_data.data, method)
+            self.spline, self._spline_version = spline, self.mesh_data.version
+        return spline
     
-    def _update_plot(self):
-        """Update the 3D surface plot"""
+    def _update_plot(self, surface: Optional[Tuple[np.ndarray, np.ndarray, np.ndarray]] = None):
+        """Update the 3D surface plot, computing the surface unless one is given"""
         self.ax.clear()
         
-        # Generate interpolated grid
-        xx, yy = np.meshgrid(
-            np.linspace(0, self.mesh_data.cols, int(self.mesh_data.cols * self.mesh_density)),
-            np.linspace(0, self.mesh_data.rows, int(self.mesh_data.rows * self.mesh_density)),
-            indexing='xy'
-        )
+        if surface is None:
+            surface = self._surface(self.interp_method, self.mesh_density)
+        xt, yt, z = surface
+        x_extent, y_extent = self.mesh_data.extent
         
-        # Plot surface
+        # Plot surface; the 1D axes broadcast against Z
         surf = self.ax.plot_surface(
-            xx, yy, 
-            self.interpolator((xx, yy)), 
+            xt[None, :], yt[:, None], 
+            z, 
             cmap='plasma',
             alpha=0.9
         )
         
         # Set limits and aspect
-        self.ax.set_xlim(0, self.mesh_data.cols)
-        self.ax.set_ylim(0, self.mesh_data.rows)
-        self.ax.set_zlim(self.mesh_data.statistics['min'], self.mesh_data.statistics['max'])
-        self.ax.set_box_aspect([self.mesh_data.cols, self.mesh_data.rows, self.z_scale])
+        self.ax.set_xlim(0, x_extent)
+        self.ax.set_ylim(0, y_extent)
+        stats = self.mesh_data.statistics
+        self.ax.set_zlim(stats['min'], stats['max'])
+        self.ax.set_box_aspect([x_extent, y_extent, self.z_scale])
         
         # Labels
         self.ax.set_xlabel('X')
@@ -179,7 +205,7 @@ class MeshProbeViewer:
         """Add interactive widgets"""
         # Z-scale slider
         scale_ax = plt.axes([0.1, 0.05, 0.8, 0.03])
-        scale_mean = (self.mesh_data.cols + self.mesh_data.rows) / 4
+        scale_mean = sum(self.mesh_data.extent) / 4
         self.scale_slider = Slider(
             scale_ax, 'Z Scale', 
             scale_mean / 2, scale_mean * 2, 
@@ -196,29 +222,44 @@ class MeshProbeViewer:
         self.density_slider.on_changed(self._on_density_change)
         
         # Interpolation method selector
-        method_ax = plt.axes([0.05, 0.15, 0.12, 0.05])
+        method_ax = plt.axes([0.05, 0.12, 0.12, 0.1])
         self.method_selector = RadioButtons(
             method_ax,
-            ('nearest', 'linear')
+            ('nearest', 'linear', 'cubic', 'quintic')
         )
         self.method_selector.on_clicked(self._on_method_change)
     
     def _on_scale_change(self, val):
         """Handle Z-scale slider change"""
         self.z_scale = val
-        self.ax.set_box_aspect([self.mesh_data.cols, self.mesh_data.rows, self.z_scale])
+        self.ax.set_box_aspect([*self.mesh_data.extent, self.z_scale])
         plt.draw()
     
     def _on_density_change(self, val):
         """Handle mesh density slider change"""
         self.mesh_density = int(val)
-        self._update_plot()
+        self._request_plot()
     
     def _on_method_change(self, label):
         """Handle interpolation method change"""
         self.interp_method = label
-        self._setup_interpolator()
-        self._update_plot()
+        self._request_plot()
+    
+    def _request_plot(self):
+        """Compute the surface for the current settings on the worker thread"""
+        # Replaces any request still waiting from an earlier slider position
+        self.worker.submit(self._surface, self.interp_method, self.mesh_density)
+    
+    def _apply_plot(self):
+        """Timer callback drawing the latest surface the worker finished"""
+        result = self.worker.poll()
+        if result is None:
+            return
+        surface, error = result
+        if error is not None:
+            logger.error(f"Failed to compute surface: {error}")
+            return
+        self._update_plot(surface)
     
     def _setup_labels(self):
         """Add title and information labels"""
@@ -231,11 +272,15 @@ class MeshProbeViewer:
         
         # Statistics
         stats = self.mesh_data.statistics
+        flatness = self.mesh_data.flatness()
+        x_extent, y_extent = self.mesh_data.extent
         info_text = f"""
 Data Shape: {self.mesh_data.cols} x {self.mesh_data.rows}
+Table Size: {x_extent:g} x {y_extent:g}
 Z Range: {stats['min']:.4f} to {stats['max']:.4f}
 Z Mean: {stats['mean']:.4f} ± {stats['std']:.4f}
 Total Range: {stats['range']:.4f}
+Flatness (plane removed): {flatness.peak_valley:.4f} P-V, {flatness.rms:.4f} RMS
         """
         self.fig.text(0.05, 0.5, info_text, fontsize=10, verticalalignment='top')
     
@@ -260,12 +305,17 @@ Total Range: {stats['range']:.4f}
     def export_statistics(self, filename: str):
         """Export data statistics to file"""
         stats = self.mesh_data.statistics
+        stats.update(self.mesh_data.flatness().as_dict())
         with open(filename, 'w') as f:
             f.write("Mesh Probe Data Statistics\n")
             f.write("=" * 30 + "\n")
             f.write(f"Data Shape: {self.mesh_data.cols} x {self.mesh_data.rows}\n")
+            meta = self.mesh_data.metadata
+            if meta is not None:
+                for key, value in meta.to_dict().items():
+                    f.write(f"{key.replace('_', ' ').capitalize()}: {value}\n")
             for key, value in stats.items():
-                f.write(f"{key.capitalize()}: {value:.6f}\n")
+                f.write(f"{key.replace('_', ' ').capitalize()}: {value:.6f}\n")
         logger.info(f"Statistics saved to {filename}")
 
 
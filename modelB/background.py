@@ -0,0 +1,88 @@
+"""
+Background computation for the MeshProbe viewers
+
+Slider callbacks fire for every intermediate value while the slider is
+dragged. LatestOnlyWorker computes on a single worker thread and keeps at
+most one request waiting: a new request replaces the waiting one, and a
+result that finishes after a newer request was made is dropped. The GUI
+polls for the result from a timer, since matplotlib must only be touched
+from the GUI thread.
+"""
+
+import threading
+from typing import Any, Callable, Optional, Tuple
+
+
+class LatestOnlyWorker:
+    """Runs submitted jobs on a thread, computing only the most recent one."""
+
+    def __init__(self, name: str = 'surface-worker'):
+        self.generation = 0
+        self._pending: Optional[Tuple[int, Callable, tuple]] = None
+        self._result: Optional[Tuple[int, Any, Optional[BaseException]]] = None
+        self._running = None
+        self._condition = threading.Condition()
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def submit(self, fn: Callable, *args) -> int:
+        """
+        Queue fn(*args), replacing any request not yet started.
+
+        Returns:
+            Generation number of the request; results of earlier
+            generations are discarded
+        """
+        with self._condition:
+            self.generation += 1
+            self._pending = (self.generation, fn, args)
+            self._condition.notify()
+            return self.generation
+
+    def cancel(self) -> None:
+        """Drop the waiting request and any result still to be collected."""
+        with self._condition:
+            self.generation += 1
+            self._pending = None
+            self._result = None
+
+    @property
+    def busy(self) -> bool:
+        """True while a request is waiting or being computed."""
+        with self._condition:
+            return self._pending is not None or self._running is not None
+
+    def poll(self) -> Optional[Tuple[Any, Optional[BaseException]]]:
+        """
+        Take the finished result of the latest request, if there is one.
+
+        Returns:
+            (result, None) on success, (None, exception) if the job raised,
+            or None when nothing new has finished
+        """
+        with self._condition:
+            if self._result is None:
+                return None
+            generation, value, error = self._result
+            self._result = None
+            if generation != self.generation:
+                return None
+            return value, error
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                while self._pending is None:
+                    self._condition.wait()
+                generation, fn, args = self._pending
+                self._pending = None
+                self._running = generation
+            try:
+                value, error = fn(*args), None
+            except Exception as e:
+                value, error = None, e
+            with self._condition:
+                self._running = None
+                # Stale once a newer request has been submitted
+                if generation == self.generation:
+                    self._result = (generation, value, error)
@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+"""
+Z-compensation tables for MeshProbe
+
+Turns a probed mesh into a dense table of Z corrections on a regular cell
+grid, resampled tile by tile, and writes it in formats a controller can take:
+the custom text layout that meshprobe.nc prints (row and column counts, then
+one value per line with a blank line after each row), or an NC subprogram
+assigning the values to consecutive macro variables. Text is formatted in
+blocks of rows by ProbeDataReader.write_rows, so large tables are written
+without building one large string.
+
+    python compensation.py scan.txt --cell 0.25 -o comp.txt
+    python compensation.py scan.txt --cell 1 --format macro --base 10000 -o O1020.nc
+"""
+
+import argparse
+from dataclasses import dataclass
+from typing import Optional, TextIO, Tuple
+
+import numpy as np
+
+from data_reader import ProbeDataReader
+from grid_eval import METHODS, evaluate_grid, evaluate_tiled
+from mesh_data import MeshData
+from spline_surface import SPLINE_DEGREES, SplineSurface
+
+# Decimal places of written corrections (inches)
+DEFAULT_DECIMALS = 4
+
+# First macro variable of the table and the program number of the subprogram
+DEFAULT_BASE_VARIABLE = 10000
+DEFAULT_PROGRAM_NUMBER = 1020
+
+# Macro variables the table may occupy. On Haas NGC only #10000-#10999 are
+# general purpose; the numbers around them are I/O and system variables.
+DEFAULT_VARIABLE_RANGE = (10000, 10999)
+
+# Heights the corrections are measured from
+DATUMS = ('probe', 'mean', 'min', 'max')
+
+
+@dataclass
+class CompensationTable:
+    """Z corrections on a regular grid starting at (x0, y0)."""
+    values: np.ndarray           # (rows, cols); row i at y0 + i * y_cell
+    x0: float
+    y0: float
+    x_cell: float
+    y_cell: float
+
+    @property
+    def shape(self):
+        return self.values.shape
+
+
+def _cells(first: float, last: float, cell: float) -> np.ndarray:
+    # Whole cells from first that stay within the probed span
+    count = int(np.floor((last - first) / cell + 1e-9)) + 1
+    return first + np.arange(count) * cell
+
+
+def build_table(mesh: MeshData, x_cell: float, y_cell: Optional[float] = None,
+                method: str = 'linear', form_order: Optional[int] = None,
+                datum: str = 'probe', negate: bool = False) -> CompensationTable:
+    """
+    Resample a mesh onto a compensation grid.
+
+    Args:
+        mesh: Probed mesh
+        x_cell: Cell size of the table along X
+        y_cell: Cell size along Y; x_cell when omitted
+        method: Interpolation method, as in the viewers
+        form_order: Degree of a best-fit form removed first, e.g. 1 when
+            the table tilt is trammed out separately; None keeps it
+        datum: Height the corrections are relative to: 'probe' (the probe
+            Z zero), or the 'mean', 'min' or 'max' of the surface
+        negate: Write the negated deviation, for controllers that expect
+            the offset to apply rather than the error measured
+
+    Raises:
+        ValueError: For an unknown method or datum, or a mesh with unmeasured
+            points, which would leave cells without a correction
+    """
+    if datum not in DATUMS:
+        raise ValueError(f"Unknown datum: {datum}")
+    if method not in METHODS and method not in SPLINE_DEGREES:
+        raise ValueError(f"Unknown interpolation method: {method}")
+    if mesh.mask is not None and mesh.mask.any():
+        raise ValueError("Mesh has unmeasured points; fill them before building "
+                         "a compensation table")
+    y_cell = y_cell or x_cell
+    x, y = mesh.x_coords, mesh.y_coords
+    z = (mesh.flatness(form_order).residual if form_order is not None
+         else np.asarray(mesh.data))
+
+    if method in SPLINE_DEGREES:
+        evaluate = SplineSurface(x, y, z, method).evaluate_grid
+    else:
+        def evaluate(xt, yt):
+            return evaluate_grid(x, y, z, xt, yt, method)
+    xt = _cells(x[0], x[-1], x_cell)
+    yt = _cells(y[0], y[-1], y_cell)
+    values = evaluate_tiled(evaluate, xt, yt)
+
+    if datum != 'probe':
+        values -= getattr(np, datum)(values)
+    if negate:
+        np.negative(values, out=values)
+    return CompensationTable(values, float(xt[0]), float(yt[0]), float(x_cell), float(y_cell))
+
+
+def write_text(table: CompensationTable, file: TextIO,
+               decimals: int = DEFAULT_DECIMALS) -> None:
+    """Write the table in the custom DPRNT layout read by read_custom_format."""
+    rows, cols = table.shape
+    file.write(f"{rows}\n{cols}\n\n")
+    ProbeDataReader.write_rows(file, table.values, f"%.{decimals}f\n" * cols + "\n")
+
+
+def check_variables(table: CompensationTable, base: int = DEFAULT_BASE_VARIABLE,
+                    variables: Tuple[int, int] = DEFAULT_VARIABLE_RANGE) -> None:
+    """
+    Check that the macro variables of a table stay within variables.
+
+    Raises:
+        ValueError: Giving the cell count, if #base to #base + cells - 1
+            reaches outside the range
+    """
+    rows, cols = table.shape
+    low, high = variables
+    last = base + rows * cols - 1
+    if base < low or last > high:
+        raise ValueError(
+            f"Table of {rows * cols} cells ({cols} x {rows}) needs #{base} to #{last}, "
+            f"outside the usable macro variables #{low} to #{high}; "
+            f"use a coarser cell size or another base")
+
+
+def write_macro(table: CompensationTable, file: TextIO,
+                base: int = DEFAULT_BASE_VARIABLE,
+                program_number: int = DEFAULT_PROGRAM_NUMBER,
+                decimals: int = DEFAULT_DECIMALS,
+                variables: Tuple[int, int] = DEFAULT_VARIABLE_RANGE) -> None:
+    """
+    Write the table as an NC subprogram assigning macro variables.
+
+    Cell (row, col) goes to #[base + row * cols + col], rows running along
+    Y. The grid origin, cell size and counts are given in the comments.
+
+    Args:
+        variables: First and last macro variable the table may occupy
+
+    Raises:
+        ValueError: If the table does not fit between base and the end of
+            variables; nothing is written then
+    """
+    check_variables(table, base, variables)
+    rows, cols = table.shape
+    file.write('\n'.join([
+        '%',
+        f'O{program_number:05d}',
+        f'(Z COMPENSATION TABLE {cols} X {rows} CELLS)',
+        f'(ORIGIN X{table.x0:g} Y{table.y0:g}, CELL {table.x_cell:g} X {table.y_cell:g})',
+        f'(#{base} TO #{base + rows * cols - 1}, #[{base} + ROW * {cols} + COL], ROW ALONG Y)',
+        '',
+    ]))
+    # Variable numbers interleaved with the values, one table row per line group
+    pairs = np.empty((rows, 2 * cols))
+    pairs[:, 0::2] = (base + np.arange(rows * cols)).reshape(rows, cols)
+    pairs[:, 1::2] = table.values
+    ProbeDataReader.write_rows(file, pairs, f"#%d = %.{decimals}f\n" * cols)
+    file.write('M99\n%\n')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Export a Z-compensation table from a probe scan')
+    parser.add_argument('datafile', help='Probe data file')
+    parser.add_argument('--nc', metavar='PROGRAM',
+                        help='meshprobe.nc program supplying table and cell size')
+    parser.add_argument('--cell', type=float, required=True, help='Table cell size along X')
+    parser.add_argument('--y-cell', type=float, help='Table cell size along Y; --cell if omitted')
+    parser.add_argument('--method', default='linear',
+                        choices=list(METHODS) + list(SPLINE_DEGREES),
+                        help='Interpolation method')
+    parser.add_argument('--form-order', type=int,
+                        help='Remove a best-fit form of this degree first (1 = plane)')
+    parser.add_argument('--datum', default='probe', choices=DATUMS,
+                        help='Height the corrections are relative to')
+    parser.add_argument('--negate', action='store_true',
+                        help='Write offsets to apply rather than measured deviations')
+    parser.add_argument('--format', default='text', choices=['text', 'macro'],
+                        help='Custom text layout or macro-variable subprogram')
+    parser.add_argument('--base', type=int, default=DEFAULT_BASE_VARIABLE,
+                        help='First macro variable of the table')
+    parser.add_argument('--variables', type=int, nargs=2, metavar=('FIRST', 'LAST'),
+                        default=DEFAULT_VARIABLE_RANGE,
+                        help='Macro variables the table may occupy (default %(default)s)')
+    parser.add_argument('--program', type=int, default=DEFAULT_PROGRAM_NUMBER,
+                        help='Program number of the macro subprogram')
+    parser.add_argument('--decimals', type=int, default=DEFAULT_DECIMALS,
+                        help='Decimal places of the corrections')
+    parser.add_argument('-o', '--output', required=True, help='File to write')
+    args = parser.parse_args()
+
+    mesh = ProbeDataReader.read_mesh(args.datafile, nc_program=args.nc)
+    table = build_table(mesh, args.cell, args.y_cell, args.method, args.form_order,
+                        args.datum, args.negate)
+    if args.format == 'macro':
+        try:
+            check_variables(table, args.base, tuple(args.variables))
+        except ValueError as e:
+            parser.error(str(e))
+    with open(args.output, 'w') as f:
+        if args.format == 'macro':
+            write_macro(table, f, args.base, args.program, args.decimals,
+                        tuple(args.variables))
+        else:
+            write_text(table, f, args.decimals)
+    rows, cols = table.shape
+    print(f"Wrote {rows} x {cols} compensation table to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -3,55 +3,369 @@ Data reader utilities for MeshProbe
 Handles various probe data formats
 """
 
+import csv
+import glob
+import json
+import os
+import re
+import struct
 import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field, replace
+from functools import partial
 from pathlib import Path
-from typing import Tuple, Optional
+from typing import Tuple, Optional, TextIO, List, Union
+
+from mesh_data import MeshData, ProbeMetadata
+
+
+# Characters read per readlines() call (a size hint, not a line count: whole
+# lines are returned once their total length reaches it); large enough to
+# amortise the conversion call, small enough to keep the text buffer modest.
+_READ_HINT = 1 << 20
+
+# Rows formatted per write when saving text formats.
+_WRITE_ROWS = 256
+
+# Macro variable assignment in an NC program, e.g. "#2 = 30 (X TABLE ...)"
+_MACRO_ASSIGNMENT = re.compile(r'^\s*#(\d+)\s*=\s*([-+]?(?:\d+\.?\d*|\.\d+))')
+
+# One point reported by a generated program: "X  1.2500 Y  3.0000 Z -0.0012"
+_POINT_LINE = re.compile(
+    r'^\s*X\s*([-+]?[\d.]+)\s+Y\s*([-+]?[\d.]+)\s+Z\s*([-+]?[\d.]+)\s*$')
+
+# Decimals to which point coordinates are matched onto grid positions
+_POINT_DECIMALS = 4
+
+# CSV header row fields written by fake_data.py, in order
+_CSV_HEADER_FIELDS = ('company', 'technician', 'machine_type', 'serial_number',
+                      'x_dim', 'y_dim', 'mode')
+
+# Bytes inspected by sniff_format before choosing a parser.
+_SNIFF_BYTES = 4096
+
+# Binary mesh archive: magic, little-endian uint32 version and JSON header
+# length, the JSON header padded so the array body starts on an aligned
+# offset, then the raw C-ordered array.
+MESH_ARCHIVE_MAGIC = b'MPRBMESH'
+MESH_ARCHIVE_VERSION = 1
+_ARCHIVE_PREFIX = struct.Struct('<8sII')
+_ARCHIVE_ALIGN = 64
+
+# Per-point flags set by ProbeDataReader.diagnose_data, combined bitwise
+POINT_NAN = 1
+POINT_INF = 2
+POINT_OUT_OF_RANGE = 4
+POINT_SPIKE = 8
+POINT_MISSING = 16
+_POINT_FLAGS = ((POINT_NAN, 'NaN'), (POINT_INF, 'infinite'),
+                (POINT_OUT_OF_RANGE, 'out of range'), (POINT_MISSING, 'missing'),
+                (POINT_SPIKE, 'spike'))
+
+# Points diagnosed per block; the spike test holds window**2 copies of each
+_DIAGNOSE_CELLS = 1 << 16
+
+# Median absolute deviation to standard deviation, for normal noise
+_MAD_SCALE = 1.4826
+
+# Compare-exchange pairs leaving the median of 9 values in position 4
+_MEDIAN9_NETWORK = ((1, 2), (4, 5), (7, 8), (0, 1), (3, 4), (6, 7), (1, 2), (4, 5), (7, 8),
+                    (0, 3), (5, 8), (4, 7), (3, 6), (1, 4), (2, 5), (4, 7), (4, 2), (6, 4),
+                    (4, 2))
+
+# Spike positions listed in ValidationReport.summary
+_SUMMARY_SPIKES = 10
+
+
+class ProbeFormatError(ValueError):
+    """Raised when a probe data file does not match its expected layout."""
+
+    def __init__(self, message: str, file_path: Optional[str] = None,
+                 line: Optional[int] = None):
+        self.file_path = file_path
+        self.line = line
+        location = str(file_path) if file_path is not None else ""
+        if line is not None:
+            location = f"{location}:{line}" if location else f"line {line}"
+        super().__init__(f"{location}: {message}" if location else message)
+
+
+class UnknownFormatError(ProbeFormatError):
+    """Raised when sniffing cannot match a file to any supported format."""
+
+
+@dataclass(frozen=True)
+class DetectedFormat:
+    """Result of sniffing the start of a probe data file."""
+    format: str                 # 'custom', 'csv', 'space', 'points' or 'binary'
+    delimiter: Optional[str]    # ',' for CSV, None for whitespace
+    header_rows: int            # non-numeric rows preceding the values
+
+
+@dataclass
+class FileLoadStatus:
+    """Outcome of loading one file in a bulk load."""
+    path: str
+    ok: bool
+    format: Optional[str] = None
+    shape: Optional[Tuple[int, ...]] = None
+    error: Optional[str] = None
+
+
+@dataclass
+class BulkLoadResult:
+    """Meshes and per-file status from ProbeDataReader.read_many."""
+    meshes: List[Union[np.ndarray, MeshData]] = field(default_factory=list)
+    paths: List[str] = field(default_factory=list)
+    stack: Optional[np.ndarray] = None     # (n, rows, cols) when all shapes match
+    status: List[FileLoadStatus] = field(default_factory=list)
+    
+    @property
+    def failed(self) -> List[FileLoadStatus]:
+        """Files that could not be read or failed validate_data."""
+        return [s for s in self.status if not s.ok]
+    
+    def status_table(self) -> str:
+        """Format the per-file status as a fixed-width text table."""
+        width = max([len(s.path) for s in self.status] + [4])
+        lines = [f"{'File':<{width}}  {'Format':<7}  {'Shape':<11}  Status"]
+        for s in self.status:
+            shape = 'x'.join(str(n) for n in s.shape) if s.shape else '-'
+            result = 'OK' if s.ok else f"FAILED: {s.error}"
+            lines.append(f"{s.path:<{width}}  {s.format or '-':<7}  {shape:<11}  {result}")
+        return "\n".join(lines)
+
+
+def _median9(values: List[np.ndarray]) -> np.ndarray:
+    """Elementwise median of nine equal-shaped arrays; NaN spreads to the result."""
+    values = [v.copy() for v in values]
+    low = np.empty_like(values[0])
+    for a, b in _MEDIAN9_NETWORK:
+        np.minimum(values[a], values[b], out=low)
+        np.maximum(values[a], values[b], out=values[b])
+        values[a], low = low, values[a]
+    return values[4]
+
+
+@dataclass
+class ValidationThresholds:
+    """Limits applied by ProbeDataReader.diagnose_data."""
+    max_abs: float = 1.0          # largest plausible |Z|, inches
+    spike_window: int = 3         # side of the neighbourhood (odd); 0 skips the spike test
+    spike_sigmas: float = 6.0     # robust z-score from the local median that marks a spike
+    spike_floor: float = 0.001    # smallest deviation counted, as quantised data can have MAD 0
+    min_rows: int = 2
+    min_cols: int = 2
+
+
+@dataclass
+class ValidationReport:
+    """Per-point diagnostics and overall verdict from diagnose_data."""
+    flags: np.ndarray                           # uint8 per point, POINT_* combined
+    counts: dict = field(default_factory=dict)  # flag name -> points with it
+    message: Optional[str] = None               # why the data is unusable, None if valid
+
+    @property
+    def is_valid(self) -> bool:
+        return self.message is None
+
+    def points(self, flag: int) -> np.ndarray:
+        """(row, col) of every point with the given flag."""
+        return np.argwhere(self.flags & flag)
+
+    def summary(self) -> str:
+        """Verdict and flag counts as text, listing the first spikes."""
+        lines = [f"Validation: {self.message or 'OK'}"]
+        lines += [f"  {name}: {self.counts[name]}" for _, name in _POINT_FLAGS
+                  if self.counts.get(name)]
+        spikes = self.points(POINT_SPIKE)[:_SUMMARY_SPIKES]
+        if len(spikes):
+            listed = ', '.join(f"({row}, {col})" for row, col in spikes)
+            more = self.counts['spike'] - len(spikes)
+            lines.append(f"  spikes at (row, col): {listed}" + (f" and {more} more" if more else ''))
+        return "\n".join(lines)
+
+
+def _load_for_bulk(path: str, with_metadata: bool = False
+                   ) -> Tuple[FileLoadStatus, Union[np.ndarray, MeshData, None]]:
+    """Read and validate one file; runs inside read_many worker processes."""
+    mesh = None
+    try:
+        detected = ProbeDataReader.sniff_format(path)
+        # Copy out of any memory map so the result pickles as plain data
+        if with_metadata:
+            mesh = ProbeDataReader.read_mesh(path, detected=detected)
+            mesh.data = np.array(mesh.data)
+            data = mesh.data
+        else:
+            data = np.array(ProbeDataReader.read_file(path, detected))
+    except (OSError, ValueError) as e:
+        return FileLoadStatus(path, False, error=str(e)), None
+        
+    mask = mesh.mask if mesh is not None else None
+    is_valid, message = ProbeDataReader.validate_data(data, mask=mask)
+    status = FileLoadStatus(path, is_valid, detected.format, data.shape, message)
+    if not is_valid:
+        return status, None
+    return status, mesh if with_metadata else data
+
+
+def _is_number(text: str) -> bool:
+    try:
+        float(text)
+    except ValueError:
+        return False
+    return True
+
+
+def _is_int(text: str) -> bool:
+    try:
+        int(text)
+    except ValueError:
+        return False
+    return True
 
 
 class ProbeDataReader:
     """Reader for various probe data formats."""
     
     @staticmethod
-    def read_file(file_path: str) -> np.ndarray:
+    def read_file(file_path: str, detected: Optional[DetectedFormat] = None) -> np.ndarray:
         """
         Read probe data from file, automatically detecting format.
         
         Args:
             file_path: Path to the data file
+            detected: Format record from sniff_format; sniffed when omitted
             
         Returns:
             numpy array of probe measurements
             
         Raises:
-            ValueError: If file format is not recognized
+            UnknownFormatError: If file format is not recognized
+            ProbeFormatError: If the file matches a format but is malformed
             FileNotFoundError: If file doesn't exist
         """
         path = Path(file_path)
         if not path.exists():
             raise FileNotFoundError(f"File not found: {file_path}")
             
-        # Try custom format first
-        try:
+        if detected is None:
+            detected = ProbeDataReader.sniff_format(file_path)
+            
+        if detected.format == 'binary':
+            return ProbeDataReader.read_binary_format(file_path)
+        if detected.format == 'custom':
             return ProbeDataReader.read_custom_format(file_path)
-        except:
-            pass
+        if detected.format == 'points':
+            table = ProbeDataReader.read_points_format(file_path)
+            return ProbeDataReader.points_to_grid(table, file_path)[0]
+        if detected.format == 'csv':
+            return ProbeDataReader.read_csv_format(file_path, skip_header=detected.header_rows)
+        return ProbeDataReader.read_space_delimited(file_path, skip_header=detected.header_rows)
+    
+    @staticmethod
+    def read_many(source: str, pattern: str = '*', workers: Optional[int] = None,
+                  chunksize: int = 8, with_metadata: bool = False,
+                  stack: bool = True) -> BulkLoadResult:
+        """
+        Load and validate many probe files using a process pool.
+        
+        Args:
+            source: Directory to scan, or a glob such as 'scans/**/*.txt'
+            pattern: Glob applied inside source when it is a directory
+            workers: Worker processes; defaults to the CPU count, 1 loads serially
+            chunksize: Files handed to a worker per task
+            with_metadata: Load each file with read_mesh, so the meshes are
+                MeshData carrying their metadata and grid rather than arrays
+            stack: Build the stacked array; large collections may skip it
+                to avoid holding every mesh twice
             
-        # Try CSV format
-        try:
-            return ProbeDataReader.read_csv_format(file_path)
-        except:
-            pass
+        Returns:
+            BulkLoadResult with the valid meshes in path order, a stacked
+            (n, rows, cols) array when their shapes all match, and a status
+            entry for every file including those that failed validate_data
+        """
+        if os.path.isdir(source):
+            paths = sorted(str(p) for p in Path(source).glob(pattern) if p.is_file())
+        else:
+            paths = sorted(p for p in glob.glob(source, recursive=True) if os.path.isfile(p))
             
-        # Try space-delimited format
-        try:
-            return ProbeDataReader.read_space_delimited(file_path)
-        except:
-            pass
+        load = partial(_load_for_bulk, with_metadata=with_metadata)
+        workers = workers or os.cpu_count() or 1
+        if workers == 1 or len(paths) < 2:
+            results = [load(p) for p in paths]
+        else:
+            with ProcessPoolExecutor(max_workers=min(workers, len(paths))) as pool:
+                results = list(pool.map(load, paths, chunksize=chunksize))
+                
+        result = BulkLoadResult()
+        for status, data in results:
+            result.status.append(status)
+            if data is not None:
+                result.meshes.append(data)
+                result.paths.append(status.path)
+                
+        if stack and result.meshes and len({m.shape for m in result.meshes}) == 1:
+            result.stack = np.stack([m.data if with_metadata else m for m in result.meshes])
+        return result
+    
+    @staticmethod
+    def sniff_format(file_path: str) -> DetectedFormat:
+        """
+        Detect the format of a probe data file from its first few KB.
+        
+        Args:
+            file_path: Path to the data file
+            
+        Returns:
+            DetectedFormat describing which parser to use
+            
+        Raises:
+            UnknownFormatError: If the content matches no supported format
+        """
+        with open(file_path, 'rb') as file:
+            head = file.read(_SNIFF_BYTES)
+            
+        if not head.strip():
+            raise UnknownFormatError("File is empty", file_path)
+        if head.startswith(MESH_ARCHIVE_MAGIC):
+            return DetectedFormat('binary', None, 0)
+        if b'\0' in head:
+            raise UnknownFormatError("File looks binary, not probe text data", file_path)
+            
+        lines = head.decode('utf-8', errors='replace').splitlines()
+        if len(head) == _SNIFF_BYTES and len(lines) > 1:
+            # The last line may be cut off mid-value
+            lines = lines[:-1]
+        lines = [line.strip() for line in lines]
+        
+        # Custom format: row and column counts on the first two lines,
+        # then one value per line
+        values = [line for line in lines[2:] if line]
+        if (len(lines) >= 2 and _is_int(lines[0]) and _is_int(lines[1])
+                and all(len(value.split()) == 1 for value in values[:8])):
+            return DetectedFormat('custom', None, 2)
             
-        raise ValueError(f"Unable to parse file format: {file_path}")
+        rows = [line for line in lines if line]
+        if rows and _POINT_LINE.match(rows[0]):
+            return DetectedFormat('points', None, 0)
+        delimiter = ',' if any(',' in row for row in rows[:8]) else None
+        fields = [row.split(delimiter) for row in rows]
+        
+        header_rows = 0
+        while header_rows < len(fields) and not all(_is_number(f) for f in fields[header_rows]):
+            header_rows += 1
+        if header_rows == len(fields) or header_rows > 1:
+            raise UnknownFormatError(f"No numeric data rows in the first {_SNIFF_BYTES} bytes", file_path)
+        if len(fields[header_rows]) < 2:
+            raise UnknownFormatError("Data rows must contain at least two values", file_path)
+            
+        return DetectedFormat('csv' if delimiter else 'space', delimiter, header_rows)
     
     @staticmethod
-    def read_custom_format(file_path: str) -> np.ndarray:
+    def read_custom_format(file_path: str, allow_missing: bool = False) -> np.ndarray:
         """
         Read custom format with dimensions in header.
         
@@ -59,100 +373,678 @@ class ProbeDataReader:
         <num_rows>
         <num_cols>
         <data values...>
+
+        The header and values are read in a single pass straight into a
+        preallocated array; blank lines between DPRNT blocks are ignored.
+
+        Args:
+            file_path: Path to the data file
+            allow_missing: Return NaN for points that are missing or garbled
+                instead of rejecting the file; see parse_custom_stream
+
+        Raises:
+            ProbeFormatError: With the offending line number if the header
+                is malformed, a value cannot be parsed or is not finite, or
+                the number of values does not match the header.
         """
         with open(file_path, 'r') as file:
-            num_rows = int(file.readline().strip())
-            num_cols = int(file.readline().strip())
+            return ProbeDataReader.parse_custom_stream(file, file_path, allow_missing)
+
+    @staticmethod
+    def parse_custom_stream(file: TextIO, source: Optional[str] = None,
+                            allow_missing: bool = False) -> np.ndarray:
+        """
+        Parse custom-format text from an open file object.
+        
+        Args:
+            file: Text stream positioned at the row count header line
+            source: Name used in error messages (usually the file path)
+            allow_missing: Keep a scan with dropped or garbled points. An
+                unreadable value becomes NaN in place. The blank line ending
+                each DPRNT row block locates a dropped line to its row; the
+                row's values are kept in order and the points after the last
+                of them become NaN. A block of several rows' values (lost separators) is
+                split into those rows, and rows missing at the end of the
+                file are NaN too. Files whose blocks cannot be matched to
+                rows are still rejected, rather than shifting values.
+            
+        Returns:
+            (num_rows, num_cols) numpy array
+        """
+        num_rows = ProbeDataReader._read_header_int(file, source, 1, "row count")
+        num_cols = ProbeDataReader._read_header_int(file, source, 2, "column count")
+        if allow_missing:
+            return ProbeDataReader._parse_partial_custom(file, source, num_rows, num_cols)
+        expected = num_rows * num_cols
+
+        data = np.empty(expected)
+        filled = 0
+        line_no = 2
+
+        while True:
+            lines = file.readlines(_READ_HINT)
+            if not lines:
+                break
+
+            values = [line.strip() for line in lines]
+            values = [value for value in values if value]
+            count = len(values)
+
+            if filled + count > expected:
+                extra_line = ProbeDataReader._locate_value_line(
+                    lines, line_no, expected - filled)
+                raise ProbeFormatError(
+                    f"Data size mismatch. Expected {expected} values "
+                    f"({num_rows}x{num_cols}), found more", source, extra_line)
+
+            try:
+                chunk = np.array(values, dtype=float)
+            except ValueError:
+                chunk = None
+
+            if chunk is None or not np.isfinite(chunk).all():
+                ProbeDataReader._raise_bad_value(lines, line_no, source)
+
+            data[filled:filled + count] = chunk
+            filled += count
+            line_no += len(lines)
+
+        if filled != expected:
+            raise ProbeFormatError(
+                f"Data size mismatch. Expected {expected} values "
+                f"({num_rows}x{num_cols}), got {filled}; "
+                f"{expected - filled} missing at end of file", source, line_no)
+
+        return data.reshape(num_rows, num_cols)
+
+    @staticmethod
+    def _parse_partial_custom(file: TextIO, source: Optional[str],
+                              num_rows: int, num_cols: int) -> np.ndarray:
+        """Values of a possibly incomplete custom-format scan, NaN where unknown."""
+        # Blocks of values between blank lines, with the line each starts on
+        blocks, block, first_line = [], [], None
+        for line_no, line in enumerate(file, start=3):
+            text = line.strip()
+            if text:
+                if not block:
+                    first_line = line_no
+                block.append(text)
+            elif block:
+                blocks.append((first_line, block))
+                block = []
+        if block:
+            blocks.append((first_line, block))
+            
+        expected = num_rows * num_cols
+        if len(blocks) == 1 and num_rows > 1 and len(blocks[0][1]) != expected:
+            # Without row separators a dropped value shifts every later one
+            raise ProbeFormatError(
+                f"Data size mismatch. Expected {expected} values ({num_rows}x{num_cols}), "
+                f"got {len(blocks[0][1])} with no blank lines between rows to locate "
+                f"the missing ones", source, blocks[0][0])
+            
+        # Rows each block covers: a block of k * num_cols values is k rows
+        # whose separators were lost; one of any other length has dropped
+        # values and is taken as the fewest rows that hold them
+        spans = [max(1, -(-len(block) // num_cols)) for _, block in blocks]
+        total = sum(spans)
+        if total > num_rows:
+            raise ProbeFormatError(f"Expected {num_rows} rows, found blocks of at least "
+                                   f"{total}", source)
+        if total < num_rows:
+            # Only a file cut short is unambiguous: rows missing at the end
+            for (line_no, block), span in zip(blocks, spans):
+                if span > 1 and len(block) != span * num_cols:
+                    raise ProbeFormatError(
+                        f"Block of {len(block)} values spans an unknown number of "
+                        f"rows; cannot place the rows after it", source, line_no)
+                    
+        data = np.full((num_rows, num_cols), np.nan)
+        flat = data.ravel()
+        row = 0
+        for (_, block), span in zip(blocks, spans):
+            # A short block keeps its values from the row start; only the
+            # tail after them, where the dropped ones belong, stays NaN
+            start = row * num_cols
+            flat[start:start + len(block)] = ProbeDataReader._parse_lenient(block)
+            row += span
+        return data
+    
+    @staticmethod
+    def _parse_lenient(values: list) -> np.ndarray:
+        """Convert value strings to floats, NaN for any that are unreadable."""
+        try:
+            result = np.array(values, dtype=float)
+        except ValueError:
+            result = np.array([float(v) if _is_number(v) else np.nan for v in values])
+        result[~np.isfinite(result)] = np.nan
+        return result
+    
+    @staticmethod
+    def _read_header_int(file: TextIO, source: Optional[str], line_no: int,
+                         name: str) -> int:
+        """Read one positive integer header line."""
+        text = file.readline().strip()
+        try:
+            value = int(text)
+        except ValueError:
+            raise ProbeFormatError(f"Invalid {name} {text!r}", source, line_no) from None
+        if value <= 0:
+            raise ProbeFormatError(f"Invalid {name} {value}", source, line_no)
+        return value
+
+    @staticmethod
+    def _locate_value_line(lines: list, first_line_no: int, index: int) -> int:
+        """Return the file line number of the index-th non-blank line in a chunk."""
+        seen = 0
+        for offset, line in enumerate(lines, start=1):
+            if line.strip():
+                if seen == index:
+                    return first_line_no + offset
+                seen += 1
+        return first_line_no + len(lines)
+
+    @staticmethod
+    def _raise_bad_value(lines: list, first_line_no: int, source: Optional[str]) -> None:
+        """Find and report the first unparsable or non-finite value in a chunk."""
+        for offset, line in enumerate(lines, start=1):
+            text = line.strip()
+            if not text:
+                continue
+            try:
+                value = float(text)
+            except ValueError:
+                raise ProbeFormatError(f"Invalid value {text!r}", source,
+                                       first_line_no + offset) from None
+            if not np.isfinite(value):
+                raise ProbeFormatError(f"Missing or non-finite value {text!r}", source,
+                                       first_line_no + offset)
+    
+    @staticmethod
+    def read_mesh(file_path: str, nc_program: Optional[str] = None,
+                  dtype=None, allow_missing: bool = False,
+                  detected: Optional[DetectedFormat] = None) -> MeshData:
+        """
+        Read probe data together with its machine and grid metadata.
+        
+        Args:
+            file_path: Path to the data file, in any format read_file understands
+            nc_program: Optional meshprobe.nc program supplying the table
+                size and cell size when the data file does not carry them
+            dtype: Floating-point type of the returned data, e.g. np.float32;
+                values are parsed in float64 either way
+            allow_missing: Accept custom-format scans with dropped or
+                garbled points, which are NaN and set in the mesh mask
+            detected: Format record from sniff_format; sniffed when omitted
             
-        data = np.genfromtxt(file_path, skip_header=2)
+        Returns:
+            MeshData with metadata set when any was found
+        """
+        if detected is None:
+            detected = ProbeDataReader.sniff_format(file_path)
+        metadata = None
         
-        # Remove any NaN values that might be from empty lines
-        data = data[~np.isnan(data)]
+        if detected.format == 'csv':
+            data, metadata = ProbeDataReader.read_csv_with_metadata(
+                file_path, skip_header=detected.header_rows)
+        elif detected.format == 'binary':
+            data = ProbeDataReader.read_binary_format(file_path)
+            header = ProbeDataReader.read_binary_header(file_path)
+            metadata = ProbeMetadata.from_dict(header['metadata'])
+            if header['spacing']:
+                metadata = metadata.merged(ProbeMetadata(
+                    x_cell=header['spacing'][0], y_cell=header['spacing'][1]))
+        elif detected.format == 'points':
+            table = ProbeDataReader.read_points_format(file_path)
+            data, x, y = ProbeDataReader.points_to_grid(table, file_path)
+            metadata = ProbeMetadata(x_dim=float(x[-1] - x[0]), y_dim=float(y[-1] - y[0]))
+        elif detected.format == 'custom':
+            data = ProbeDataReader.read_custom_format(file_path, allow_missing)
+        else:
+            data = ProbeDataReader.read_file(file_path, detected)
+            
+        if nc_program is not None:
+            program = ProbeDataReader.parse_nc_program(nc_program)
+            metadata = metadata.merged(program) if metadata else program
+            
+        mesh = MeshData.from_array(data, metadata)
+        if allow_missing and np.isnan(data).any():
+            mesh.mask = np.isnan(data)
+        return mesh.astype(dtype) if dtype is not None else mesh
+    
+    @staticmethod
+    def read_points_format(file_path: str) -> np.ndarray:
+        """
+        Read "X.. Y.. Z.." point lines reported by generated probe programs.
         
-        if len(data) != num_rows * num_cols:
-            raise ValueError(f"Data size mismatch. Expected {num_rows*num_cols}, got {len(data)}")
+        Returns:
+            (n, 3) array of X, Y, Z in the order the points were probed
             
-        return data.reshape(num_rows, num_cols)
+        Raises:
+            ProbeFormatError: With the line number of any other non-blank line
+        """
+        rows = []
+        with open(file_path, 'r') as f:
+            for line_no, line in enumerate(f, start=1):
+                if not line.strip():
+                    continue
+                match = _POINT_LINE.match(line)
+                if match is None:
+                    raise ProbeFormatError(f"Expected 'X.. Y.. Z..', got {line.strip()!r}",
+                                           file_path, line_no)
+                rows.append([float(v) for v in match.groups()])
+        return np.array(rows, dtype=float).reshape(-1, 3)
     
     @staticmethod
-    def read_csv_format(file_path: str) -> np.ndarray:
-        """Read standard CSV format with optional header."""
-        # Try with header first
-        data = np.genfromtxt(file_path, delimiter=',', skip_header=1)
+    def points_to_grid(table: np.ndarray, file_path: Optional[str] = None
+                       ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Place probed points back onto their raster, whatever order they were probed in.
         
-        # Check if it's valid numeric data
-        if np.any(np.isnan(data)):
-            # Try without header
-            data = np.genfromtxt(file_path, delimiter=',')
+        Args:
+            table: (n, 3) X, Y, Z rows, e.g. from read_points_format
+            file_path: Used in error messages
+            
+        Returns:
+            (data, x, y): (rows, cols) Z grid and its sorted X and Y positions
+            
+        Raises:
+            ProbeFormatError: If the points do not form one complete raster
+        """
+        keys = np.round(table[:, :2], _POINT_DECIMALS)
+        x, cols = np.unique(keys[:, 0], return_inverse=True)
+        y, rows = np.unique(keys[:, 1], return_inverse=True)
+        if len(x) < 2 or len(y) < 2 or len(x) * len(y) != len(table):
+            raise ProbeFormatError(
+                f"{len(table)} points do not form a complete {len(y)}x{len(x)} raster",
+                file_path)
+        data = np.full((len(y), len(x)), np.nan)
+        data[rows.ravel(), cols.ravel()] = table[:, 2]
+        if np.isnan(data).any():
+            raise ProbeFormatError("Raster has repeated and missing points", file_path)
+        return data, x, y
+    
+    @staticmethod
+    def parse_nc_program(file_path: str) -> ProbeMetadata:
+        """
+        Read table and grid geometry from meshprobe.nc macro assignments.
+        
+        Uses the first assignment of #2/#3 (table size) and #4/#5 (cell size).
+        """
+        values = {}
+        with open(file_path, 'r') as f:
+            for line in f:
+                match = _MACRO_ASSIGNMENT.match(line)
+                if match:
+                    values.setdefault(int(match.group(1)), float(match.group(2)))
+        return ProbeMetadata(x_dim=values.get(2), y_dim=values.get(3),
+                             x_cell=values.get(4), y_cell=values.get(5))
+    
+    @staticmethod
+    def read_csv_format(file_path: str, skip_header: Optional[int] = None) -> np.ndarray:
+        """
+        Read standard CSV format with optional header.
+        
+        Args:
+            file_path: Path to the data file
+            skip_header: Rows to skip before the values; sniffed when omitted
+        """
+        return ProbeDataReader.read_csv_with_metadata(file_path, skip_header)[0]
+    
+    @staticmethod
+    def read_csv_with_metadata(file_path: str, skip_header: Optional[int] = None
+                               ) -> Tuple[np.ndarray, Optional[ProbeMetadata]]:
+        """
+        Read CSV data and its metadata header row in one pass over the file.
+        
+        Returns:
+            (data, metadata); metadata is None when the file has no header row
+        """
+        if skip_header is None:
+            skip_header = ProbeDataReader.sniff_format(file_path).header_rows
+            
+        metadata = None
+        with open(file_path, 'r', newline=None) as f:
+            for _ in range(skip_header):
+                header = f.readline()
+                if metadata is None:
+                    metadata = ProbeDataReader._parse_csv_header(header)
+            data = ProbeDataReader._load_table(f, ',', 0, file_path)
             
         if data.ndim != 2:
-            raise ValueError("CSV data must be 2-dimensional")
+            raise ProbeFormatError("CSV data must be 2-dimensional", file_path)
             
-        return data
+        return data, metadata
+    
+    @staticmethod
+    def _parse_csv_header(line: str) -> ProbeMetadata:
+        """Map the company/technician/machine/serial/x/y/mode row onto ProbeMetadata."""
+        row = next(csv.reader([line]), [])
+        values = {}
+        for name, text in zip(_CSV_HEADER_FIELDS, (cell.strip() for cell in row)):
+            if not text:
+                continue
+            try:
+                if name in ('x_dim', 'y_dim'):
+                    values[name] = float(text)
+                elif name == 'mode':
+                    values[name] = int(text)
+                else:
+                    values[name] = text
+            except ValueError:
+                # Column titles rather than values; leave the field unset
+                pass
+        return ProbeMetadata(**values)
     
     @staticmethod
-    def read_space_delimited(file_path: str) -> np.ndarray:
+    def read_space_delimited(file_path: str, skip_header: int = 0) -> np.ndarray:
         """Read space-delimited format."""
-        data = np.loadtxt(file_path)
+        data = ProbeDataReader._load_table(file_path, None, skip_header, file_path)
         
         if data.ndim != 2:
-            raise ValueError("Data must be 2-dimensional")
+            raise ProbeFormatError("Data must be 2-dimensional", file_path)
             
         return data
     
     @staticmethod
-    def validate_data(data: np.ndarray) -> Tuple[bool, Optional[str]]:
+    def _load_table(source: Union[str, TextIO], delimiter: Optional[str], skip_header: int,
+                    file_path: str) -> np.ndarray:
+        """Load a delimited numeric table, reporting parse failures as ProbeFormatError."""
+        try:
+            return np.loadtxt(source, delimiter=delimiter, skiprows=skip_header, ndmin=2)
+        except ValueError as e:
+            raise ProbeFormatError(str(e), file_path) from None
+    
+    @staticmethod
+    def read_binary_format(file_path: str, mmap: bool = True) -> np.ndarray:
         """
-        Validate probe data for common issues.
+        Read a binary mesh archive written by save_data(format='binary').
         
+        Args:
+            file_path: Path to the archive
+            mmap: Map the array body read-only instead of copying it into memory
+            
         Returns:
-            (is_valid, error_message)
+            numpy array (a read-only np.memmap when mmap is True)
         """
-        if data is None:
-            return False, "Data is None"
-            
-        if data.size == 0:
-            return False, "Data is empty"
+        header, offset = ProbeDataReader._read_archive_header(file_path)
+        shape = tuple(header['shape'])
+        dtype = np.dtype(header['dtype'])
+        
+        if mmap:
+            return np.memmap(file_path, dtype=dtype, mode='r', offset=offset, shape=shape)
+        with open(file_path, 'rb') as f:
+            f.seek(offset)
+            return np.fromfile(f, dtype=dtype, count=int(np.prod(shape))).reshape(shape)
+    
+    @staticmethod
+    def read_binary_header(file_path: str) -> dict:
+        """
+        Read the header of a binary mesh archive without touching the array.
+        
+        Returns:
+            dict with 'shape', 'dtype', 'spacing' and 'metadata' entries
+        """
+        return ProbeDataReader._read_archive_header(file_path)[0]
+    
+    @staticmethod
+    def _read_archive_header(file_path: str) -> Tuple[dict, int]:
+        """Parse and check an archive header, returning it with the body offset."""
+        with open(file_path, 'rb') as f:
+            prefix = f.read(_ARCHIVE_PREFIX.size)
+            if len(prefix) != _ARCHIVE_PREFIX.size:
+                raise ProbeFormatError("Truncated mesh archive header", file_path)
+            magic, version, header_len = _ARCHIVE_PREFIX.unpack(prefix)
+            if magic != MESH_ARCHIVE_MAGIC:
+                raise ProbeFormatError("Not a mesh archive", file_path)
+            if version != MESH_ARCHIVE_VERSION:
+                raise ProbeFormatError(f"Unsupported mesh archive version {version}", file_path)
+            try:
+                header = json.loads(f.read(header_len).decode('utf-8'))
+            except ValueError as e:
+                raise ProbeFormatError(f"Corrupt mesh archive header: {e}", file_path) from None
             
-        if np.any(np.isnan(data)):
-            return False, "Data contains NaN values"
+        offset = _ARCHIVE_PREFIX.size + header_len
+        nbytes = int(np.prod(header['shape'])) * np.dtype(header['dtype']).itemsize
+        if Path(file_path).stat().st_size != offset + nbytes:
+            raise ProbeFormatError(
+                f"Mesh archive body size mismatch. Expected {nbytes} bytes", file_path)
+        return header, offset
+    
+    @staticmethod
+    def create_binary_archive(file_path: str, shape: Tuple[int, int],
+                              dtype=np.float64,
+                              spacing: Optional[Tuple[float, float]] = None,
+                              metadata: Optional[dict] = None) -> np.memmap:
+        """
+        Create a binary mesh archive and map its body for writing.
+        
+        The array can then be filled piece by piece, so archives larger than
+        memory can be written. Call flush() on the result when done.
+        
+        Returns:
+            Writable np.memmap of the archive body, initially zero
+        """
+        if len(shape) != 2:
+            raise ValueError("Mesh archives hold 2-dimensional data")
+        dtype = np.dtype(dtype)
+        header = ProbeDataReader._archive_header(shape, dtype, spacing, metadata)
+        with open(file_path, 'wb') as f:
+            f.write(header)
+            f.truncate(len(header) + int(np.prod(shape)) * dtype.itemsize)
+        return np.memmap(file_path, dtype=dtype, mode='r+', offset=len(header), shape=tuple(shape))
+    
+    @staticmethod
+    def _archive_header(shape: Tuple[int, int], dtype: np.dtype,
+                        spacing: Optional[Tuple[float, float]],
+                        metadata: Optional[dict]) -> bytes:
+        """Archive prefix and JSON header, padded so the body is aligned."""
+        header = {
+            'shape': [int(n) for n in shape],
+            'dtype': dtype.str,
+            'spacing': [float(v) for v in spacing] if spacing is not None else None,
+            'metadata': metadata or {},
+        }
+        text = json.dumps(header).encode('utf-8')
+        # Pad with spaces (valid JSON whitespace) so the body is aligned
+        body_offset = _ARCHIVE_PREFIX.size + len(text)
+        text += b' ' * (-body_offset % _ARCHIVE_ALIGN)
+        return _ARCHIVE_PREFIX.pack(MESH_ARCHIVE_MAGIC, MESH_ARCHIVE_VERSION, len(text)) + text
+    
+    @staticmethod
+    def _write_archive(data: np.ndarray, file_path: str,
+                       spacing: Optional[Tuple[float, float]],
+                       metadata: Optional[dict]) -> None:
+        """Write data as a binary mesh archive."""
+        data = np.ascontiguousarray(data)
+        if data.ndim != 2:
+            raise ValueError("Mesh archives hold 2-dimensional data")
             
-        if np.any(np.isinf(data)):
-            return False, "Data contains infinite values"
+        with open(file_path, 'wb') as f:
+            f.write(ProbeDataReader._archive_header(data.shape, data.dtype, spacing, metadata))
+            data.tofile(f)
+    
+    @staticmethod
+    def write_rows(file: TextIO, data: np.ndarray, row_format: str,
+                   chunk_rows: int = _WRITE_ROWS) -> None:
+        """
+        Write a 2D array as text, formatting blocks of rows per write call.
+        
+        Args:
+            file: Open text file
+            data: 2D array; may be a memory map larger than RAM
+            row_format: %-style format consuming one row's values
+            chunk_rows: Rows formatted and written at a time
+        """
+        if data.ndim != 2:
+            raise ValueError("Data must be 2-dimensional")
+        for start in range(0, data.shape[0], chunk_rows):
+            block = data[start:start + chunk_rows]
+            file.write((row_format * block.shape[0]) % tuple(block.ravel().tolist()))
+    
+    @staticmethod
+    def convert_file(src_path: str, dst_path: str, format: str = 'binary', **kwargs) -> None:
+        """
+        Convert a probe data file between formats.
+        
+        Args:
+            src_path: Input file in any format read_file understands
+            dst_path: Output file path
+            format: Output format accepted by save_data
+            **kwargs: Passed through to save_data (e.g. spacing, metadata)
+        """
+        detected = ProbeDataReader.sniff_format(src_path)
+        data = ProbeDataReader.read_file(src_path, detected)
+        if format == 'binary' and detected.format == 'binary':
+            header = ProbeDataReader.read_binary_header(src_path)
+            kwargs.setdefault('spacing', header['spacing'])
+            kwargs.setdefault('metadata', header['metadata'])
+        ProbeDataReader.save_data(data, dst_path, format=format, **kwargs)
+    
+    @staticmethod
+    def validate_data(data: np.ndarray, thresholds: Optional[ValidationThresholds] = None,
+                      mask: Optional[np.ndarray] = None) -> Tuple[bool, Optional[str]]:
+        """
+        Validate probe data for common issues.
+        
+        Spikes never decide validity, so the spike test is skipped here;
+        diagnose_data runs it when the per-point detail is wanted.
+        
+        Returns:
+            (is_valid, error_message); see diagnose_data for per-point detail
+        """
+        limits = replace(thresholds or ValidationThresholds(), spike_window=0)
+        report = ProbeDataReader.diagnose_data(data, limits, mask)
+        return report.is_valid, report.message
+    
+    @staticmethod
+    def diagnose_data(data: np.ndarray, thresholds: Optional[ValidationThresholds] = None,
+                      mask: Optional[np.ndarray] = None) -> ValidationReport:
+        """
+        Check every point of probe data in one blocked pass.
+        
+        Flags NaN, infinite and out-of-range values, and spikes such as
+        stylus bounce: points further from the median of their neighbourhood
+        than spike_sigmas robust standard deviations and than spike_floor.
+        The deviation scale is the median absolute deviation from the local
+        medians over the whole mesh; nine neighbours alone are too few to
+        estimate it, and flag ordinary noise. Spikes are reported but do
+        not make the data invalid, and neither do points known to be
+        missing (a partial scan), as long as some were measured.
+        
+        Args:
+            data: 2D probe measurement array
+            thresholds: Limits to apply; ValidationThresholds() when omitted
+            mask: True where a point is known to be missing, as in MeshData
             
-        # Check for reasonable Z values (assuming measurements in inches)
-        if np.abs(data).max() > 1.0:
-            return False, "Data contains unreasonably large values (>1 inch)"
+        Returns:
+            ValidationReport with a flag per point, counts per flag and the
+            first problem that makes the data unusable
+        """
+        limits = thresholds or ValidationThresholds()
+        if data is None:
+            return ValidationReport(np.zeros((0, 0), dtype=np.uint8), message="Data is None")
+        data = np.asarray(data)
+        flags = np.zeros(data.shape, dtype=np.uint8)
+        if data.size == 0:
+            return ValidationReport(flags, message="Data is empty")
+        if data.ndim != 2:
+            return ValidationReport(flags, message="Data must be 2-dimensional")
             
-        if data.shape[0] < 2 or data.shape[1] < 2:
-            return False, "Data grid too small (minimum 2x2)"
+        rows, cols = data.shape
+        half = limits.spike_window // 2
+        padded = None
+        # Reflection needs more points than the padding along each axis
+        if half and rows > half and cols > half:
+            padded = np.pad(data, half, mode='reflect')
+        counts = dict.fromkeys((name for _, name in _POINT_FLAGS), 0)
+        # Distance of each point from its local median, for the second pass
+        deviation = np.full(data.shape, np.nan) if padded is not None else None
+        
+        block = max(1, _DIAGNOSE_CELLS // cols)
+        for start in range(0, rows, block):
+            chunk = data[start:start + block]
+            magnitude = np.abs(chunk)
+            missing = (np.asarray(mask[start:start + block], dtype=bool) if mask is not None
+                       else np.zeros(chunk.shape, dtype=bool))
+            measured = ~missing
+            inf = (magnitude == np.inf) & measured
+            # In _POINT_FLAGS order
+            found = [np.isnan(chunk) & measured, inf,
+                     (magnitude > limits.max_abs) & ~inf & measured, missing]
+            if padded is not None:
+                size = 2 * half + 1
+                if size == 3:
+                    # Sorting network on shifted views: far faster than np.median
+                    views = [padded[start + i:start + i + len(chunk), j:j + cols]
+                             for i in range(3) for j in range(3)]
+                    median = _median9(views)
+                else:
+                    windows = sliding_window_view(
+                        padded[start:start + len(chunk) + 2 * half], (size, size))
+                    windows = windows.reshape(len(chunk), cols, size * size)
+                    median = np.median(windows, axis=-1)
+                # NaN neighbourhoods stay NaN, so no spikes next to gaps
+                local = np.abs(chunk - median)
+                local[missing | ~np.isfinite(chunk)] = np.nan
+                deviation[start:start + block] = local
+            out = flags[start:start + block]
+            for (flag, name), hits in zip(_POINT_FLAGS, found):
+                out |= hits * np.uint8(flag)
+                counts[name] += int(np.count_nonzero(hits))
+                
+        if deviation is not None:
+            known = deviation[np.isfinite(deviation)]
+            scale = limits.spike_sigmas * _MAD_SCALE * np.median(known) if known.size else 0.0
+            with np.errstate(invalid='ignore'):
+                spike = deviation > max(scale, limits.spike_floor)
+            flags |= spike * np.uint8(POINT_SPIKE)
+            counts['spike'] = int(np.count_nonzero(spike))
             
-        return True, None
+        message = None
+        if counts['NaN']:
+            message = "Data contains NaN values"
+        elif counts['infinite']:
+            message = "Data contains infinite values"
+        elif counts['out of range']:
+            message = f"Data contains unreasonably large values (>{limits.max_abs:g} inch)"
+        elif counts['missing'] == data.size:
+            message = "Data has no measured points"
+        elif rows < limits.min_rows or cols < limits.min_cols:
+            message = f"Data grid too small (minimum {limits.min_rows}x{limits.min_cols})"
+        return ValidationReport(flags, counts, message)
     
     @staticmethod
-    def save_data(data: np.ndarray, file_path: str, format: str = 'custom') -> None:
+    def save_data(data: np.ndarray, file_path: str, format: str = 'custom',
+                  spacing: Optional[Tuple[float, float]] = None,
+                  metadata: Optional[dict] = None) -> None:
         """
         Save probe data to file.
         
         Args:
             data: Probe measurement array
             file_path: Output file path
-            format: 'custom', 'csv', or 'space'
+            format: 'custom', 'csv', 'space' or 'binary'
+            spacing: (x, y) grid cell size stored in binary archives
+            metadata: JSON-serialisable dict stored in binary archives
         """
         if format == 'custom':
             with open(file_path, 'w') as f:
                 f.write(f"{data.shape[0]}\n")
                 f.write(f"{data.shape[1]}\n\n")
-                for row in data:
-                    for value in row:
-                        f.write(f"{value:.6f}\n")
-                    f.write("\n")
+                # One value per line, blank line after each row
+                ProbeDataReader.write_rows(f, data, "%.6f\n" * data.shape[1] + "\n")
                     
         elif format == 'csv':
-            np.savetxt(file_path, data, delimiter=',', fmt='%.6f')
+            with open(file_path, 'w') as f:
+                ProbeDataReader.write_rows(f, data, ",".join(["%.6f"] * data.shape[1]) + "\n")
             
         elif format == 'space':
-            np.savetxt(file_path, data, fmt='%.6f')
+            with open(file_path, 'w') as f:
+                ProbeDataReader.write_rows(f, data, " ".join(["%.6f"] * data.shape[1]) + "\n")
+            
+        elif format == 'binary':
+            ProbeDataReader._write_archive(data, file_path, spacing, metadata)
             
         else:
             raise ValueError(f"Unknown format: {format}")
@@ -166,13 +1058,16 @@ def demo_usage():
     # Save in different formats
     ProbeDataReader.save_data(sample_data, "demo_custom.txt", format='custom')
     ProbeDataReader.save_data(sample_data, "demo.csv", format='csv')
+    ProbeDataReader.convert_file("demo_custom.txt", "demo.mpb", format='binary')
     
     # Read back
     data1 = ProbeDataReader.read_file("demo_custom.txt")
     data2 = ProbeDataReader.read_file("demo.csv")
+    data3 = ProbeDataReader.read_file("demo.mpb")
     
     print(f"Custom format shape: {data1.shape}")
     print(f"CSV format shape: {data2.shape}")
+    print(f"Binary format shape: {data3.shape}")
     
     # Validate
     is_valid, msg = ProbeDataReader.validate_data(data1)
@@ -0,0 +1,293 @@
+#!/usr/bin/env python3
+"""
+Drift analysis across a machine's scan history for MeshProbe
+
+Tables are re-probed periodically, and the question is where the surface is
+moving and how fast. DriftHistory resamples each scan onto the grid of the
+first one and keeps per-point running sums of time and height, from which
+the least-squares trend (slope per year) of every point follows directly.
+Adding a scan updates the sums; earlier scans are never read again. The
+history is saved as an .npz file next to the scans.
+
+Scan times come from the scan's metadata (mesh archives record when the
+table was probed) or from --date; file times are not used, as copying or
+checking out scans resets them.
+
+    python drift.py vf2_history.npz scans/vf2/*.mpb
+    python drift.py vf2_history.npz vf2_0312.txt --date 2026-03-12 --force
+"""
+
+import argparse
+import json
+import os
+import tempfile
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from data_reader import ProbeDataReader
+from grid_eval import evaluate_grid
+from mesh_cache import content_hash
+from mesh_data import MeshData
+
+# Bump when the saved layout changes
+HISTORY_VERSION = 1
+
+_SECONDS_PER_YEAR = 365.25 * 24 * 3600
+
+# Running sums kept per grid point
+_SUMS = ('count', 'sum_t', 'sum_tt', 'sum_z', 'sum_tz')
+
+# Spread of scan times a point needs before its trend is reported; two scans
+# a day apart qualify. Shorter spans turn measurement noise into huge slopes.
+MIN_TREND_SPAN = 1 / 365.25      # years
+
+
+class DriftHistory:
+    """Per-point running regression of height against time for one machine."""
+
+    def __init__(self, x: np.ndarray, y: np.ndarray, form_order: Optional[int] = 1,
+                 serial_number: Optional[str] = None):
+        """
+        Args:
+            x: Column positions of the common grid
+            y: Row positions of the common grid
+            form_order: Degree of the best-fit form removed from each scan
+                before it is added, so re-zeroing the probe or re-levelling
+                the table is not mistaken for drift; None keeps raw heights
+            serial_number: Machine the history belongs to; scans of another
+                machine are refused
+        """
+        self.x = np.asarray(x, dtype=np.float64)
+        self.y = np.asarray(y, dtype=np.float64)
+        self.form_order = form_order
+        self.serial_number = serial_number
+        # Scan time (epoch seconds), path and content hash of each added scan
+        self.scans: List[dict] = []
+        shape = (len(self.y), len(self.x))
+        for name in _SUMS:
+            setattr(self, name, np.zeros(shape))
+        self.first = np.full(shape, np.nan)     # heights at the earliest scan
+        self.last = np.full(shape, np.nan)      # heights at the latest scan
+
+    @classmethod
+    def from_mesh(cls, mesh: MeshData, form_order: Optional[int] = 1) -> "DriftHistory":
+        """Empty history on the probe grid of mesh."""
+        serial = mesh.metadata.serial_number if mesh.metadata is not None else None
+        return cls(mesh.x_coords, mesh.y_coords, form_order, serial)
+
+    @property
+    def shape(self) -> Tuple[int, int]:
+        return self.count.shape
+
+    def __len__(self) -> int:
+        return len(self.scans)
+
+    def _years(self, when: float) -> float:
+        # Years since the first scan keep the sums well scaled
+        origin = self.scans[0]['time'] if self.scans else when
+        return (when - origin) / _SECONDS_PER_YEAR
+
+    def align(self, mesh: MeshData) -> np.ndarray:
+        """Heights of mesh on the common grid, NaN where it was not measured."""
+        if self.form_order is not None:
+            z = mesh.flatness(self.form_order).residual.astype(np.float64, copy=False)
+        else:
+            z = np.array(mesh.data, dtype=np.float64)
+            if mesh.mask is not None:
+                z[mesh.mask] = np.nan
+        x, y = mesh.x_coords, mesh.y_coords
+        if np.array_equal(x, self.x) and np.array_equal(y, self.y):
+            return z
+        # Linear resampling; missing points spread NaN only to their own cells
+        return evaluate_grid(x, y, z, self.x, self.y, 'linear')
+
+    def check(self, mesh: MeshData) -> None:
+        """
+        Check that a scan belongs to this history.
+
+        Raises:
+            ValueError: If the scan is of another machine, either serial
+                number is unknown, or the probed area differs from the
+                history's by more than half a cell
+        """
+        serial = mesh.metadata.serial_number if mesh.metadata is not None else None
+        if not serial or not self.serial_number:
+            raise ValueError("Cannot confirm the scan is of the history's machine: "
+                             "serial number unknown")
+        if serial != self.serial_number:
+            raise ValueError(f"Scan of machine {serial} does not belong to the "
+                             f"history of {self.serial_number}")
+        for axis, own, other in (('X', self.x, mesh.x_coords), ('Y', self.y, mesh.y_coords)):
+            cell = (own[-1] - own[0]) / max(len(own) - 1, 1)
+            if (abs(other[0] - own[0]) > cell / 2
+                    or abs(other[-1] - own[-1]) > cell / 2):
+                raise ValueError(f"Scan covers {axis} {other[0]:g} to {other[-1]:g}, "
+                                 f"the history {own[0]:g} to {own[-1]:g}")
+
+    def add(self, mesh: MeshData, when: float, path: Optional[str] = None,
+            digest: Optional[str] = None, force: bool = False) -> None:
+        """
+        Fold one scan into the history.
+
+        Args:
+            mesh: The scan
+            when: Scan time in epoch seconds
+            path: File the scan came from, recorded for reference
+            digest: Content hash of that file, used to skip re-adding it
+            force: Add the scan even when check fails, e.g. for formats
+                that carry no serial number
+
+        Raises:
+            ValueError: From check, unless force is set
+        """
+        if not force:
+            self.check(mesh)
+        serial = mesh.metadata.serial_number if mesh.metadata is not None else None
+        self.serial_number = self.serial_number or serial
+
+        z = self.align(mesh)
+        known = np.isfinite(z)
+        t = self._years(when)
+        zk = np.where(known, z, 0.0)
+        self.count += known
+        self.sum_t += known * t
+        self.sum_tt += known * t * t
+        self.sum_z += zk
+        self.sum_tz += zk * t
+
+        times = [scan['time'] for scan in self.scans]
+        if not times or when < min(times):
+            self.first = np.where(known, z, self.first)
+        if not times or when >= max(times):
+            self.last = np.where(known, z, self.last)
+        self.scans.append({'time': float(when), 'path': path, 'hash': digest})
+
+    def contains(self, digest: str) -> bool:
+        """True if a file with this content hash was already added."""
+        return any(scan['hash'] == digest for scan in self.scans)
+
+    def trend(self) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Least-squares line through each point's history.
+
+        Returns:
+            (slope per year, height at the first scan's time); NaN where a
+            point's scan times spread over less than MIN_TREND_SPAN
+        """
+        denominator = self.count * self.sum_tt - self.sum_t ** 2
+        # count**2 times the variance of the point's scan times; two scans
+        # MIN_TREND_SPAN apart have a standard deviation of half of it
+        valid = (self.count >= 2) & (denominator >= (self.count * MIN_TREND_SPAN / 2) ** 2)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            slope = np.where(valid, (self.count * self.sum_tz - self.sum_t * self.sum_z)
+                             / denominator, np.nan)
+            intercept = np.where(valid, (self.sum_z - slope * self.sum_t) / self.count, np.nan)
+        return slope, intercept
+
+    @property
+    def drift(self) -> np.ndarray:
+        """Height change of each point from the earliest to the latest scan."""
+        return self.last - self.first
+
+    def summary(self) -> str:
+        """Short text report of the fastest-moving point."""
+        if not self.scans:
+            return "No scans"
+        times = [scan['time'] for scan in self.scans]
+        span = (max(times) - min(times)) / _SECONDS_PER_YEAR
+        lines = [f"Machine: {self.serial_number or 'unknown'}",
+                 f"Scans: {len(self)} over {span:.2f} years"]
+        slope, _ = self.trend()
+        if np.isfinite(slope).any():
+            row, col = np.unravel_index(np.nanargmax(np.abs(slope)), slope.shape)
+            lines.append(f"Largest trend: {slope[row, col]:+.5f} per year "
+                         f"at X {self.x[col]:g}, Y {self.y[row]:g}")
+            lines.append(f"Drift P-V: {np.nanmax(self.drift) - np.nanmin(self.drift):.5f}")
+        return "\n".join(lines)
+
+    def save(self, file_path: str) -> None:
+        """Write the history to an .npz file, replacing it atomically."""
+        info = {'version': HISTORY_VERSION, 'form_order': self.form_order,
+                'serial_number': self.serial_number, 'scans': self.scans}
+        arrays = {name: getattr(self, name) for name in _SUMS}
+        arrays.update(x=self.x, y=self.y, first=self.first, last=self.last)
+        directory = os.path.dirname(os.path.abspath(file_path))
+        fd, tmp = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                np.savez(f, info=np.array(json.dumps(info)), **arrays)
+            os.replace(tmp, file_path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+
+    @classmethod
+    def load(cls, file_path: str) -> "DriftHistory":
+        """
+        Read a history written by save.
+
+        Raises:
+            ValueError: If the file was written by an incompatible version
+        """
+        with np.load(file_path, allow_pickle=False) as npz:
+            info = json.loads(str(npz['info']))
+            if info.get('version') != HISTORY_VERSION:
+                raise ValueError(f"{file_path}: unsupported drift history version "
+                                 f"{info.get('version')}")
+            history = cls(npz['x'], npz['y'], info['form_order'], info['serial_number'])
+            for name in _SUMS + ('first', 'last'):
+                setattr(history, name, npz[name])
+        history.scans = info['scans']
+        return history
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Track table drift across a machine's scans")
+    parser.add_argument('history', help='History file (.npz); created if it does not exist')
+    parser.add_argument('scans', nargs='*', help='Scans to add; files already added are skipped')
+    parser.add_argument('--date', type=datetime.fromisoformat,
+                        help='Scan date (ISO 8601) of a single scan without a recorded one')
+    parser.add_argument('--force', action='store_true',
+                        help='Add scans whose machine or probed area cannot be confirmed')
+    parser.add_argument('--form-order', type=int, default=1,
+                        help='Degree of the best-fit form removed from each scan '
+                             'when creating a history (1 = plane)')
+    parser.add_argument('--raw', action='store_true',
+                        help='Keep raw heights instead of removing a best-fit form')
+    args = parser.parse_args()
+
+    history = DriftHistory.load(args.history) if os.path.exists(args.history) else None
+    new = []
+    for path in args.scans:
+        digest = content_hash(path)
+        if history is not None and history.contains(digest):
+            continue
+        mesh = ProbeDataReader.read_mesh(path)
+        when = mesh.metadata.scan_time() if mesh.metadata is not None else None
+        if when is None:
+            if args.date is None or len(args.scans) > 1:
+                parser.error(f'{path} has no recorded scan date; add it alone with --date')
+            when = args.date.timestamp()
+        new.append((when, path, digest, mesh))
+
+    # Oldest first, so the first scan of a new history defines the grid
+    for when, path, digest, mesh in sorted(new, key=lambda scan: scan[0]):
+        if history is None:
+            history = DriftHistory.from_mesh(mesh, None if args.raw else args.form_order)
+        try:
+            history.add(mesh, when, path, digest, force=args.force)
+        except ValueError as e:
+            parser.error(f'{path}: {e}')
+        print(f"Added {path} ({datetime.fromtimestamp(when).date()})")
+
+    if history is None:
+        parser.error('no history file and no scans to start one')
+    if new:
+        history.save(args.history)
+    print(history.summary())
+
+
+if __name__ == '__main__':
+    main()
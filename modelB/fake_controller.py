@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Fake controller for testing MeshProbe live mode.
+
+Replays a custom-format probe file line by line at a fixed rate, the way the
+meshprobe.nc program emits DPRNT output during a probing cycle. Serves one
+client over TCP, or writes to stdout for piping.
+
+    python fake_controller.py ../random_data.txt --port 5051
+    python meshprobe_improved.py --live tcp://localhost:5051
+
+    python fake_controller.py ../random_data.txt --stdout | python meshprobe_improved.py --live -
+"""
+
+import argparse
+import socket
+import sys
+import time
+
+
+def replay(lines, write, rate):
+    """Write lines at `rate` points per second; blank lines are sent immediately."""
+    delay = 1.0 / rate if rate > 0 else 0.0
+    for line in lines:
+        write(line.rstrip('\r\n').encode('ascii') + b'\r\n')
+        if line.strip() and delay:
+            time.sleep(delay)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Replay a probe file as live DPRNT output')
+    parser.add_argument('datafile', help='Custom-format probe file to replay')
+    parser.add_argument('--port', type=int, default=5051, help='TCP port to listen on')
+    parser.add_argument('--rate', type=float, default=20.0,
+                        help='Points per second (0 for no delay)')
+    parser.add_argument('--stdout', action='store_true',
+                        help='Write to stdout instead of serving TCP')
+    args = parser.parse_args()
+
+    with open(args.datafile, 'r') as f:
+        lines = f.readlines()
+
+    if args.stdout:
+        out = sys.stdout.buffer
+
+        def write(data):
+            out.write(data)
+            out.flush()
+
+        replay(lines, write, args.rate)
+        return
+
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as server:
+        server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        server.bind(('', args.port))
+        server.listen(1)
+        print(f"Waiting for a client on port {args.port}...", file=sys.stderr)
+        conn, addr = server.accept()
+        with conn:
+            print(f"Streaming {args.datafile} to {addr[0]}", file=sys.stderr)
+            replay(lines, conn.sendall, args.rate)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,126 @@
+"""
+Flatness metrics for MeshProbe: best-fit form removal
+
+The raw max-min of a scan includes the tilt of the table relative to the
+machine axes, which is not flatness. These functions fit a least-squares
+plane (order 1) or a higher-order polynomial form to each mesh and report
+the residual map with its RMS and peak-to-valley, the figures flatness is
+certified against.
+
+Meshes lie on tensor grids, so the least-squares normal equations are built
+separably from per-axis power tables (Vy^T Z Vx) without forming the
+points-by-terms design matrix. Batches of meshes on a common grid are
+solved together, and missing points are simply left out of the fit.
+"""
+
+from dataclasses import dataclass
+from typing import Optional, Union
+
+import numpy as np
+
+from grid_eval import surface_dtype
+
+
+@dataclass
+class FlatnessResult:
+    """Residual after form removal, with its flatness figures.
+
+    For a batch every field gains a leading mesh axis.
+    """
+    residual: np.ndarray                   # measured minus fitted form, NaN where missing
+    rms: Union[float, np.ndarray]
+    peak_valley: Union[float, np.ndarray]
+    coefficients: np.ndarray               # form terms over coordinates scaled to [-1, 1]
+    order: int
+
+    def as_dict(self) -> dict:
+        """Flatness figures alongside the MeshData.statistics keys."""
+        return {'flatness_pv': self.peak_valley, 'flatness_rms': self.rms}
+
+
+def form_terms(order: int) -> np.ndarray:
+    """(x power, y power) of each polynomial term of total degree <= order."""
+    return np.array([(total - j, j) for total in range(order + 1) for j in range(total + 1)])
+
+
+def _scaled(axis: np.ndarray) -> np.ndarray:
+    # Map positions onto [-1, 1] to keep the normal equations well conditioned
+    axis = np.asarray(axis, dtype=np.float64)
+    span = axis[-1] - axis[0]
+    if span == 0:
+        return np.zeros_like(axis)
+    return 2 * (axis - axis[0]) / span - 1
+
+
+def remove_form_batch(stack: np.ndarray, x: np.ndarray, y: np.ndarray, order: int = 1,
+                      mask: Optional[np.ndarray] = None) -> FlatnessResult:
+    """
+    Remove a best-fit form from a batch of meshes on a common grid.
+
+    Args:
+        stack: (n, rows, cols) Z heights
+        x: Column positions (length cols)
+        y: Row positions (length rows)
+        order: Polynomial degree of the form; 1 removes a plane (tilt)
+        mask: Optional (n, rows, cols) or (rows, cols) array, True where a
+            point is missing. Non-finite values are always treated as missing
+
+    Returns:
+        FlatnessResult with per-mesh rms, peak_valley and coefficients
+    """
+    stack = np.asarray(stack)
+    known = np.isfinite(stack)
+    if mask is not None:
+        known &= ~np.broadcast_to(mask, stack.shape)
+    weight = known.astype(np.float64)
+    z = np.where(known, stack, 0.0).astype(np.float64, copy=False)
+
+    terms = form_terms(order)
+    tx, ty = terms[:, 0], terms[:, 1]
+    # Powers up to 2*order cover every product of two terms
+    vx = _scaled(x)[:, None] ** np.arange(2 * order + 1)
+    vy = _scaled(y)[:, None] ** np.arange(2 * order + 1)
+    fx, fy = vx[:, :order + 1], vy[:, :order + 1]
+
+    # moments[n, b, a] = sum of weight * y^b * x^a over each mesh
+    moments = np.einsum('rb,nrc,ca->nba', vy, weight, vx, optimize=True)
+    normal = moments[:, ty[:, None] + ty[None, :], tx[:, None] + tx[None, :]]
+    rhs = np.einsum('rb,nrc,ca->nba', fy, z, fx, optimize=True)[:, ty, tx]
+    # pinv rather than solve: rank-deficient grids (a single row) still fit
+    coefficients = np.einsum('nij,nj->ni', np.linalg.pinv(normal), rhs)
+
+    grid = np.zeros((len(stack), order + 1, order + 1))
+    grid[:, ty, tx] = coefficients
+    residual = stack - np.einsum('rb,nba,ca->nrc', fy, grid, fx, optimize=True)
+    residual[~known] = np.nan
+
+    # Figures from the float64 residual, before any cast to the storage type
+    count = weight.sum(axis=(1, 2))
+    squares = np.square(np.where(known, residual, 0.0)).sum(axis=(1, 2))
+    high = np.where(known, residual, -np.inf).max(axis=(1, 2))
+    low = np.where(known, residual, np.inf).min(axis=(1, 2))
+    empty = count == 0
+    with np.errstate(invalid='ignore', divide='ignore'):
+        rms = np.where(empty, np.nan, np.sqrt(squares / count))
+        peak_valley = np.where(empty, np.nan, high - low)
+
+    return FlatnessResult(residual.astype(surface_dtype(stack), copy=False),
+                          rms, peak_valley, coefficients, order)
+
+
+def remove_form(data: np.ndarray, x: np.ndarray, y: np.ndarray, order: int = 1,
+                mask: Optional[np.ndarray] = None) -> FlatnessResult:
+    """
+    Remove a best-fit form from a single mesh.
+
+    Args:
+        data: (rows, cols) Z heights
+        x: Column positions
+        y: Row positions
+        order: Polynomial degree of the form; 1 removes a plane (tilt)
+        mask: Optional (rows, cols) array, True where a point is missing
+    """
+    batch = remove_form_batch(np.asarray(data)[None], x, y, order,
+                              None if mask is None else np.asarray(mask)[None])
+    return FlatnessResult(batch.residual[0], float(batch.rms[0]),
+                          float(batch.peak_valley[0]), batch.coefficients[0], order)
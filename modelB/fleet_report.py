@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+"""
+Fleet-wide flatness report for MeshProbe
+
+Analyses every scan under a directory tree in one run, rather than opening
+each file in the viewer, and writes one CSV table per machine serial number
+plus a ranking of machines by their most recent flatness, worst first, for
+scheduling table resurfacing. Files are parsed in a process pool by
+ProbeDataReader.read_many; meshes probed on the same grid are stacked and
+their best-fit planes removed together by remove_form_batch.
+
+    python fleet_report.py scans/ --pattern '**/*.txt' --tolerance 0.002 -o report/
+"""
+
+import argparse
+import csv
+import os
+import re
+from collections import defaultdict
+from dataclasses import asdict, dataclass, fields
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from data_reader import BulkLoadResult, ProbeDataReader
+from flatness import remove_form_batch
+from mesh_data import MeshData
+
+# Meshes solved together per remove_form_batch call, bounding its working memory
+DEFAULT_BATCH = 64
+
+# Serial number used when neither the file nor its directory gives one
+UNKNOWN_SERIAL = 'unknown'
+
+_TABLE_DECIMALS = 6
+
+# Characters replaced when a serial number becomes a file name
+_UNSAFE_NAME = re.compile(r'[^\w.-]')
+
+
+@dataclass
+class ScanResult:
+    """Flatness figures of one scan, one row of a machine table."""
+    serial_number: str
+    machine_type: str
+    scanned: str                 # scan date from the metadata, '' when not recorded
+    modified: str                # file modification time; copies and checkouts reset it
+    path: str
+    rows: int
+    cols: int
+    peak_valley: float           # raw max - min, including table tilt
+    rms: float                   # raw deviation from the mean height
+    flatness_pv: float           # P-V after removing the best-fit form
+    flatness_rms: float
+    passed: Optional[bool] = None
+
+
+@dataclass
+class MachineSummary:
+    """Most recent state of one machine, one row of the ranking."""
+    serial_number: str
+    machine_type: str
+    scans: int
+    last_scan: str               # scanned, or modified when ordered by file time
+    ordered_by: str              # 'scan date', or 'file time' if a scan has no date
+    flatness_pv: float
+    flatness_rms: float
+    change: float                # flatness_pv change since the first scan
+    passed: Optional[bool] = None
+
+
+def load_fleet(source: str, pattern: str = '**/*', workers: Optional[int] = None,
+               chunksize: int = 8) -> BulkLoadResult:
+    """
+    Load and validate every scan under source with its metadata.
+
+    Args:
+        source: Directory to scan, or a glob such as 'scans/**/*.txt'
+        pattern: Glob applied inside source when it is a directory
+        workers: Worker processes; defaults to the CPU count, 1 loads serially
+        chunksize: Files handed to a worker per task
+
+    Returns:
+        BulkLoadResult from read_many with the valid scans as MeshData; no
+        stack is built, as flatness_figures stacks them batch by batch
+    """
+    return ProbeDataReader.read_many(source, pattern, workers, chunksize,
+                                     with_metadata=True, stack=False)
+
+
+def flatness_figures(meshes: List[MeshData], order: int = 1,
+                     batch: int = DEFAULT_BATCH) -> np.ndarray:
+    """
+    Raw and form-removed flatness of many meshes.
+
+    Raw figures come from each mesh's statistics; meshes sharing a probe
+    grid are stacked and their forms fitted batch by batch.
+
+    Returns:
+        (len(meshes), 4) array of peak_valley, rms, flatness_pv, flatness_rms
+    """
+    figures = np.full((len(meshes), 4), np.nan)
+    groups = defaultdict(list)
+    for index, mesh in enumerate(meshes):
+        stats = mesh.statistics
+        figures[index, :2] = stats['range'], stats['std']
+        groups[(mesh.shape, mesh.x_coords.tobytes(), mesh.y_coords.tobytes())].append(index)
+
+    for indices in groups.values():
+        first = meshes[indices[0]]
+        for start in range(0, len(indices), batch):
+            chunk = indices[start:start + batch]
+            stack = np.stack([meshes[i].data for i in chunk]).astype(np.float64, copy=False)
+            unknown = ~np.isfinite(stack)
+            if any(meshes[i].mask is not None for i in chunk):
+                unknown |= np.stack([meshes[i].mask if meshes[i].mask is not None
+                                     else np.zeros(first.shape, dtype=bool) for i in chunk])
+            fit = remove_form_batch(stack, first.x_coords, first.y_coords, order, unknown)
+            figures[chunk, 2] = fit.peak_valley
+            figures[chunk, 3] = fit.rms
+    return figures
+
+
+def _serial_number(mesh: MeshData, path: str) -> str:
+    # Fleets without metadata in the files are usually filed one directory per machine
+    if mesh.metadata is not None and mesh.metadata.serial_number:
+        return str(mesh.metadata.serial_number)
+    return Path(path).parent.name or UNKNOWN_SERIAL
+
+
+def analyze_fleet(meshes: List[MeshData], paths: List[str], order: int = 1,
+                  tolerance: Optional[float] = None,
+                  batch: int = DEFAULT_BATCH) -> List[ScanResult]:
+    """
+    Flatness of every scan, ordered by serial number and then as by_machine.
+
+    Args:
+        meshes: Loaded scans
+        paths: File of each scan, for its modification time and a fallback
+            serial number
+        order: Polynomial degree of the removed form; 1 removes table tilt
+        tolerance: Largest acceptable flatness P-V; pass/fail is left
+            empty when omitted
+        batch: Meshes fitted together per call
+    """
+    figures = flatness_figures(meshes, order, batch)
+    results = []
+    for mesh, path, (pv, rms, flat_pv, flat_rms) in zip(meshes, paths, figures):
+        meta = mesh.metadata
+        modified = datetime.fromtimestamp(os.path.getmtime(path)).isoformat(' ', 'seconds')
+        when = meta.scan_time() if meta is not None else None
+        scanned = datetime.fromtimestamp(when).isoformat(' ', 'seconds') if when is not None else ''
+        results.append(ScanResult(
+            serial_number=_serial_number(mesh, path),
+            machine_type=(meta.machine_type if meta is not None else None) or '',
+            scanned=scanned, modified=modified, path=path, rows=mesh.rows, cols=mesh.cols,
+            peak_valley=float(pv), rms=float(rms),
+            flatness_pv=float(flat_pv), flatness_rms=float(flat_rms),
+            passed=None if tolerance is None else bool(flat_pv <= tolerance)))
+    machines = by_machine(results)
+    return [scan for serial in sorted(machines) for scan in machines[serial]]
+
+
+def _ordered_by(scans: List[ScanResult]) -> str:
+    return 'scan date' if all(scan.scanned for scan in scans) else 'file time'
+
+
+def by_machine(results: List[ScanResult]) -> Dict[str, List[ScanResult]]:
+    """
+    Scan results grouped by serial number, each oldest first.
+
+    Scans are ordered by their recorded scan dates, or by file modification
+    time when any scan of the machine has none.
+    """
+    machines = defaultdict(list)
+    for result in results:
+        machines[result.serial_number].append(result)
+    for scans in machines.values():
+        if _ordered_by(scans) == 'scan date':
+            scans.sort(key=lambda r: (r.scanned, r.path))
+        else:
+            scans.sort(key=lambda r: (r.modified, r.path))
+    return dict(machines)
+
+
+def rank_machines(results: List[ScanResult]) -> List[MachineSummary]:
+    """Most recent state of each machine, least flat first and unknown flatness last."""
+    summaries = []
+    for serial, scans in by_machine(results).items():
+        first, last = scans[0], scans[-1]
+        ordered_by = _ordered_by(scans)
+        summaries.append(MachineSummary(
+            serial_number=serial, machine_type=last.machine_type, scans=len(scans),
+            last_scan=last.scanned if ordered_by == 'scan date' else last.modified,
+            ordered_by=ordered_by, flatness_pv=last.flatness_pv,
+            flatness_rms=last.flatness_rms,
+            change=last.flatness_pv - first.flatness_pv, passed=last.passed))
+    # NaN compares False both ways, which would leave the order undefined
+    summaries.sort(key=lambda s: (np.isnan(s.flatness_pv),
+                                  0.0 if np.isnan(s.flatness_pv) else -s.flatness_pv))
+    return summaries
+
+
+def _write_table(file_path: Path, records: list) -> None:
+    names = [f.name for f in fields(records[0])]
+    with open(file_path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(names)
+        for record in records:
+            row = []
+            for value in asdict(record).values():
+                if isinstance(value, float):
+                    value = f"{value:.{_TABLE_DECIMALS}f}"
+                elif isinstance(value, bool):
+                    value = 'PASS' if value else 'FAIL'
+                row.append('' if value is None else value)
+            writer.writerow(row)
+
+
+def write_report(results: List[ScanResult], directory: str) -> List[MachineSummary]:
+    """
+    Write <serial>.csv per machine and fleet_ranking.csv into directory.
+
+    Returns:
+        The ranking that was written
+    """
+    out = Path(directory)
+    out.mkdir(parents=True, exist_ok=True)
+    for serial, scans in by_machine(results).items():
+        _write_table(out / (_UNSAFE_NAME.sub('_', serial) + '.csv'), scans)
+    ranking = rank_machines(results)
+    if ranking:
+        _write_table(out / 'fleet_ranking.csv', ranking)
+    return ranking
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Fleet-wide table flatness report')
+    parser.add_argument('source', help="Directory of scans, or a glob such as 'scans/**/*.txt'")
+    parser.add_argument('--pattern', default='**/*',
+                        help='Glob applied inside a source directory')
+    parser.add_argument('--tolerance', type=float,
+                        help='Largest acceptable flatness P-V for a pass')
+    parser.add_argument('--form-order', type=int, default=1,
+                        help='Degree of the best-fit form removed for flatness (1 = plane)')
+    parser.add_argument('--workers', type=int, help='Worker processes for parsing')
+    parser.add_argument('-o', '--output', default='fleet_report',
+                        help='Directory for the per-machine tables and ranking')
+    args = parser.parse_args()
+
+    loaded = load_fleet(args.source, args.pattern, args.workers)
+    failed = loaded.failed
+    for s in failed:
+        print(f"Skipped {s.path}: {s.error}")
+    results = analyze_fleet(loaded.meshes, loaded.paths, args.form_order, args.tolerance)
+    ranking = write_report(results, args.output)
+
+    print(f"Analysed {len(results)} scans of {len(ranking)} machines "
+          f"({len(failed)} files skipped); tables in {args.output}")
+    for summary in ranking:
+        verdict = '' if summary.passed is None else ('  PASS' if summary.passed else '  FAIL')
+        print(f"{summary.serial_number:<20} {summary.flatness_pv:.4f} P-V  "
+              f"{summary.flatness_rms:.4f} RMS  ({summary.scans} scans){verdict}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,135 @@
+"""
+Tensor-grid evaluation of probe meshes for MeshProbe
+
+The viewers always evaluate the mesh on an axis-aligned display grid. Rather
+than building meshgrid coordinate arrays and passing every point through
+RegularGridInterpolator, the bracketing indices and weights are found once
+per axis and combined separably. Results match RegularGridInterpolator with
+bounds_error=False: NaN outside the probed area and, for 'nearest', ties
+going to the lower grid point.
+"""
+
+from typing import Callable, Optional, Tuple
+
+import numpy as np
+
+# Methods evaluate_grid supports
+METHODS = ('nearest', 'linear')
+
+# (rows, cols) evaluated per tile by evaluate_tiled, about 8 MB of float64
+DEFAULT_TILE = (256, 4096)
+
+# Output rows blended per step of the linear Y pass
+_BLOCK_ROWS = 256
+
+
+def surface_dtype(values: np.ndarray) -> np.dtype:
+    """Type of surfaces computed from values: float32 stays float32."""
+    values = np.asarray(values)
+    return values.dtype if values.dtype == np.float32 else np.dtype(np.float64)
+
+
+def axis_weights(axis: np.ndarray, targets: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Locate targets on a sorted 1D axis.
+
+    Returns:
+        Tuple of (lower index, fraction of the way to the next point,
+        inside-axis flag) for each target
+    """
+    axis = np.asarray(axis, dtype=float)
+    targets = np.asarray(targets, dtype=float)
+    inside = (targets >= axis[0]) & (targets <= axis[-1])
+    if axis.size == 1:
+        zeros = np.zeros(targets.shape, dtype=np.intp)
+        return zeros, np.zeros(targets.shape), inside
+    lower = np.clip(np.searchsorted(axis, targets) - 1, 0, axis.size - 2)
+    frac = (targets - axis[lower]) / (axis[lower + 1] - axis[lower])
+    return lower, frac, inside
+
+
+def evaluate_grid(x: np.ndarray, y: np.ndarray, values: np.ndarray,
+                  xt: np.ndarray, yt: np.ndarray, method: str = 'linear') -> np.ndarray:
+    """
+    Evaluate a gridded surface on the tensor grid xt by yt.
+
+    Args:
+        x: Column positions of values (length cols)
+        y: Row positions of values (length rows)
+        values: (rows, cols) array of Z heights
+        xt: Target X positions
+        yt: Target Y positions
+        method: 'nearest' or 'linear'
+
+    Returns:
+        (len(yt), len(xt)) array, NaN where a target lies outside x or y.
+        float32 values give a float32 result; other types give float64
+
+    Raises:
+        ValueError: If method is not one of METHODS
+    """
+    if method not in METHODS:
+        raise ValueError(f"Unsupported grid method: {method}")
+    values = np.asarray(values)
+    dtype = surface_dtype(values)
+    ix, fx, x_inside = axis_weights(x, xt)
+    iy, fy, y_inside = axis_weights(y, yt)
+    # Positions are located in float64; only the blend runs in dtype
+    fx = fx.astype(dtype, copy=False)
+    fy = fy.astype(dtype, copy=False)
+    # Single-point axes have no upper neighbour; their weight is always zero
+    ix1 = np.minimum(ix + 1, len(x) - 1)
+    iy1 = np.minimum(iy + 1, len(y) - 1)
+
+    if method == 'nearest':
+        ix = np.where(fx <= 0.5, ix, ix1)
+        iy = np.where(fy <= 0.5, iy, iy1)
+        result = values[np.ix_(iy, ix)].astype(dtype, copy=False)
+    else:
+        # Along X for every probed row, then along Y: O(rows*nx + ny*nx)
+        rows = values[:, ix].astype(dtype, copy=False) * (1 - fx) + values[:, ix1] * fx
+        result = rows[iy]
+        # Blocks of output rows keep the temporaries small
+        for start in range(0, len(iy), _BLOCK_ROWS):
+            block = slice(start, start + _BLOCK_ROWS)
+            result[block] += (rows[iy1[block]] - rows[iy[block]]) * fy[block, None]
+
+    if not (x_inside.all() and y_inside.all()):
+        result[~y_inside, :] = np.nan
+        result[:, ~x_inside] = np.nan
+    return result
+
+
+def evaluate_tiled(evaluate: Callable[[np.ndarray, np.ndarray], np.ndarray],
+                   xt: np.ndarray, yt: np.ndarray, out: Optional[np.ndarray] = None,
+                   tile: Tuple[int, int] = DEFAULT_TILE, dtype=np.float64) -> np.ndarray:
+    """
+    Evaluate a surface on the tensor grid xt by yt one tile at a time.
+
+    Peak memory is set by the tile size rather than the grid size, so with
+    a memory-mapped out the grid may be larger than RAM.
+
+    Args:
+        evaluate: Function of (xt, yt) returning the (len(yt), len(xt))
+            surface, e.g. a partial of evaluate_grid or
+            SplineSurface.evaluate_grid
+        xt: Target X positions
+        yt: Target Y positions
+        out: Preallocated (len(yt), len(xt)) array or memmap to fill
+        tile: (rows, cols) per evaluation
+        dtype: Type of the array allocated when out is None
+
+    Returns:
+        out, or a new array when out is None
+    """
+    shape = (len(yt), len(xt))
+    if out is None:
+        out = np.empty(shape, dtype=dtype)
+    elif out.shape != shape:
+        raise ValueError(f"Output shape {out.shape} does not match grid {shape}")
+    tile_rows, tile_cols = tile
+    for r in range(0, shape[0], tile_rows):
+        for c in range(0, shape[1], tile_cols):
+            out[r:r + tile_rows, c:c + tile_cols] = evaluate(xt[c:c + tile_cols],
+                                                             yt[r:r + tile_rows])
+    return out
@@ -0,0 +1,282 @@
+"""
+Live ingest of DPRNT probe output for MeshProbe
+
+The controller prints the custom format while the probing cycle runs: row
+count, column count, then one Z value per line with a blank line after each
+row. DprntStreamParser consumes that text incrementally and fills a
+partially-known MeshData; LiveIngest reads a socket or pipe on a background
+thread and feeds the parser. FileTailer follows a file the controller is
+still writing, e.g. on a DNC share, reading only the appended bytes.
+"""
+
+import codecs
+import os
+import socket
+import sys
+import threading
+import time
+from typing import Iterator, Optional
+
+import numpy as np
+
+from data_reader import ProbeFormatError
+from mesh_data import MeshData, ProbeMetadata, RunningStats
+
+# Bytes requested per read from a live source.
+_RECV_BYTES = 4096
+
+
+class DprntStreamParser:
+    """Incremental parser for custom-format text arriving in pieces."""
+
+    def __init__(self, source: Optional[str] = None,
+                 metadata: Optional[ProbeMetadata] = None):
+        """
+        Args:
+            source: Name of the stream, used in error messages
+            metadata: Table and cell size given to the mesh once the header
+                arrives, e.g. from the meshprobe.nc program being run
+        """
+        self.source = source
+        self.metadata = metadata
+        self.mesh: Optional[MeshData] = None
+        self.stats = RunningStats()
+        self.filled = 0
+        self.line_no = 0
+        # Bumped whenever new points land, so viewers can skip idle redraws
+        self.version = 0
+        self._header = []
+        self._pending = ''
+        self._decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+
+    @property
+    def expected(self) -> int:
+        return self.mesh.rows * self.mesh.cols if self.mesh is not None else 0
+
+    @property
+    def complete(self) -> bool:
+        return self.mesh is not None and self.filled == self.expected
+
+    @property
+    def progress(self) -> float:
+        """Fraction of the mesh received so far."""
+        return self.filled / self.expected if self.expected else 0.0
+
+    def feed_bytes(self, chunk: bytes) -> int:
+        """Decode and parse a chunk of raw bytes; returns points added."""
+        return self.feed(self._decoder.decode(chunk))
+
+    def feed(self, text: str) -> int:
+        """
+        Parse a chunk of text; returns the number of points added.
+
+        A trailing partial line is held back until the rest arrives, as is
+        a line ending in a lone carriage return, which may be the first half
+        of a CRLF split across chunks.
+
+        Raises:
+            ProbeFormatError: If the header or a value is malformed, or more
+                values arrive than the header announced
+        """
+        lines = (self._pending + text).splitlines(keepends=True)
+        self._pending = ''
+        if lines and not lines[-1].endswith('\n'):
+            self._pending = lines.pop()
+        return self._parse_lines(lines)
+
+    def finish(self) -> int:
+        """Parse any final line left without a terminator."""
+        text, self._pending = self._pending, ''
+        return self._parse_lines([text]) if text else 0
+
+    def _parse_lines(self, lines: list) -> int:
+        values = []
+        first_line = self.line_no + 1
+        for line in lines:
+            self.line_no += 1
+            text = line.strip()
+            if not text:
+                continue
+            if self.mesh is None:
+                self._parse_header(text)
+            else:
+                values.append(text)
+        return self._store(values, lines, first_line)
+
+    def _parse_header(self, text: str) -> None:
+        try:
+            value = int(text)
+        except ValueError:
+            value = 0
+        if value <= 0:
+            name = 'row count' if not self._header else 'column count'
+            raise ProbeFormatError(f"Invalid {name} {text!r}", self.source, self.line_no)
+        self._header.append(value)
+        if len(self._header) == 2:
+            self.mesh = MeshData.empty(*self._header)
+            self.mesh.metadata = self.metadata
+
+    def _store(self, values: list, lines: list, first_line: int) -> int:
+        if not values:
+            return 0
+        count = len(values)
+        if self.filled + count > self.expected:
+            raise ProbeFormatError(
+                f"Data size mismatch. Expected {self.expected} values, received more",
+                self.source, self.line_no)
+        try:
+            chunk = np.array(values, dtype=float)
+        except ValueError:
+            chunk = None
+        if chunk is None or not np.isfinite(chunk).all():
+            self._raise_bad_value(lines, first_line)
+
+        flat = slice(self.filled, self.filled + count)
+        self.mesh.data.ravel()[flat] = chunk
+        self.mesh.mask.ravel()[flat] = False
+        self.mesh.touch()
+        self.stats.update(chunk)
+        self.mesh.seed_statistics(self.stats)
+        self.filled += count
+        self.version += 1
+        return count
+
+    def _raise_bad_value(self, lines: list, first_line: int) -> None:
+        for offset, line in enumerate(lines):
+            text = line.strip()
+            try:
+                bad = bool(text) and not np.isfinite(float(text))
+            except ValueError:
+                bad = True
+            if bad:
+                raise ProbeFormatError(f"Invalid value {text!r}", self.source,
+                                       first_line + offset)
+
+
+def open_source(spec: str) -> Iterator[bytes]:
+    """
+    Yield raw byte chunks from a live source as they become available.
+
+    Args:
+        spec: 'tcp://host:port' to connect to a controller or serial bridge,
+            '-' for standard input, or the path of a named pipe or file
+    """
+    if spec.startswith('tcp://'):
+        host, _, port = spec[len('tcp://'):].rpartition(':')
+        with socket.create_connection((host or 'localhost', int(port))) as sock:
+            while True:
+                chunk = sock.recv(_RECV_BYTES)
+                if not chunk:
+                    return
+                yield chunk
+    elif spec == '-':
+        yield from _read_fd(sys.stdin.fileno())
+    else:
+        fd = os.open(spec, os.O_RDONLY)
+        try:
+            yield from _read_fd(fd)
+        finally:
+            os.close(fd)
+
+
+def _read_fd(fd: int) -> Iterator[bytes]:
+    # os.read returns as soon as any data is available, unlike file.read
+    while True:
+        chunk = os.read(fd, _RECV_BYTES)
+        if not chunk:
+            return
+        yield chunk
+
+
+class FileTailer:
+    """
+    Follows a growing file, returning only bytes appended since the last read.
+
+    The byte offset is kept between reads so the file is never re-read. If
+    the file shrinks (the controller started a new scan over it) reading
+    restarts from the beginning and `truncated` is set for that read.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.offset = 0
+        self.truncated = False
+
+    def read_new(self) -> bytes:
+        """Return the bytes appended since the previous call (may be empty)."""
+        self.truncated = False
+        try:
+            size = os.path.getsize(self.path)
+        except FileNotFoundError:
+            return b''
+        if size < self.offset:
+            self.offset = 0
+            self.truncated = True
+        if size == self.offset:
+            return b''
+        with open(self.path, 'rb') as f:
+            f.seek(self.offset)
+            chunk = f.read(size - self.offset)
+        self.offset += len(chunk)
+        return chunk
+
+
+class LiveIngest:
+    """Reads a live source on a background thread and feeds a DprntStreamParser."""
+
+    def __init__(self, spec: str, follow: bool = False, poll_interval: float = 0.25,
+                 metadata: Optional[ProbeMetadata] = None):
+        """
+        Args:
+            spec: Source accepted by open_source, or a file path when following
+            follow: Tail spec as a growing file instead of reading it as a stream
+            poll_interval: Seconds between size checks when following a file
+            metadata: Table and cell size of the scan, passed to the parser
+        """
+        self.spec = spec
+        self.follow = follow
+        self.poll_interval = poll_interval
+        self.parser = DprntStreamParser(source=spec, metadata=metadata)
+        self.lock = threading.Lock()
+        self.error: Optional[Exception] = None
+        self.finished = False
+        self._thread = threading.Thread(target=self._run, name='dprnt-ingest', daemon=True)
+
+    def start(self) -> "LiveIngest":
+        self._thread.start()
+        return self
+
+    def _run(self) -> None:
+        try:
+            if self.follow:
+                self._follow_file()
+            else:
+                for chunk in open_source(self.spec):
+                    with self.lock:
+                        self.parser.feed_bytes(chunk)
+                        if self.parser.complete:
+                            break
+            with self.lock:
+                self.parser.finish()
+        except (OSError, ValueError) as e:
+            self.error = e
+        finally:
+            self.finished = True
+
+    def _follow_file(self) -> None:
+        tailer = FileTailer(self.spec)
+        while True:
+            chunk = tailer.read_new()
+            with self.lock:
+                if tailer.truncated:
+                    # Keep the version increasing so viewers notice the reset
+                    version = self.parser.version + 1
+                    self.parser = DprntStreamParser(source=self.spec,
+                                                    metadata=self.parser.metadata)
+                    self.parser.version = version
+                if chunk:
+                    self.parser.feed_bytes(chunk)
+                if self.parser.complete:
+                    return
+            if not chunk:
+                time.sleep(self.poll_interval)
@@ -0,0 +1,224 @@
+"""
+Persistent cache of parsed probe meshes for MeshProbe
+
+Parsing a text scan costs far more than loading a binary array, and QA
+reviews reopen the same scans many times. Binary mesh archives are already
+memory-mapped on load and bypass the cache. MeshCache keeps the parsed array,
+its metadata, the validate_data result and the statistics on disk. Entries
+are looked up by path; a matching mtime and size is trusted, otherwise the
+content hash decides whether the file really changed. The cache directory is
+bounded in size and evicts least recently used entries.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+
+from data_reader import ProbeDataReader
+from mesh_data import MeshData, ProbeMetadata, RunningStats
+
+# Bump when the entry layout or parsing changes so stale entries are ignored
+CACHE_VERSION = 1
+
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+_HASH_CHUNK = 1 << 20
+
+
+def default_cache_dir() -> Path:
+    """$MESHPROBE_CACHE_DIR, else ~/.cache/meshprobe."""
+    env = os.environ.get('MESHPROBE_CACHE_DIR')
+    return Path(env) if env else Path.home() / '.cache' / 'meshprobe'
+
+
+def content_hash(file_path: str) -> str:
+    """BLAKE2b digest of a file's contents."""
+    digest = hashlib.blake2b(digest_size=20)
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(_HASH_CHUNK), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _remove(path: Path) -> None:
+    try:
+        path.unlink()
+    except FileNotFoundError:
+        pass
+
+
+@dataclass
+class CachedMesh:
+    """A parsed mesh with its validation result and statistics."""
+    mesh: MeshData
+    is_valid: bool
+    message: Optional[str]
+    statistics: dict
+    hit: bool                    # True when served from the cache
+
+
+class MeshCache:
+    """Size-bounded LRU cache of parsed meshes on disk."""
+
+    def __init__(self, directory: Optional[str] = None,
+                 max_bytes: int = DEFAULT_MAX_BYTES):
+        self.directory = Path(directory) if directory else default_cache_dir()
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+
+    def load(self, file_path: str, nc_program: Optional[str] = None,
+             dtype=None, allow_missing: bool = False) -> CachedMesh:
+        """
+        Return the parsed mesh for file_path, parsing only on a cache miss.
+
+        Args:
+            file_path: Probe data file in any format ProbeDataReader reads
+            nc_program: Optional meshprobe.nc program passed to read_mesh
+            dtype: Floating-point type of the returned data; entries are
+                stored as parsed, so one entry serves every precision
+            allow_missing: Passed to read_mesh; partial parses are cached
+                separately from strict ones
+        """
+        cached = self._load(file_path, nc_program, allow_missing)
+        if dtype is not None:
+            cached.mesh = cached.mesh.astype(dtype)
+        return cached
+
+    def _load(self, file_path: str, nc_program: Optional[str],
+              allow_missing: bool) -> CachedMesh:
+        source = os.path.abspath(file_path)
+        stat = os.stat(source)
+        program = os.path.abspath(nc_program) if nc_program else None
+        if ProbeDataReader.sniff_format(source).format == 'binary':
+            # Already a memory-mapped array: copying it into an entry would
+            # cost the zero-copy load and push other scans out of the cache
+            mesh = ProbeDataReader.read_mesh(source, nc_program=program,
+                                             allow_missing=allow_missing)
+            is_valid, message = ProbeDataReader.validate_data(mesh.data, mask=mesh.mask)
+            return CachedMesh(mesh, is_valid, message, mesh.statistics, hit=False)
+        entry = self._entry_path(source, program, allow_missing)
+
+        record = self._read_entry(entry)
+        digest = None
+        if record is not None:
+            info, arrays = record
+            unchanged = (info['mtime_ns'] == stat.st_mtime_ns and info['size'] == stat.st_size)
+            if not unchanged:
+                # Touched or copied but possibly identical: let the content decide
+                digest = content_hash(source)
+                unchanged = digest == info['content_hash']
+            if unchanged and info.get('program_hash') == self._program_hash(program):
+                if digest is not None:
+                    info.update(mtime_ns=stat.st_mtime_ns, size=stat.st_size)
+                    self._write_entry(entry, info, arrays)
+                os.utime(entry)
+                self.hits += 1
+                return self._to_cached(info, arrays, hit=True)
+
+        self.misses += 1
+        mesh = ProbeDataReader.read_mesh(source, nc_program=program,
+                                         allow_missing=allow_missing)
+        is_valid, message = ProbeDataReader.validate_data(mesh.data, mask=mesh.mask)
+        info = {
+            'version': CACHE_VERSION,
+            'path': source,
+            'mtime_ns': stat.st_mtime_ns,
+            'size': stat.st_size,
+            'content_hash': digest or content_hash(source),
+            'program_hash': self._program_hash(program),
+            'metadata': mesh.metadata.to_dict() if mesh.metadata else None,
+            'is_valid': is_valid,
+            'message': message,
+            'statistics': {k: float(v) for k, v in mesh.statistics.items()},
+        }
+        arrays = {'data': np.asarray(mesh.data)}
+        if mesh.mask is not None:
+            arrays['mask'] = mesh.mask
+        self._write_entry(entry, info, arrays)
+        self._evict()
+        return CachedMesh(mesh, is_valid, message, info['statistics'], hit=False)
+
+    def clear(self) -> None:
+        """Delete every cache entry."""
+        for entry in self._entries():
+            _remove(entry)
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def _entry_path(self, source: str, program: Optional[str], allow_missing: bool) -> Path:
+        name = f"{source}\0{program or ''}" + ("\0partial" if allow_missing else '')
+        key = hashlib.blake2b(name.encode('utf-8'), digest_size=16).hexdigest()
+        return self.directory / f"{key}.npz"
+
+    @staticmethod
+    def _program_hash(program: Optional[str]) -> Optional[str]:
+        return content_hash(program) if program else None
+
+    def _entries(self):
+        if not self.directory.is_dir():
+            return []
+        return list(self.directory.glob('*.npz'))
+
+    @staticmethod
+    def _read_entry(entry: Path):
+        try:
+            with np.load(entry, allow_pickle=False) as npz:
+                info = json.loads(str(npz['info']))
+                if info.get('version') != CACHE_VERSION:
+                    return None
+                arrays = {name: npz[name] for name in npz.files if name != 'info'}
+            return info, arrays
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, KeyError):
+            # Corrupt or partially written entry: drop it and reparse
+            _remove(entry)
+            return None
+
+    def _write_entry(self, entry: Path, info: dict, arrays: dict) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                np.savez(f, info=np.array(json.dumps(info)), **arrays)
+            os.replace(tmp, entry)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+
+    def _evict(self) -> None:
+        """Remove least recently used entries until the cache fits max_bytes."""
+        entries = []
+        for entry in self._entries():
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry))
+        total = sum(size for _, size, _ in entries)
+        for _, size, entry in sorted(entries, key=lambda e: e[0]):
+            if total <= self.max_bytes:
+                break
+            _remove(entry)
+            total -= size
+
+    @staticmethod
+    def _to_cached(info: dict, arrays: dict, hit: bool) -> CachedMesh:
+        data = arrays['data']
+        metadata = ProbeMetadata.from_dict(info['metadata']) if info['metadata'] else None
+        mesh = MeshData.from_array(data, metadata)
+        mesh.mask = arrays.get('mask')
+        # The stored statistics spare a rescan when the viewers first ask
+        count = data.size if mesh.mask is None else int(np.count_nonzero(~mesh.mask))
+        mesh.seed_statistics(RunningStats.from_dict(info['statistics'], count))
+        return CachedMesh(mesh, info['is_valid'], info['message'], info['statistics'], hit)
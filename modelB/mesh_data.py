@@ -0,0 +1,277 @@
+"""
+Mesh data container and running statistics for MeshProbe
+"""
+
+import itertools
+from dataclasses import dataclass, asdict, field, fields, replace
+from datetime import datetime
+from typing import Optional, Tuple
+
+import numpy as np
+
+from flatness import FlatnessResult, remove_form
+from inpaint import inpaint
+
+# Versions are unique across all meshes, so (version, ...) keys never collide
+_versions = itertools.count(1)
+
+# Values per batch when accumulating statistics, small enough to stay in cache
+_STATS_CHUNK = 1 << 14
+
+
+@dataclass
+class RunningStats:
+    """
+    Mergeable running statistics (count, mean, variance, min, max).
+
+    Batches are combined with the parallel form of Welford's algorithm, so
+    points can be added as they arrive and partial results from separate
+    chunks merged without revisiting the data.
+    """
+    count: int = 0
+    mean: float = 0.0
+    m2: float = 0.0
+    min: float = np.inf
+    max: float = -np.inf
+
+    def update(self, values: np.ndarray) -> None:
+        """Add a batch of values."""
+        values = np.asarray(values, dtype=np.float64).ravel()
+        if values.size == 0:
+            return
+        mean = values.mean()
+        batch = RunningStats(
+            count=values.size,
+            mean=float(mean),
+            m2=float(np.square(values - mean).sum()),
+            min=float(values.min()),
+            max=float(values.max()),
+        )
+        self.merge(batch)
+
+    def merge(self, other: "RunningStats") -> "RunningStats":
+        """Fold another set of statistics into this one and return self."""
+        if other.count == 0:
+            return self
+        if self.count == 0:
+            self.count, self.mean, self.m2 = other.count, other.mean, other.m2
+            self.min, self.max = other.min, other.max
+            return self
+
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / count
+        self.m2 += other.m2 + delta * delta * self.count * other.count / count
+        self.count = count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        return self
+
+    @property
+    def variance(self) -> float:
+        """Population variance, matching np.var."""
+        return self.m2 / self.count if self.count else np.nan
+
+    @property
+    def std(self) -> float:
+        """Population standard deviation, matching np.std."""
+        return float(np.sqrt(self.variance))
+
+    @classmethod
+    def from_dict(cls, stats: dict, count: int) -> "RunningStats":
+        """Rebuild mergeable statistics of count values from as_dict() output."""
+        if count == 0:
+            return cls()
+        return cls(count=count, mean=stats['mean'], m2=stats['std'] ** 2 * count,
+                   min=stats['min'], max=stats['max'])
+
+    def as_dict(self) -> dict:
+        """Statistics in the MeshData.statistics layout."""
+        if self.count == 0:
+            return {key: np.nan for key in ('min', 'max', 'mean', 'std', 'range')}
+        return {
+            'min': self.min,
+            'max': self.max,
+            'mean': self.mean,
+            'std': self.std,
+            'range': self.max - self.min,
+        }
+
+
+@dataclass
+class ProbeMetadata:
+    """
+    Machine identity and probe grid geometry for a scan.
+
+    Identity comes from the CSV header row (company, technician, machine
+    type, serial number, x dim, y dim, mode); geometry can also come from
+    the meshprobe.nc macro assignments (#2/#3 table size, #4/#5 cell size).
+    Lengths are in inches; scanned is the ISO 8601 date and time the table
+    was probed, kept in mesh archives.
+    """
+    company: Optional[str] = None
+    technician: Optional[str] = None
+    machine_type: Optional[str] = None
+    serial_number: Optional[str] = None
+    x_dim: Optional[float] = None
+    y_dim: Optional[float] = None
+    mode: Optional[int] = None
+    x_cell: Optional[float] = None
+    y_cell: Optional[float] = None
+    scanned: Optional[str] = None
+
+    def scan_time(self) -> Optional[float]:
+        """Scan time in epoch seconds, or None when it is not recorded."""
+        return datetime.fromisoformat(self.scanned).timestamp() if self.scanned else None
+
+    def to_dict(self) -> dict:
+        return {key: value for key, value in asdict(self).items() if value is not None}
+
+    @classmethod
+    def from_dict(cls, values: dict) -> "ProbeMetadata":
+        names = {f.name for f in fields(cls)}
+        return cls(**{key: value for key, value in values.items() if key in names})
+
+    def merged(self, other: Optional["ProbeMetadata"]) -> "ProbeMetadata":
+        """Return a copy with fields missing here filled in from other."""
+        if other is None:
+            return self
+        values = other.to_dict()
+        values.update(self.to_dict())
+        return ProbeMetadata.from_dict(values)
+
+
+def _axis(count: int, extent: Optional[float], cell: Optional[float]) -> np.ndarray:
+    if extent:
+        return np.linspace(0, extent, count)
+    if cell:
+        return np.arange(count) * cell
+    # No geometry known: one unit per point, as the viewers always drew it
+    return np.linspace(0, count, count)
+
+
+@dataclass
+class MeshData:
+    """Container for mesh probe data"""
+    data: np.ndarray
+    rows: int
+    cols: int
+    # True where a point has not been measured (numpy.ma convention)
+    mask: Optional[np.ndarray] = None
+    metadata: Optional[ProbeMetadata] = None
+    # Changes whenever the data does; see touch()
+    version: int = field(default_factory=lambda: next(_versions), compare=False)
+    # (version, statistics) of the last accumulation; see running_stats()
+    _stats: Optional[Tuple[int, RunningStats]] = field(default=None, init=False,
+                                                       repr=False, compare=False)
+
+    @classmethod
+    def from_array(cls, data: np.ndarray,
+                   metadata: Optional[ProbeMetadata] = None) -> "MeshData":
+        return cls(data=data, rows=data.shape[0], cols=data.shape[1], metadata=metadata)
+
+    @classmethod
+    def empty(cls, rows: int, cols: int) -> "MeshData":
+        """Create a mesh with every point still unknown."""
+        return cls(data=np.full((rows, cols), np.nan), rows=rows, cols=cols,
+                   mask=np.ones((rows, cols), dtype=bool))
+
+    def astype(self, dtype) -> "MeshData":
+        """
+        This mesh with its data in another floating-point precision.
+        
+        Returns self when the dtype already matches. float32 halves memory
+        and bandwidth for display and densification; statistics still
+        accumulate in float64.
+        """
+        if self.data.dtype == np.dtype(dtype):
+            return self
+        return MeshData(data=self.data.astype(dtype), rows=self.rows, cols=self.cols,
+                        mask=self.mask, metadata=self.metadata)
+
+    def inpainted(self, method: str = 'biharmonic') -> "MeshData":
+        """
+        This mesh with its unmeasured points filled in from the measured ones.
+
+        Returns self when nothing is missing. See inpaint for the methods.
+        """
+        if self.mask is None or not self.mask.any():
+            return self
+        data = inpaint(self.data, self.mask, method).astype(self.data.dtype, copy=False)
+        return MeshData(data=data, rows=self.rows, cols=self.cols, metadata=self.metadata)
+
+    def touch(self) -> None:
+        """Mark the data as changed after modifying it in place."""
+        self.version = next(_versions)
+
+    @property
+    def shape(self) -> Tuple[int, int]:
+        return (self.rows, self.cols)
+
+    @property
+    def x_coords(self) -> np.ndarray:
+        """Physical X position of each column."""
+        meta = self.metadata or ProbeMetadata()
+        return _axis(self.cols, meta.x_dim, meta.x_cell)
+
+    @property
+    def y_coords(self) -> np.ndarray:
+        """Physical Y position of each row."""
+        meta = self.metadata or ProbeMetadata()
+        return _axis(self.rows, meta.y_dim, meta.y_cell)
+
+    @property
+    def extent(self) -> Tuple[float, float]:
+        """(x, y) size of the probed area."""
+        return (float(self.x_coords[-1]), float(self.y_coords[-1]))
+
+    @property
+    def known(self) -> np.ndarray:
+        """Values of the measured points as a flat array."""
+        if self.mask is None:
+            return self.data.ravel()
+        return self.data[~self.mask]
+
+    def running_stats(self) -> RunningStats:
+        """
+        Statistics of the measured points, accumulated once per data version.
+
+        The data is visited in cache-sized batches in a single pass. The
+        result is a copy, so it can be merged with statistics of other
+        meshes or chunks without disturbing the cached value.
+        """
+        if self._stats is None or self._stats[0] != self.version:
+            stats = RunningStats()
+            data = self.data.reshape(-1)
+            mask = self.mask.reshape(-1) if self.mask is not None else None
+            for start in range(0, data.size, _STATS_CHUNK):
+                chunk = data[start:start + _STATS_CHUNK]
+                if mask is not None:
+                    chunk = chunk[~mask[start:start + _STATS_CHUNK]]
+                stats.update(chunk)
+            self._stats = (self.version, stats)
+        return replace(self._stats[1])
+
+    def seed_statistics(self, stats: RunningStats) -> None:
+        """
+        Adopt statistics already accumulated elsewhere for the current data.
+
+        Used where the values were seen as they arrived (streaming ingest)
+        or were stored with the mesh (the mesh cache), so they need not be
+        scanned again.
+        """
+        self._stats = (self.version, replace(stats))
+
+    @property
+    def statistics(self) -> dict:
+        """min, max, mean, std and range (P-V) of the measured points, in float64."""
+        return self.running_stats().as_dict()
+
+    def flatness(self, order: int = 1) -> FlatnessResult:
+        """
+        Flatness after removing the best-fit form, leaving out unmeasured points.
+
+        Args:
+            order: Polynomial degree of the form; 1 removes table tilt only
+        """
+        return remove_form(self.data, self.x_coords, self.y_coords, order, self.mask)
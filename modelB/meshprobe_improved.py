@@ -6,6 +6,8 @@ Visualize and analyze CNC table flatness measurements from probe data.
 
 import sys
 import argparse
+import dataclasses
+import functools
 import tkinter as tk
 from tkinter import filedialog
 from pathlib import Path
@@ -14,17 +16,32 @@ import matplotlib as mpl
 import matplotlib.pyplot as plt
 from matplotlib import cm
 from mpl_toolkits.mplot3d import Axes3D
-from scipy.interpolate import RegularGridInterpolator
 from matplotlib.widgets import Slider, RadioButtons
 
+from background import LatestOnlyWorker
+from data_reader import ProbeDataReader
+from grid_eval import evaluate_grid, evaluate_tiled
+from inpaint import INPAINT_METHODS
+from live_ingest import LiveIngest
+from mesh_cache import MeshCache
+from mesh_data import MeshData, ProbeMetadata
+from spline_surface import SPLINE_DEGREES, SplineSurface
+from surface_cache import SurfaceCache
+from surface_lod import INTERACTIVE_MAX_FACETS, SurfacePyramid, facet_budget
+
 
 class MeshProbeAnalyzer:
     """Main class for analyzing and visualizing probe mesh data."""
     
     def __init__(self, data_file=None):
         self.data_file = data_file
-        self.data = None
-        self.interp = None
+        self.mesh = None
+        self.surface_cache = SurfaceCache()
+        self.spline = None
+        self.pyramid = None
+        self.surface = None
+        self.worker = None
+        self._dragging = False
         self.fig = None
         self.ax = None
         
@@ -32,9 +49,36 @@ class MeshProbeAnalyzer:
         self.interp_method = 'nearest'
         self.mesh_density = 10
         self.z_scale = None
-        
-    def load_data(self, file_path=None):
-        """Load probe data from file."""
+        # Storage and interpolation precision; statistics accumulate in float64
+        self.dtype = np.float64
+        # Degree of the form removed before reporting flatness (1 = plane)
+        self.form_order = 1
+        
+    @property
+    def data(self):
+        """Probe measurement array of the current mesh."""
+        return self.mesh.data if self.mesh is not None else None
+    
+    @data.setter
+    def data(self, value):
+        self.mesh = (MeshData.from_array(np.asarray(value, dtype=self.dtype))
+                     if value is not None else None)
+        
+    def load_data(self, file_path=None, nc_program=None, use_cache=True, allow_missing=False,
+                  diagnose=False):
+        """
+        Load probe data and its metadata from file.
+        
+        Args:
+            file_path: Probe data file; a file dialog opens when omitted
+            nc_program: Optional meshprobe.nc program giving the table and
+                cell size for data files that do not carry them
+            use_cache: Reuse the parsed mesh from the on-disk cache when
+                the file is unchanged
+            allow_missing: Keep scans with dropped or garbled points,
+                masking those points
+            diagnose: Check every point for spikes and print the findings
+        """
         if file_path is None:
             file_path = self._select_file()
             if not file_path:
@@ -42,24 +86,23 @@ class MeshProbeAnalyzer:
                 sys.exit(0)
         
         try:
-            # Try to read custom format (rows, cols in header)
-            with open(file_path, 'r') as file:
-                first_line = file.readline().strip()
-                second_line = file.readline().strip()
-                
-                # Check if it's the custom format
-                if first_line.isdigit() and second_line.isdigit():
-                    num_rows = int(first_line)
-                    num_cols = int(second_line)
-                    self.data = np.genfromtxt(file_path, skip_header=2)
-                    self.data = self.data.reshape(num_rows, num_cols)
-                else:
-                    # Try CSV format
-                    file.seek(0)
-                    self.data = np.genfromtxt(file_path, delimiter=',', skip_header=1)
-                    
+            if use_cache:
+                cached = MeshCache().load(file_path, nc_program=nc_program, dtype=self.dtype,
+                                          allow_missing=allow_missing)
+                self.mesh = cached.mesh
+                if not cached.is_valid:
+                    print(f"Warning: {cached.message}")
+            else:
+                self.mesh = ProbeDataReader.read_mesh(file_path, nc_program=nc_program,
+                                                      dtype=self.dtype,
+                                                      allow_missing=allow_missing)
             print(f"Loaded data shape: {self.data.shape}")
-            print(f"Data range: [{np.min(self.data):.4f}, {np.max(self.data):.4f}]")
+            stats = self.mesh.statistics
+            print(f"Data range: [{stats['min']:.4f}, {stats['max']:.4f}]")
+            if diagnose:
+                print(ProbeDataReader.diagnose_data(self.data, mask=self.mesh.mask).summary())
+            elif self.mesh.mask is not None and self.mesh.mask.any():
+                print(f"Missing points: {int(np.count_nonzero(self.mesh.mask))}")
             
         except Exception as e:
             print(f"Error loading data: {e}")
@@ -82,27 +125,40 @@ class MeshProbeAnalyzer:
         
     def setup_interpolation(self):
         """Set up the interpolation grid."""
-        # Generate grid for interpolation
-        self.x = np.linspace(0, self.data.shape[1], self.data.shape[1])
-        self.y = np.linspace(0, self.data.shape[0], self.data.shape[0])
-        
-        # Create interpolator
-        self.interp = RegularGridInterpolator(
-            (self.x, self.y),
-            self.data.T,
-            method=self.interp_method,
-            bounds_error=False,
-        )
+        # Physical probe positions of the columns and rows
+        self.x = self.mesh.x_coords
+        self.y = self.mesh.y_coords
         
         # Generate high-resolution mesh
         self._update_mesh()
         
+    def _evaluate(self, xt, yt, method):
+        """Interpolated Z on the tensor grid xt by yt."""
+        if method in SPLINE_DEGREES:
+            return self._spline_surface(method).evaluate_grid(xt, yt)
+        return evaluate_grid(self.x, self.y, self.data, xt, yt, method)
+        
+    def _spline_surface(self, method):
+        """Spline for method, fitted once per mesh version."""
+        spline = self.spline
+        if (spline is None or spline.method != method
+                or self._spline_version != self.mesh.version):
+            # Splines need every point; missing ones are filled for the fit
+            spline = SplineSurface(self.x, self.y, self.mesh.inpainted().data, method)
+            self.spline, self._spline_version = spline, self.mesh.version
+        return spline
+        
     def _update_mesh(self):
-        """Update the interpolated mesh based on current density."""
-        self.xx, self.yy = np.meshgrid(
-            np.linspace(0, self.data.shape[1], int(self.data.shape[1] * self.mesh_density)),
-            np.linspace(0, self.data.shape[0], int(self.data.shape[0] * self.mesh_density)),
-            indexing="xy",
+        """Update the interpolated surface pyramid for the current density and method."""
+        # Levels are evaluated on first display and kept in the surface cache
+        # The method is bound now; the worker may evaluate after it changes
+        self.pyramid = SurfacePyramid(
+            functools.partial(self._evaluate, method=self.interp_method),
+            (self.x[0], self.x[-1]),
+            (self.y[0], self.y[-1]),
+            (int(self.data.shape[0] * self.mesh_density), int(self.data.shape[1] * self.mesh_density)),
+            cache=self.surface_cache,
+            key=(self.interp_method, self.mesh_density, self.mesh.version),
         )
         
     def create_visualization(self):
@@ -120,6 +176,18 @@ class MeshProbeAnalyzer:
         # Add controls
         self._add_controls()
         
+        # Coarse surface while the view is dragged, fine once it is released
+        self.fig.canvas.mpl_connect('button_press_event', self._on_press)
+        self.fig.canvas.mpl_connect('button_release_event', self._on_settle)
+        self.fig.canvas.mpl_connect('resize_event', self._on_settle)
+        
+        # Surfaces for slider changes are computed off the GUI thread and
+        # picked up by a timer
+        self.worker = LatestOnlyWorker()
+        self.worker_timer = self.fig.canvas.new_timer(interval=50)
+        self.worker_timer.add_callback(self._apply_surface)
+        self.worker_timer.start()
+        
         # Add information panel
         self._add_info_panel()
         
@@ -129,37 +197,100 @@ class MeshProbeAnalyzer:
     def _update_plot(self):
         """Update the 3D surface plot."""
         self.ax.clear()
+        self.surface = None
         
         # Plot surface
-        surf = self.ax.plot_surface(
-            self.xx, self.yy, 
-            self.interp((self.xx, self.yy)), 
-            cmap=cm.plasma,
-            alpha=0.9
-        )
+        surf = self._draw_surface(facet_budget(self.ax))
         
         # Set labels and limits
         self.ax.set_xlabel('X Position')
         self.ax.set_ylabel('Y Position')
         self.ax.set_zlabel('Z Height')
         
-        self.ax.set_xlim(0, self.data.shape[1])
-        self.ax.set_ylim(0, self.data.shape[0])
-        self.ax.set_zlim(np.min(self.data), np.max(self.data))
+        x_extent, y_extent = self.mesh.extent
+        self.ax.set_xlim(0, x_extent)
+        self.ax.set_ylim(0, y_extent)
+        stats = self.mesh.statistics
+        self.ax.set_zlim(stats['min'], stats['max'])
         
         # Set aspect ratio
         if self.z_scale:
-            self.ax.set_box_aspect([self.data.shape[1], self.data.shape[0], self.z_scale])
+            self.ax.set_box_aspect([x_extent, y_extent, self.z_scale])
             
         # Add colorbar if not exists
         if not hasattr(self, 'colorbar'):
             self.colorbar = self.fig.colorbar(surf, ax=self.ax, shrink=0.5, aspect=10, pad=0.1)
             self.colorbar.set_label('Height (units)')
             
+    def _draw_surface(self, max_facets):
+        """Show the pyramid level that fits max_facets, if not already shown."""
+        level = self.pyramid.pick_level(max_facets)
+        if self._is_shown(level):
+            return self.surface
+        return self._show_level(self.pyramid.key, level, self.pyramid.level(level))
+        
+    def _is_shown(self, level):
+        return self.surface is not None and self._surface_level == (self.pyramid.key, level)
+        
+    def _show_level(self, key, level, surface):
+        """Replace the displayed surface with an evaluated pyramid level."""
+        xt, yt, z = surface
+        stats = self.mesh.statistics
+        if self.surface is not None:
+            self.surface.remove()
+        # 1D axes broadcast against Z; rcount/ccount stop plot_surface from
+        # slicing the level down further
+        self.surface = self.ax.plot_surface(
+            xt[None, :], yt[:, None], z,
+            rcount=len(yt), ccount=len(xt),
+            cmap=cm.plasma,
+            vmin=stats['min'], vmax=stats['max'],
+            alpha=0.9
+        )
+        self._surface_level = (key, level)
+        return self.surface
+        
+    def _request_surface(self, max_facets):
+        """Compute the level that fits max_facets on the worker thread."""
+        pyramid = self.pyramid
+        level = pyramid.pick_level(max_facets)
+        if self._is_shown(level):
+            # Back where we started: whatever is still computing is stale
+            self.worker.cancel()
+            return
+        # Replaces any request still waiting from an earlier slider position
+        self.worker.submit(lambda: (pyramid.key, level, pyramid.level(level)))
+        
+    def _apply_surface(self):
+        """Timer callback showing the latest surface the worker finished."""
+        result = self.worker.poll()
+        if result is None or self._dragging:
+            # Results landing mid-drag are requested again on release
+            return
+        value, error = result
+        if error is not None:
+            print(f"Error computing surface: {error}")
+            return
+        self._show_level(*value)
+        self.fig.canvas.draw_idle()
+        
+    def _on_press(self, event):
+        """Switch to a coarse surface while the 3D view is rotated or zoomed."""
+        if event.inaxes is self.ax:
+            self._dragging = True
+            self._draw_surface(INTERACTIVE_MAX_FACETS)
+            self.fig.canvas.draw_idle()
+            
+    def _on_settle(self, event):
+        """Restore the level that fits the figure once the view is still."""
+        self._dragging = False
+        if self.surface is not None:
+            self._request_surface(facet_budget(self.ax))
+            
     def _add_controls(self):
         """Add interactive controls to the plot."""
         # Z-scale slider
-        scale_mean = (self.data.shape[1] + self.data.shape[0]) / 4
+        scale_mean = sum(self.mesh.extent) / 4
         self.z_scale = scale_mean
         
         slider_ax = plt.axes([0.1, 0.05, 0.8, 0.03])
@@ -181,20 +312,36 @@ class MeshProbeAnalyzer:
         self.density_slider.on_changed(self._update_mesh_density)
         
         # Interpolation method selector
-        radio_ax = plt.axes([0.02, 0.15, 0.15, 0.1])
-        self.radio = RadioButtons(radio_ax, ('nearest', 'linear'))
+        radio_ax = plt.axes([0.02, 0.12, 0.15, 0.16])
+        methods = ('nearest', 'linear', 'cubic', 'quintic')
+        self.radio = RadioButtons(radio_ax, methods, active=methods.index(self.interp_method))
         self.radio.on_clicked(self._update_interp_method)
         
     def _add_info_panel(self):
         """Add information panel with statistics."""
-        info_text = f"""Data Statistics:
-X size: {self.data.shape[1]} points
-Y size: {self.data.shape[0]} points
-Z max : {np.max(self.data):.4f}
-Z min : {np.min(self.data):.4f}
-Z mean: {np.mean(self.data):.4f}
-Z std : {np.std(self.data):.4f}
-Z P-V : {np.max(self.data) - np.min(self.data):.4f}"""
+        x_extent, y_extent = self.mesh.extent
+        stats = self.mesh.statistics
+        flatness = self.mesh.flatness(self.form_order)
+        mask = self.mesh.mask
+        missing = f"\nMissing: {int(mask.sum())} points" if mask is not None else ''
+        info_text = ""
+        meta = self.mesh.metadata
+        if meta is not None and meta.serial_number:
+            info_text += f"Machine: {meta.machine_type or ''} {meta.serial_number}\n"
+        if meta is not None and meta.technician:
+            info_text += f"Technician: {meta.technician}\n"
+        info_text += f"""Data Statistics:
+X size: {self.data.shape[1]} points, {x_extent:g}
+Y size: {self.data.shape[0]} points, {y_extent:g}{missing}
+Z max : {stats['max']:.4f}
+Z min : {stats['min']:.4f}
+Z mean: {stats['mean']:.4f}
+Z std : {stats['std']:.4f}
+Z P-V : {stats['range']:.4f}
+
+Flatness ({'plane' if self.form_order == 1 else f'order {self.form_order} form'} removed):
+P-V   : {flatness.peak_valley:.4f}
+RMS   : {flatness.rms:.4f}"""
         
         self.fig.text(0.02, 0.5, info_text, fontsize=12, 
                      verticalalignment='center',
@@ -225,35 +372,154 @@ Z P-V : {np.max(self.data) - np.min(self.data):.4f}"""
     def _update_z_scale(self, val):
         """Update Z-axis scale."""
         self.z_scale = val
-        self.ax.set_box_aspect([self.data.shape[1], self.data.shape[0], self.z_scale])
+        self.ax.set_box_aspect([*self.mesh.extent, self.z_scale])
         plt.draw()
         
     def _update_mesh_density(self, val):
         """Update mesh density for interpolation."""
         self.mesh_density = int(val)
         self._update_mesh()
-        self._update_plot()
-        plt.draw()
+        self._request_surface(facet_budget(self.ax))
         
     def _update_interp_method(self, label):
         """Update interpolation method."""
         self.interp_method = label
-        
-        # Recreate interpolator with new method
-        self.interp = RegularGridInterpolator(
-            (self.x, self.y),
-            self.data.T,
-            method=self.interp_method,
-            bounds_error=False,
-        )
-        
-        # Update plot
-        self._update_plot()
-        plt.draw()
+        self._update_mesh()
+        self._request_surface(facet_budget(self.ax))
         
     def show(self):
         """Display the visualization."""
         plt.show()
+        if self.surface_cache.hits or self.surface_cache.misses:
+            print(self.surface_cache.summary())
+        
+    def run_live(self, source, max_fps=4.0, follow=False, nc_program=None):
+        """
+        Display a probing cycle live as the controller's DPRNT output arrives.
+        
+        Args:
+            source: 'tcp://host:port', '-' for stdin, or a named pipe path;
+                a probe file path when follow is set
+            max_fps: Upper bound on surface redraws per second
+            follow: Watch a file that is still being written, parsing only
+                the bytes appended since the last check
+            nc_program: Optional meshprobe.nc program giving the table and
+                cell size, so the live mesh is drawn in physical units
+        """
+        metadata = ProbeDataReader.parse_nc_program(nc_program) if nc_program else None
+        self.ingest = LiveIngest(source, follow=follow, metadata=metadata).start()
+        self._live_version = -1
+        
+        mpl.rcParams.update({"font.size": 14})
+        self.fig = plt.figure(figsize=(12, 8))
+        self.ax = self.fig.add_subplot(111, projection="3d")
+        self.fig.suptitle('Table Flatness Probe Mesh Analysis (live)', fontsize=20)
+        self.live_text = self.fig.text(
+            0.02, 0.5, "Waiting for data...", fontsize=12,
+            verticalalignment='center',
+            bbox=dict(boxstyle="round,pad=0.5", facecolor="lightgray"))
+        
+        # Redraws happen on the GUI thread, at most max_fps times a second
+        self.live_timer = self.fig.canvas.new_timer(interval=int(1000 / max_fps))
+        self.live_timer.add_callback(self._refresh_live)
+        self.live_timer.start()
+        
+        self._configure_window()
+        plt.show()
+        
+    def _refresh_live(self):
+        """Redraw the partial mesh if new points arrived since the last frame."""
+        ingest = self.ingest
+        with ingest.lock:
+            parser = ingest.parser
+            if parser.version == self._live_version and not ingest.finished:
+                return
+            self._live_version = parser.version
+            mesh = parser.mesh
+            z = mesh.data.copy() if mesh is not None else None
+            metadata = mesh.metadata if mesh is not None else None
+            stats = parser.stats.as_dict()
+            filled, expected, complete = parser.filled, parser.expected, parser.complete
+            
+        if ingest.finished:
+            self.live_timer.stop()
+            if complete:
+                self.mesh = MeshData.from_array(z.astype(self.dtype, copy=False), metadata)
+                
+        status = f"Points: {filled}/{expected} ({100 * filled / max(expected, 1):.0f}%)"
+        if ingest.error is not None:
+            status += f"\nERROR: {ingest.error}"
+        elif ingest.finished:
+            status += "\nScan complete" if complete else "\nStream ended early"
+            
+        if z is None:
+            self.live_text.set_text(status)
+            self.fig.canvas.draw_idle()
+            return
+            
+        self.live_text.set_text(f"""{status}
+X size: {z.shape[1]} points
+Y size: {z.shape[0]} points
+Z max : {stats['max']:.4f}
+Z min : {stats['min']:.4f}
+Z mean: {stats['mean']:.4f}
+Z std : {stats['std']:.4f}
+Z P-V : {stats['range']:.4f}""")
+        
+        self.ax.clear()
+        # Physical probe positions, as in the static view
+        grid = MeshData.from_array(z, metadata)
+        x_extent, y_extent = grid.extent
+        xg, yg = np.meshgrid(grid.x_coords, grid.y_coords, indexing="xy")
+        if filled:
+            # Unknown points are NaN, so their facets are left out
+            self.ax.plot_surface(xg, yg, z, cmap=cm.plasma, alpha=0.9,
+                                 vmin=stats['min'], vmax=stats['max'])
+            if stats['range'] > 0:
+                self.ax.set_zlim(stats['min'], stats['max'])
+        self.ax.set_xlabel('X Position')
+        self.ax.set_ylabel('Y Position')
+        self.ax.set_zlabel('Z Height')
+        self.ax.set_xlim(0, x_extent)
+        self.ax.set_ylim(0, y_extent)
+        self.ax.set_box_aspect([x_extent, y_extent, (x_extent + y_extent) / 4])
+        self.fig.canvas.draw_idle()
+        
+    def export_surface(self, file_path, density=None):
+        """
+        Write the interpolated surface to disk without holding it in memory.
+        
+        The surface is evaluated tile by tile into a memory-mapped file, so
+        the density is limited by disk space rather than RAM.
+        
+        Args:
+            file_path: '.npy' for a plain numpy array, anything else for a
+                binary mesh archive carrying the grid spacing and metadata
+            density: Points per probe point along each axis; defaults to
+                the current mesh density
+                
+        Returns:
+            (rows, cols) of the exported surface
+        """
+        density = density or self.mesh_density
+        shape = (self.data.shape[0] * density, self.data.shape[1] * density)
+        xt = np.linspace(self.x[0], self.x[-1], shape[1])
+        yt = np.linspace(self.y[0], self.y[-1], shape[0])
+        
+        if str(file_path).endswith('.npy'):
+            out = np.lib.format.open_memmap(file_path, mode='w+', dtype=self.dtype, shape=shape)
+        else:
+            spacing = (xt[1] - xt[0], yt[1] - yt[0])
+            x_extent, y_extent = self.mesh.extent
+            # Same table, finer cells
+            metadata = dataclasses.replace(
+                self.mesh.metadata or ProbeMetadata(),
+                x_dim=x_extent, y_dim=y_extent, x_cell=spacing[0], y_cell=spacing[1])
+            out = ProbeDataReader.create_binary_archive(
+                file_path, shape, dtype=self.dtype, spacing=spacing, metadata=metadata.to_dict())
+        evaluate_tiled(functools.partial(self._evaluate, method=self.interp_method), xt, yt, out)
+        out.flush()
+        return shape
         
     def export_report(self, filename):
         """Export analysis report (future feature)."""
@@ -269,11 +535,55 @@ def main():
     parser.add_argument('datafile', nargs='?', help='Path to probe data file')
     parser.add_argument('--demo', action='store_true', 
                        help='Run with demo data')
+    parser.add_argument('--nc', metavar='PROGRAM',
+                       help='meshprobe.nc program supplying table and cell size')
+    parser.add_argument('--no-cache', action='store_true',
+                       help='Always parse the data file instead of using the mesh cache')
+    parser.add_argument('--method', default='nearest',
+                       choices=['nearest', 'linear', 'cubic', 'quintic'],
+                       help='Interpolation method')
+    parser.add_argument('--export-surface', metavar='PATH',
+                       help='Write the interpolated surface to PATH (.npy or mesh archive) and exit')
+    parser.add_argument('--density', type=int, default=10,
+                       help='Interpolated points per probe point along each axis')
+    parser.add_argument('--allow-missing', action='store_true',
+                       help='Open scans with dropped or garbled points, leaving them out')
+    parser.add_argument('--fill', choices=INPAINT_METHODS,
+                       help='Fill missing points of a partial scan with this method')
+    parser.add_argument('--diagnose', action='store_true',
+                       help='Check every point for spikes such as stylus bounce and report them')
+    parser.add_argument('--form-order', type=int, default=1,
+                       help='Degree of the best-fit form removed for flatness (1 = plane)')
+    parser.add_argument('--precision', default='float64', choices=['float64', 'float32'],
+                       help='Precision of the mesh and interpolated surfaces; '
+                            'float32 halves their memory')
+    parser.add_argument('--surface-cache-mb', type=float, default=128,
+                       help='Memory for interpolated surfaces reused by the sliders')
+    parser.add_argument('--live', metavar='SOURCE',
+                       help="Show a scan live from 'tcp://host:port', '-' (stdin) or a named pipe")
+    parser.add_argument('--watch', action='store_true',
+                       help='Follow datafile while the controller is still writing it')
+    parser.add_argument('--fps', type=float, default=4.0,
+                       help='Maximum redraw rate in live and watch modes')
     
     args = parser.parse_args()
     
     # Create analyzer instance
     analyzer = MeshProbeAnalyzer()
+    analyzer.surface_cache.max_bytes = int(args.surface_cache_mb * 2**20)
+    analyzer.interp_method = args.method
+    analyzer.dtype = np.dtype(args.precision)
+    analyzer.form_order = args.form_order
+    analyzer.mesh_density = args.density
+    
+    if args.live:
+        analyzer.run_live(args.live, max_fps=args.fps, nc_program=args.nc)
+        return
+    if args.watch:
+        if not args.datafile:
+            parser.error('--watch requires a datafile')
+        analyzer.run_live(args.datafile, max_fps=args.fps, follow=True, nc_program=args.nc)
+        return
     
     # Load data
     if args.demo:
@@ -281,10 +591,18 @@ def main():
         print("Generating demo data...")
         analyzer.data = np.random.randn(20, 30) * 0.001
     else:
-        analyzer.load_data(args.datafile)
+        analyzer.load_data(args.datafile, nc_program=args.nc, use_cache=not args.no_cache,
+                           allow_missing=args.allow_missing or bool(args.fill),
+                           diagnose=args.diagnose)
+        if args.fill:
+            analyzer.mesh = analyzer.mesh.inpainted(args.fill)
     
     # Set up and display
     analyzer.setup_interpolation()
+    if args.export_surface:
+        rows, cols = analyzer.export_surface(args.export_surface)
+        print(f"Wrote {rows} x {cols} {args.method} surface to {args.export_surface}")
+        return
     analyzer.create_visualization()
     analyzer.show()
 
@@ -0,0 +1,326 @@
+#!/usr/bin/env python3
+"""
+Probing program generator for MeshProbe
+
+Writes macro-style NC programs in the manner of meshprobe.nc for an explicit
+list of XY points, so a table can be probed adaptively: a coarse raster
+first, then a second program that only visits cells where the coarse mesh
+shows high curvature or where linear interpolation is least certain. Each
+point is reported as an "X.. Y.. Z.." DPRNT line, which lets the passes be
+merged back into one irregular mesh.
+
+    python nc_generator.py coarse --x-dim 30 --y-dim 18 --cell 3 -o coarse.nc
+    python nc_generator.py refine coarse_output.txt --budget 80 -o refine.nc
+    python nc_generator.py merge coarse_output.txt refine_output.txt -o merged.txt
+"""
+
+import argparse
+from dataclasses import dataclass
+from typing import Iterable, List, Optional, Tuple
+
+import numpy as np
+from scipy.interpolate import griddata
+
+from data_reader import ProbeDataReader, ProbeFormatError
+from mesh_data import MeshData, ProbeMetadata
+
+# Decimal places used for point coordinates in generated programs
+_COORD_DECIMALS = 4
+
+
+@dataclass
+class ProbeProgramSettings:
+    """Macro variables shared with meshprobe.nc (#1 and #7-#11)."""
+    program_number: int = 1011
+    tool_offset: int = 25        # #1 probe tool offset number
+    work_offset: int = 54        # #7 G54 work coordinate set
+    start_z: float = 12.0        # #8 starting Z plane
+    protected_z: float = 0.5     # #9 protected Z height before probing
+    probe_z: float = 0.0         # #10 Z depth relative to G54 Z0
+    retract: int = 0             # #11 retract to #8 after each point
+
+
+@dataclass
+class IrregularMesh:
+    """Probe points at arbitrary XY positions, e.g. merged adaptive passes."""
+    points: np.ndarray           # (n, 2) XY positions
+    z: np.ndarray                # (n,) measured heights
+
+    @classmethod
+    def from_mesh(cls, mesh: MeshData) -> "IrregularMesh":
+        """Flatten a regular mesh into scattered points (unknown points dropped)."""
+        xx, yy = np.meshgrid(mesh.x_coords, mesh.y_coords, indexing='xy')
+        keep = np.ones(mesh.shape, dtype=bool) if mesh.mask is None else ~mesh.mask
+        return cls(np.column_stack([xx[keep], yy[keep]]), mesh.data[keep].astype(float))
+
+    def merge(self, other: "IrregularMesh") -> "IrregularMesh":
+        """
+        Combine two point sets; where both measured the same XY position
+        (to the program's coordinate precision) the later value wins.
+        """
+        points = np.concatenate([self.points, other.points])
+        z = np.concatenate([self.z, other.z])
+        keys = np.round(points, _COORD_DECIMALS)
+        # np.unique keeps the first occurrence, so search the reversed arrays
+        _, index = np.unique(keys[::-1], axis=0, return_index=True)
+        index = np.sort(len(z) - 1 - index)
+        return IrregularMesh(points[index], z[index])
+
+    def to_grid(self, x: np.ndarray, y: np.ndarray, method: str = 'linear',
+                metadata: Optional[ProbeMetadata] = None) -> MeshData:
+        """
+        Resample onto a regular grid for the viewers and analysis code.
+
+        Points outside the convex hull of the measurements are masked.
+        """
+        xx, yy = np.meshgrid(x, y, indexing='xy')
+        z = griddata(self.points, self.z, (xx, yy), method=method)
+        mesh = MeshData.from_array(z, metadata)
+        mask = np.isnan(z)
+        mesh.mask = mask if mask.any() else None
+        return mesh
+
+    def as_raster(self) -> Optional[MeshData]:
+        """Return the points as a MeshData if they form a complete raster."""
+        try:
+            grid, x, y = ProbeDataReader.points_to_grid(np.column_stack([self.points, self.z]))
+        except ProbeFormatError:
+            return None
+        if x[0] != 0 or y[0] != 0:
+            # MeshData coordinates start at the table origin
+            return None
+        return MeshData.from_array(grid, ProbeMetadata(x_dim=float(x[-1]), y_dim=float(y[-1])))
+
+
+def raster_points(x_dim: float, y_dim: float, x_cell: float,
+                  y_cell: Optional[float] = None) -> np.ndarray:
+    """Raster of points covering the table at the given cell size, row by row."""
+    y_cell = y_cell or x_cell
+    x = np.linspace(0, x_dim, int(round(x_dim / x_cell)) + 1)
+    y = np.linspace(0, y_dim, int(round(y_dim / y_cell)) + 1)
+    xx, yy = np.meshgrid(x, y, indexing='xy')
+    return np.column_stack([xx.ravel(), yy.ravel()])
+
+
+def refinement_scores(mesh: MeshData) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Score each grid cell for refinement.
+
+    Returns:
+        (curvature, uncertainty), each (rows-1, cols-1). Curvature is the
+        largest |Laplacian| of Z at the cell corners; uncertainty is how far
+        the two diagonal triangulations of the cell disagree at its centre,
+        i.e. the bilinear twist that coarse linear interpolation cannot see.
+    """
+    z = mesh.data.astype(float)
+    x, y = mesh.x_coords, mesh.y_coords
+    d2x = np.gradient(np.gradient(z, x, axis=1), x, axis=1)
+    d2y = np.gradient(np.gradient(z, y, axis=0), y, axis=0)
+    laplacian = np.abs(d2x + d2y)
+
+    corners = np.stack([laplacian[:-1, :-1], laplacian[:-1, 1:],
+                        laplacian[1:, :-1], laplacian[1:, 1:]])
+    curvature = corners.max(axis=0)
+    uncertainty = np.abs(z[:-1, :-1] + z[1:, 1:] - z[:-1, 1:] - z[1:, :-1]) / 2
+    return curvature, uncertainty
+
+
+def plan_refinement(mesh: MeshData, budget: Optional[int] = None,
+                    threshold: float = 1.0, subdivide: int = 2) -> np.ndarray:
+    """
+    Choose additional probe points for a second, refining pass.
+
+    Cells are ranked by the mean of their curvature and uncertainty scores,
+    each scaled by its median over the mesh. Cells scoring above
+    `threshold` times the median level are refined, best first, until
+    `budget` new points have been planned.
+
+    Args:
+        mesh: Coarse mesh with physical coordinates
+        budget: Maximum number of new points; unlimited when None
+        threshold: Multiple of the typical score a cell must exceed
+        subdivide: Each chosen cell is split into subdivide x subdivide
+
+    Returns:
+        (n, 2) array of new XY points, none of which repeat coarse points
+    """
+    if mesh.mask is not None and mesh.mask.any():
+        raise ValueError("Refinement planning needs a complete coarse mesh")
+    curvature, uncertainty = refinement_scores(mesh)
+
+    def scaled(score):
+        typical = np.median(score)
+        return score / typical if typical > 0 else score / (score.max() or 1.0)
+
+    score = (scaled(curvature) + scaled(uncertainty)) / 2
+    order = np.argsort(score, axis=None)[::-1]
+    order = order[score.ravel()[order] > threshold]
+
+    x, y = mesh.x_coords, mesh.y_coords
+    steps = np.linspace(0, 1, subdivide + 1)
+    su, sv = np.meshgrid(steps, steps, indexing='xy')
+    # Sub-grid offsets inside a cell, excluding the four coarse corners
+    interior = ~(np.isin(su, (0, 1)) & np.isin(sv, (0, 1)))
+    su, sv = su[interior], sv[interior]
+
+    existing = {tuple(p) for p in np.round(IrregularMesh.from_mesh(mesh).points, _COORD_DECIMALS)}
+    planned: List[Tuple[float, float]] = []
+    for flat in order:
+        row, col = np.unravel_index(flat, score.shape)
+        px = x[col] + su * (x[col + 1] - x[col])
+        py = y[row] + sv * (y[row + 1] - y[row])
+        new = []
+        for point in zip(np.round(px, _COORD_DECIMALS), np.round(py, _COORD_DECIMALS)):
+            if point not in existing:
+                existing.add(point)
+                new.append(point)
+        if budget is not None and len(planned) + len(new) > budget:
+            break
+        planned.extend(new)
+
+    return np.array(planned, dtype=float).reshape(-1, 2)
+
+
+def generate_program(points: Iterable[Tuple[float, float]],
+                     settings: Optional[ProbeProgramSettings] = None,
+                     title: str = 'ADAPTIVE MESH PROBE OF TABLE SURFACE') -> str:
+    """
+    Write an NC program probing each XY point in the given order.
+
+    The preamble, probe cycles and macro variables follow meshprobe.nc.
+    Every point is probed by the local subroutine N1000, which reports it
+    as "X.. Y.. Z.." with DPRNT.
+    """
+    settings = settings or ProbeProgramSettings()
+    s = settings
+    lines = [
+        '%',
+        f'O{s.program_number:05d}',
+        f'({title.upper()})',
+        '',
+        '(MACRO ASSIGNMENTS SHARED WITH MESHPROBE.NC)',
+        f'#1 = {s.tool_offset} (PROBE TOOL OFFSET NUMBER)',
+        f'#7 = {s.work_offset} (G54 WORK COORDINATE SET)',
+        f'#8 = {s.start_z:g} (STARTING Z PLANE)',
+        f'#9 = {s.protected_z:g} (PROTECTED Z HEIGHT BEFORE PROBING)',
+        f'#10 = {s.probe_z:g} (Z DEPTH RELATIVE G54Z0. PROBING TABLE, SO Z0)',
+        f'#11 = {s.retract} (RETRACT TO #8 AFTER EACH POINT? 0= NO, 1= YES)',
+        '',
+        'G103 P1',
+        'G90 G80 G40 G0 (PREP CODES)',
+        '',
+        'G53 Z0 (RAPID MOVE TO MACHINE ZERO IN Z- SAFE DISTANCE)',
+        'G#7 X0 Y0 (RAPID MOVE TO G54 XY HOME)',
+        'T#1 M6',
+        'G43 H#1 Z#8 (ACTIVATE TOOL OFFSET 1 AND RAPID MOVE TO Z#8- DEFAULT 12.)',
+        '',
+        'G65 P9832 (SPIN THE PROBE ON)',
+        '',
+        '(POINT LIST: #22 = X, #23 = Y, PROBED AND REPORTED BY N1000)',
+    ]
+    count = 0
+    for px, py in points:
+        lines += [f'#22 = {px:.{_COORD_DECIMALS}f}',
+                  f'#23 = {py:.{_COORD_DECIMALS}f}',
+                  'M97 P1000']
+        count += 1
+    lines += [
+        '',
+        'DPRNT [](PRINT BLANK LINE TO END DATA BLOCK)',
+        'G65 P9833 (PROBE OFF)',
+        'G53 G0 Z0',
+        'G40',
+        'G53 X0Y0',
+        'M30',
+        '',
+        f'N1000 (PROBE ONE POINT- {count} CALLS)',
+        'G#7 X#22 Y#23 (MOVE TO XY POS)',
+        'G65 P9810 Z#9 (PROTECTED MOVE TO .5 ABOVE SURFACE)',
+        'G65 P9811 Z#10 (PROBE SURFACE- DEFAULT OVERTRAVEL IS 4MM BELOW SURFACE)',
+        'IF [ #11 EQ 0 ] GOTO1100',
+        'G65 P9810 Z#8',
+        'N1100',
+        'DPRNT [X#22[44]*Y#23[44]*Z#187[44]]',
+        'M99',
+        '%',
+    ]
+    return '\n'.join(lines) + '\n'
+
+
+def read_point_output(file_path: str) -> IrregularMesh:
+    """
+    Read the "X.. Y.. Z.." DPRNT output of a generated program.
+
+    Raises:
+        ProbeFormatError: With the line number of any other non-blank line
+    """
+    data = ProbeDataReader.read_points_format(file_path)
+    return IrregularMesh(data[:, :2], data[:, 2])
+
+
+def write_point_output(mesh: IrregularMesh, file_path: str) -> None:
+    """Write points in the same "X.. Y.. Z.." layout the programs report."""
+    table = np.column_stack([mesh.points, mesh.z])
+    with open(file_path, 'w') as f:
+        ProbeDataReader.write_rows(f, table, "X%.4f Y%.4f Z%.4f\n")
+
+
+def _load_coarse(file_path: str) -> MeshData:
+    """Load a coarse pass from generated-program output or any mesh file."""
+    try:
+        mesh = read_point_output(file_path).as_raster()
+    except ProbeFormatError:
+        return ProbeDataReader.read_mesh(file_path)
+    if mesh is None:
+        raise ValueError(f"{file_path}: coarse points do not form a complete raster")
+    return mesh
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate adaptive probing NC programs')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    coarse = sub.add_parser('coarse', help='Coarse raster program')
+    coarse.add_argument('--x-dim', type=float, required=True, help='X table dimension')
+    coarse.add_argument('--y-dim', type=float, required=True, help='Y table dimension')
+    coarse.add_argument('--cell', type=float, required=True, help='Coarse grid cell size')
+    coarse.add_argument('-o', '--output', required=True, help='NC program to write')
+
+    refine = sub.add_parser('refine', help='Refinement program from a coarse pass')
+    refine.add_argument('coarse_output', help='DPRNT output (or mesh file) of the coarse pass')
+    refine.add_argument('--budget', type=int, help='Maximum number of new points')
+    refine.add_argument('--threshold', type=float, default=1.0,
+                        help='Score multiple of the median a cell must exceed')
+    refine.add_argument('--subdivide', type=int, default=2, help='Cell subdivision factor')
+    refine.add_argument('-o', '--output', required=True, help='NC program to write')
+
+    merge = sub.add_parser('merge', help='Merge pass outputs into one irregular mesh')
+    merge.add_argument('outputs', nargs='+', help='DPRNT point outputs, coarse first')
+    merge.add_argument('-o', '--output', required=True, help='Merged point file to write')
+
+    args = parser.parse_args()
+
+    if args.command == 'coarse':
+        points = raster_points(args.x_dim, args.y_dim, args.cell)
+        title = f'COARSE MESH PROBE {args.x_dim:g}X{args.y_dim:g} AT {args.cell:g}'
+        program = generate_program(points, title=title)
+    elif args.command == 'refine':
+        mesh = _load_coarse(args.coarse_output)
+        points = plan_refinement(mesh, args.budget, args.threshold, args.subdivide)
+        program = generate_program(points, ProbeProgramSettings(program_number=1012),
+                                   title='REFINEMENT MESH PROBE')
+    else:
+        merged = read_point_output(args.outputs[0])
+        for path in args.outputs[1:]:
+            merged = merged.merge(read_point_output(path))
+        write_point_output(merged, args.output)
+        print(f"Merged {len(merged.z)} points into {args.output}")
+        return
+
+    with open(args.output, 'w') as f:
+        f.write(program)
+    print(f"Wrote {len(points)} probe points to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
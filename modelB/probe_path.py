@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+"""
+Probe path planning for MeshProbe
+
+meshprobe.nc visits the grid column by column, sending Y back to zero at the
+end of every column. These helpers order the points as a serpentine or a
+near-optimal tour (nearest neighbour followed by 2-opt), estimate the rapid
+travel saved, and write the reordered program with nc_generator. Generated
+programs report "X.. Y.. Z.." for each point, so ProbeDataReader places the
+results back on the grid no matter which order they were probed in.
+
+    python probe_path.py --x-dim 30 --y-dim 18 --cell 1 -o mesh.nc
+    python probe_path.py --program refine.nc --method tour -o refine_tour.nc
+"""
+
+import argparse
+import re
+from dataclasses import dataclass
+from typing import Sequence
+
+import numpy as np
+
+from nc_generator import ProbeProgramSettings, generate_program, raster_points
+
+# Decimals to which coordinates are grouped into rows and columns
+_GROUP_DECIMALS = 4
+
+# Typical rapid traverse rate of a VMC, inches per minute
+DEFAULT_RAPID_IPM = 1000.0
+
+# Point assignments in a program written by nc_generator
+_PROGRAM_POINT = re.compile(r'^#22 = (\S+)\s*\n#23 = (\S+)\s*$', re.MULTILINE)
+
+
+@dataclass
+class PathPlan:
+    """An ordering of probe points and the travel it implies."""
+    method: str
+    order: np.ndarray            # indices into the original point array
+    length: float                # XY travel from the start position, inches
+
+    def travel_time(self, rapid_ipm: float = DEFAULT_RAPID_IPM) -> float:
+        """Estimated rapid travel time in seconds."""
+        return self.length / rapid_ipm * 60.0
+
+
+def path_length(points: np.ndarray, order: Sequence[int],
+                start: Sequence[float] = (0.0, 0.0)) -> float:
+    """Length of the open path from start through points in the given order."""
+    route = np.vstack([np.asarray(start, dtype=float), points[np.asarray(order)]])
+    return float(np.hypot(*np.diff(route, axis=0).T).sum())
+
+
+def column_raster_order(points: np.ndarray) -> np.ndarray:
+    """The meshprobe.nc order: columns of constant X, Y ascending in each."""
+    keys = np.round(points, _GROUP_DECIMALS)
+    return np.lexsort((keys[:, 1], keys[:, 0]))
+
+
+def serpentine_order(points: np.ndarray, along: str = 'x') -> np.ndarray:
+    """
+    Boustrophedon order: sweep each row (or column) and reverse direction
+    on the next, so there is no long return move at the end of a line.
+
+    Args:
+        points: (n, 2) XY points; need not form a complete grid
+        along: 'x' to sweep rows along X, 'y' to sweep columns along Y
+    """
+    keys = np.round(points, _GROUP_DECIMALS)
+    sweep, line = (0, 1) if along == 'x' else (1, 0)
+    _, line_index = np.unique(keys[:, line], return_inverse=True)
+    line_index = line_index.ravel()
+    # Odd lines run backwards
+    direction = np.where(line_index % 2, -1.0, 1.0)
+    return np.lexsort((keys[:, sweep] * direction, line_index))
+
+
+def nearest_neighbor_order(points: np.ndarray,
+                           start: Sequence[float] = (0.0, 0.0)) -> np.ndarray:
+    """Greedy tour: always move to the closest point not yet probed."""
+    remaining = np.ones(len(points), dtype=bool)
+    order = np.empty(len(points), dtype=int)
+    position = np.asarray(start, dtype=float)
+    for step in range(len(points)):
+        dist = np.hypot(*(points - position).T)
+        dist[~remaining] = np.inf
+        nearest = int(np.argmin(dist))
+        order[step] = nearest
+        remaining[nearest] = False
+        position = points[nearest]
+    return order
+
+
+def two_opt(points: np.ndarray, order: np.ndarray,
+            start: Sequence[float] = (0.0, 0.0), max_passes: int = 20) -> np.ndarray:
+    """
+    Improve an open path with 2-opt segment reversals.
+
+    For each edge the best reversal over all later edges is found in one
+    vectorised step; passes repeat until no reversal shortens the path.
+    """
+    order = np.array(order, dtype=int)
+    route = np.vstack([np.asarray(start, dtype=float), points[order]])
+    n = len(route)
+    for _ in range(max_passes):
+        improved = False
+        for i in range(1, n - 1):
+            a, b = route[i - 1], route[i]
+            c = route[i + 1:]                        # candidate segment ends j
+            d = np.vstack([route[i + 2:], [np.nan, np.nan]])
+            ab = np.hypot(*(b - a))
+            gain = np.hypot(*(c - a).T) - ab
+            tail = np.hypot(*(d - b).T) - np.hypot(*(d - c).T)
+            # The last point has no following edge to reconnect
+            gain += np.nan_to_num(tail)
+            j = int(np.argmin(gain))
+            if gain[j] < -1e-9:
+                end = i + 1 + j
+                route[i:end + 1] = route[i:end + 1][::-1].copy()
+                order[i - 1:end] = order[i - 1:end][::-1].copy()
+                improved = True
+        if not improved:
+            break
+    return order
+
+
+def plan_path(points: np.ndarray, method: str = 'auto',
+              start: Sequence[float] = (0.0, 0.0)) -> PathPlan:
+    """
+    Order probe points to shorten travel.
+
+    Args:
+        points: (n, 2) XY points
+        method: 'raster' (meshprobe.nc order), 'serpentine', 'tour'
+            (nearest neighbour + 2-opt) or 'auto' for the shortest of
+            serpentine and tour
+        start: Spindle XY position before the first point
+    """
+    if method == 'raster':
+        candidates = {'raster': column_raster_order(points)}
+    elif method == 'serpentine':
+        candidates = {'serpentine': serpentine_order(points, 'x'),
+                      'serpentine-y': serpentine_order(points, 'y')}
+    elif method == 'tour':
+        candidates = {'tour': two_opt(points, nearest_neighbor_order(points, start), start)}
+    elif method == 'auto':
+        candidates = {'serpentine': serpentine_order(points, 'x'),
+                      'serpentine-y': serpentine_order(points, 'y'),
+                      'tour': two_opt(points, nearest_neighbor_order(points, start), start)}
+    else:
+        raise ValueError(f"Unknown path method: {method}")
+
+    plans = [PathPlan(name, order, path_length(points, order, start))
+             for name, order in candidates.items()]
+    return min(plans, key=lambda plan: plan.length)
+
+
+def restore_grid_order(values: np.ndarray, order: np.ndarray,
+                       shape: Sequence[int]) -> np.ndarray:
+    """
+    Put Z values reported in path order back into row-major grid order.
+
+    For Z-only output (no XY on each line) of a program probing
+    raster_points in the given order.
+    """
+    grid = np.empty(len(order), dtype=np.asarray(values).dtype)
+    grid[np.asarray(order)] = values
+    return grid.reshape(shape)
+
+
+def read_program_points(file_path: str) -> np.ndarray:
+    """Read the point list of a program written by nc_generator."""
+    with open(file_path, 'r') as f:
+        pairs = _PROGRAM_POINT.findall(f.read())
+    return np.array(pairs, dtype=float).reshape(-1, 2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Reorder probe points to cut travel time')
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--program', help='Program from nc_generator.py to reorder')
+    source.add_argument('--x-dim', type=float, help='X table dimension for a full raster')
+    parser.add_argument('--y-dim', type=float, help='Y table dimension for a full raster')
+    parser.add_argument('--cell', type=float, help='Grid cell size for a full raster')
+    parser.add_argument('--method', default='auto',
+                        choices=['auto', 'serpentine', 'tour', 'raster'])
+    parser.add_argument('--rapid', type=float, default=DEFAULT_RAPID_IPM,
+                        help='Rapid traverse rate in inches per minute')
+    parser.add_argument('-o', '--output', help='Reordered NC program to write')
+    args = parser.parse_args()
+
+    if args.program:
+        points = read_program_points(args.program)
+        baseline = PathPlan('as written', np.arange(len(points)),
+                            path_length(points, np.arange(len(points))))
+    else:
+        if args.y_dim is None or args.cell is None:
+            parser.error('--x-dim needs --y-dim and --cell')
+        points = raster_points(args.x_dim, args.y_dim, args.cell)
+        baseline = plan_path(points, 'raster')
+
+    plan = plan_path(points, args.method)
+    saved = baseline.length - plan.length
+    print(f"Points: {len(points)}")
+    print(f"{baseline.method:>12}: {baseline.length:9.1f} in  "
+          f"{baseline.travel_time(args.rapid):7.1f} s")
+    print(f"{plan.method:>12}: {plan.length:9.1f} in  {plan.travel_time(args.rapid):7.1f} s")
+    print(f"{'saved':>12}: {saved:9.1f} in  {saved / args.rapid * 60:7.1f} s "
+          f"at {args.rapid:g} ipm")
+
+    if args.output:
+        program = generate_program(points[plan.order], ProbeProgramSettings(),
+                                   title=f'MESH PROBE OF TABLE SURFACE- {plan.method.upper()} PATH')
+        with open(args.output, 'w') as f:
+            f.write(program)
+        print(f"Wrote {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+"""
+Smooth spline surfaces through probe meshes for MeshProbe
+
+RegularGridInterpolator solves its cubic and quintic systems again on every
+call, which makes those methods unusable at display densities. SplineSurface
+fits an interpolating tensor-product B-spline once per mesh; the stored
+coefficients are then evaluated cheaply on tensor grids or at scattered
+points, along with partial derivatives (slope of the table surface).
+"""
+
+from typing import Tuple
+
+import numpy as np
+from scipy.interpolate import RectBivariateSpline
+
+from grid_eval import surface_dtype
+
+# Interpolation method name -> spline degree
+SPLINE_DEGREES = {'cubic': 3, 'quintic': 5}
+
+
+class SplineSurface:
+    """Interpolating spline surface fitted once to a gridded mesh."""
+
+    def __init__(self, x: np.ndarray, y: np.ndarray, values: np.ndarray,
+                 method: str = 'cubic'):
+        """
+        Args:
+            x: Column positions of values, strictly increasing
+            y: Row positions of values, strictly increasing
+            values: (rows, cols) array of Z heights
+            method: 'cubic' or 'quintic'
+
+        Raises:
+            ValueError: If method is unknown or the mesh has fewer than two
+                points along an axis
+        """
+        if method not in SPLINE_DEGREES:
+            raise ValueError(f"Unknown spline method: {method}")
+        x = np.asarray(x, dtype=float)
+        y = np.asarray(y, dtype=float)
+        if len(x) < 2 or len(y) < 2:
+            raise ValueError("A spline surface needs at least two points along each axis")
+        self.method = method
+        self.x = x
+        self.y = y
+        # Coefficients are always float64; results come back in this type
+        self.dtype = surface_dtype(values)
+        # Small meshes cannot carry the full degree along a short axis
+        degree = SPLINE_DEGREES[method]
+        self._spline = RectBivariateSpline(y, x, np.asarray(values, dtype=float),
+                                           kx=min(degree, len(y) - 1),
+                                           ky=min(degree, len(x) - 1), s=0)
+
+    def evaluate_grid(self, xt: np.ndarray, yt: np.ndarray,
+                      dx: int = 0, dy: int = 0) -> np.ndarray:
+        """
+        Evaluate the surface (or a partial derivative) on the tensor grid xt by yt.
+
+        Args:
+            xt: Target X positions, ascending
+            yt: Target Y positions, ascending
+            dx: Order of the derivative in X
+            dy: Order of the derivative in Y
+
+        Returns:
+            (len(yt), len(xt)) array, NaN outside the probed area
+        """
+        xt = np.asarray(xt, dtype=float)
+        yt = np.asarray(yt, dtype=float)
+        result = self._spline(yt, xt, dx=dy, dy=dx, grid=True).astype(self.dtype, copy=False)
+        result[~self._inside(yt, self.y), :] = np.nan
+        result[:, ~self._inside(xt, self.x)] = np.nan
+        return result
+
+    def __call__(self, x: np.ndarray, y: np.ndarray, dx: int = 0, dy: int = 0) -> np.ndarray:
+        """Evaluate at scattered points (x[i], y[i]); NaN outside the probed area."""
+        x = np.asarray(x, dtype=float)
+        y = np.asarray(y, dtype=float)
+        result = np.asarray(self._spline.ev(y, x, dx=dy, dy=dx), dtype=self.dtype)
+        result[~(self._inside(x, self.x) & self._inside(y, self.y))] = np.nan
+        return result
+
+    def gradient_grid(self, xt: np.ndarray, yt: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """(dZ/dX, dZ/dY) on the tensor grid xt by yt."""
+        return self.evaluate_grid(xt, yt, dx=1), self.evaluate_grid(xt, yt, dy=1)
+
+    @staticmethod
+    def _inside(targets: np.ndarray, axis: np.ndarray) -> np.ndarray:
+        return (targets >= axis[0]) & (targets <= axis[-1])
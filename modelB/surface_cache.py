@@ -0,0 +1,89 @@
+"""
+In-memory cache of interpolated surfaces for MeshProbe viewers
+
+Dragging the density slider or switching interpolation methods re-evaluates
+the interpolator on the full display grid, even for a combination shown a
+moment earlier. SurfaceCache keeps recently evaluated Z grids keyed by
+(method, density, mesh version), bounded by total array size and evicting
+the least recently used surface first. It may be shared between the GUI
+thread and a background worker.
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Callable, Hashable, Optional
+
+import numpy as np
+
+DEFAULT_MAX_BYTES = 128 * 1024 * 1024
+
+
+class SurfaceCache:
+    """Memory-bounded LRU cache of evaluated surface arrays."""
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Hashable, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable) -> Optional[np.ndarray]:
+        """Return the cached surface for key, or None, counting the lookup."""
+        with self._lock:
+            surface = self._entries.get(key)
+            if surface is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return surface
+
+    def put(self, key: Hashable, surface: np.ndarray) -> np.ndarray:
+        """
+        Store a surface and return it, read-only.
+
+        Surfaces larger than the whole budget are returned without caching.
+        """
+        surface = np.asarray(surface)
+        surface.setflags(write=False)
+        if surface.nbytes > self.max_bytes:
+            return surface
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.nbytes -= old.nbytes
+            self._entries[key] = surface
+            self.nbytes += surface.nbytes
+            while self.nbytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.nbytes -= evicted.nbytes
+        return surface
+
+    def get_or_compute(self, key: Hashable,
+                       compute: Callable[[], np.ndarray]) -> np.ndarray:
+        """Return the cached surface for key, calling compute() on a miss."""
+        surface = self.get(key)
+        if surface is None:
+            surface = self.put(key, compute())
+        return surface
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.nbytes = 0
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def summary(self) -> str:
+        """One-line usage report for sizing max_bytes."""
+        return (f"Surface cache: {self.hits} hits, {self.misses} misses "
+                f"({100 * self.hit_rate:.0f}% hit rate), {len(self)} surfaces, "
+                f"{self.nbytes / 2**20:.1f} of {self.max_bytes / 2**20:.0f} MB")
@@ -0,0 +1,94 @@
+"""
+Level-of-detail pyramid for MeshProbe surface display
+
+plot_surface cost grows with the number of facets, and by default it slices
+any larger input down to 50x50 samples, so evaluating the surface at the
+full slider density is mostly wasted. SurfacePyramid describes the surface
+at halving resolutions and evaluates a level only when it is first shown.
+The viewers draw the level that fits the figure while the view is still and
+a coarse level while it is being rotated or zoomed.
+"""
+
+import math
+from typing import Callable, Optional, Tuple
+
+import numpy as np
+
+from surface_cache import SurfaceCache
+
+# Facets drawn when the view is still, and while it is being dragged
+DEFAULT_MAX_FACETS = 10000
+INTERACTIVE_MAX_FACETS = 1500
+
+# Screen pixels per facet edge below which extra detail is not visible
+PIXELS_PER_FACET = 8
+
+# Levels stop halving once an axis is down to this many points
+_MIN_POINTS = 5
+
+
+def facet_budget(ax, max_facets: int = DEFAULT_MAX_FACETS,
+                 pixels_per_facet: int = PIXELS_PER_FACET) -> int:
+    """Number of facets worth drawing in an axes at its current size."""
+    bbox = ax.get_window_extent()
+    visible = int(bbox.width / pixels_per_facet) * int(bbox.height / pixels_per_facet)
+    return max(1, min(max_facets, visible))
+
+
+class SurfacePyramid:
+    """
+    Lazily evaluated multi-resolution surface.
+
+    Level 0 is the full resolution; each further level has about half the
+    points along each axis, spanning the same area.
+    """
+
+    def __init__(self, evaluate: Callable[[np.ndarray, np.ndarray], np.ndarray],
+                 x_range: Tuple[float, float], y_range: Tuple[float, float],
+                 shape: Tuple[int, int], cache: Optional[SurfaceCache] = None,
+                 key: tuple = ()):
+        """
+        Args:
+            evaluate: Function of (xt, yt) axes returning the (len(yt), len(xt))
+                surface on that tensor grid
+            x_range: (first, last) X position
+            y_range: (first, last) Y position
+            shape: (rows, cols) of the full-resolution level
+            cache: Where evaluated levels are kept; a private cache if omitted
+            key: Identifies the surface in a shared cache, e.g.
+                (method, density, mesh version)
+        """
+        self.evaluate = evaluate
+        self.x_range = x_range
+        self.y_range = y_range
+        self.shape = (max(2, shape[0]), max(2, shape[1]))
+        self.cache = cache if cache is not None else SurfaceCache()
+        self.key = key
+
+    @property
+    def depth(self) -> int:
+        """Number of levels."""
+        halvings = math.log2(max(1, (min(self.shape) - 1) / (_MIN_POINTS - 1)))
+        return 1 + int(halvings)
+
+    def level_shape(self, level: int) -> Tuple[int, int]:
+        """(rows, cols) of a level."""
+        return tuple(max(2, math.ceil((n - 1) / 2 ** level) + 1) for n in self.shape)
+
+    def level_axes(self, level: int) -> Tuple[np.ndarray, np.ndarray]:
+        rows, cols = self.level_shape(level)
+        return np.linspace(*self.x_range, cols), np.linspace(*self.y_range, rows)
+
+    def level(self, level: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """(xt, yt, z) of a level, evaluated on first use."""
+        xt, yt = self.level_axes(level)
+        z = self.cache.get_or_compute(self.key + (level,), lambda: self.evaluate(xt, yt))
+        return xt, yt, z
+
+    def pick_level(self, max_facets: int) -> int:
+        """Finest level with no more than max_facets facets."""
+        for level in range(self.depth):
+            rows, cols = self.level_shape(level)
+            if (rows - 1) * (cols - 1) <= max_facets:
+                return level
+        return self.depth - 1
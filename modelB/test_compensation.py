@@ -0,0 +1,44 @@
+"""Tests for compensation table export."""
+
+import io
+
+import numpy as np
+import pytest
+
+from compensation import CompensationTable, check_variables, write_macro, write_text
+from data_reader import ProbeDataReader
+
+
+def _table(rows, cols):
+    values = np.arange(rows * cols, dtype=float).reshape(rows, cols) / 10000
+    return CompensationTable(values, 0.0, 0.0, 1.0, 1.0)
+
+
+def test_macro_assigns_consecutive_variables():
+    out = io.StringIO()
+    write_macro(_table(3, 4), out)
+    assignments = [line for line in out.getvalue().splitlines() if line.startswith('#')]
+    assert assignments[0] == '#10000 = 0.0000'
+    assert assignments[-1] == '#10011 = 0.0011'
+    assert len(assignments) == 12
+
+
+def test_macro_refuses_tables_past_general_purpose_variables():
+    out = io.StringIO()
+    with pytest.raises(ValueError, match='1001 cells'):
+        write_macro(_table(7, 143), out)
+    assert out.getvalue() == ''
+
+
+def test_macro_refuses_base_below_range():
+    with pytest.raises(ValueError):
+        check_variables(_table(2, 2), base=9999)
+    check_variables(_table(10, 100), base=10000)
+
+
+def test_text_round_trips_through_reader():
+    table = _table(5, 6)
+    out = io.StringIO()
+    write_text(table, out)
+    out.seek(0)
+    np.testing.assert_allclose(ProbeDataReader.parse_custom_stream(out), table.values)
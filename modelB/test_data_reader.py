@@ -0,0 +1,198 @@
+"""Tests for probe data reading and validation."""
+
+import io
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from data_reader import POINT_SPIKE, ProbeDataReader, ProbeFormatError, UnknownFormatError
+
+
+SAMPLES = Path(__file__).resolve().parent.parent
+
+
+def _parse(text):
+    return ProbeDataReader.parse_custom_stream(io.StringIO(text), 'scan.txt',
+                                               allow_missing=True)
+
+
+def _custom(rows, num_rows=4, num_cols=3):
+    blocks = ["".join(f"{v}\n" for v in row) for row in rows]
+    return f"{num_rows}\n{num_cols}\n\n" + "\n".join(blocks) + "\n"
+
+
+def test_missing_separator_splits_merged_block():
+    text = _custom([[1, 2, 3], [4, 5, 6, 7, 8, 9], [10, 11, 12]])
+    np.testing.assert_array_equal(_parse(text), np.arange(1, 13).reshape(4, 3))
+
+
+def test_dropped_line_masks_only_the_row_tail():
+    data = _parse(_custom([[1, 2, 3], [4, 6], [7, 8, 9], [10, 11, 12]]))
+    np.testing.assert_array_equal(data, [[1, 2, 3], [4, 6, np.nan], [7, 8, 9], [10, 11, 12]])
+
+
+def test_dropped_line_without_separators_is_rejected():
+    text = "4\n3\n\n" + "".join(f"{v}\n" for v in [1, 2, 3, 4, 6, 7, 8, 9, 10, 11, 12])
+    with pytest.raises(ProbeFormatError):
+        _parse(text)
+
+
+def test_truncated_file_masks_rows_at_end():
+    data = _parse(_custom([[1, 2, 3], [4, 5, 6]]))
+    np.testing.assert_array_equal(data[:2], [[1, 2, 3], [4, 5, 6]])
+    assert np.isnan(data[2:]).all()
+
+
+def test_unplaceable_block_is_rejected():
+    # Two rows merged with a dropped value, then the file ends early
+    with pytest.raises(ProbeFormatError):
+        _parse(_custom([[1, 2, 3], [4, 5, 7, 8, 9]]))
+
+
+def test_clean_noisy_mesh_has_no_spikes():
+    rng = np.random.default_rng(0)
+    for _ in range(20):
+        data = rng.normal(0, 0.0005, (30, 30))
+        assert ProbeDataReader.diagnose_data(data).counts['spike'] == 0
+
+
+@pytest.mark.parametrize('name', ['random_data.txt', 'test.csv'])
+def test_sample_scans_have_no_spikes(name):
+    data = ProbeDataReader.read_file(str(SAMPLES / name))
+    assert ProbeDataReader.diagnose_data(data).counts['spike'] == 0
+
+
+def test_injected_spike_is_reported():
+    data = np.random.default_rng(1).normal(0, 0.0005, (30, 30))
+    data[12, 7] += 0.01
+    report = ProbeDataReader.diagnose_data(data)
+    assert report.is_valid
+    assert report.counts['spike'] == 1
+    np.testing.assert_array_equal(report.points(POINT_SPIKE), [[12, 7]])
+
+
+def _strict(text):
+    return ProbeDataReader.parse_custom_stream(io.StringIO(text), 'scan.txt')
+
+
+def test_custom_format_parses_rows_in_one_pass():
+    np.testing.assert_array_equal(_strict(_custom([[1, 2, 3], [4, 5, 6]], num_rows=2)),
+                                  [[1, 2, 3], [4, 5, 6]])
+
+
+@pytest.mark.parametrize('text, line', [
+    ("2\n2\n\n1\n2\n\n3\nx\n\n", 8),        # unreadable value
+    ("2\n2\n\n1\n2\n\n3\nnan\n\n", 8),      # non-finite value
+    ("2\n2\n\n1\n2\n\n3\n4\n5\n", 9),       # one value too many
+    ("2\n0\n\n", 2),                        # bad column count
+])
+def test_custom_format_errors_name_the_line(text, line):
+    with pytest.raises(ProbeFormatError) as error:
+        _strict(text)
+    assert error.value.line == line
+
+
+def test_custom_format_rejects_missing_values():
+    with pytest.raises(ProbeFormatError, match='1 missing'):
+        _strict("2\n2\n\n1\n2\n\n3\n")
+
+
+@pytest.mark.parametrize('text, expected', [
+    ("2\n2\n\n1.0\n2.0\n\n3.0\n4.0\n\n", ('custom', None, 2)),
+    ("ACME,Sam,VF2,1104234,30,16,1\n1.0,2.0\n3.0,4.0\n", ('csv', ',', 1)),
+    ("1.0,2.0\n3.0,4.0\n", ('csv', ',', 0)),
+    ("1.0 2.0\n3.0 4.0\n", ('space', None, 0)),
+    ("X 0.0000 Y 0.0000 Z 0.0010\nX 1.0000 Y 0.0000 Z 0.0020\n", ('points', None, 0)),
+])
+def test_sniff_text_formats(tmp_path, text, expected):
+    path = tmp_path / 'scan.txt'
+    path.write_text(text)
+    detected = ProbeDataReader.sniff_format(str(path))
+    assert (detected.format, detected.delimiter, detected.header_rows) == expected
+
+
+def test_sniff_binary_archive(tmp_path):
+    path = tmp_path / 'scan.mpb'
+    ProbeDataReader.save_data(np.zeros((2, 3)), str(path), format='binary')
+    assert ProbeDataReader.sniff_format(str(path)).format == 'binary'
+
+
+@pytest.mark.parametrize('content', [b'', b'\x00\x01\x02binary', b'not,numbers\nat,all\n'])
+def test_sniff_rejects_unknown_files(tmp_path, content):
+    path = tmp_path / 'scan.txt'
+    path.write_bytes(content)
+    with pytest.raises(UnknownFormatError):
+        ProbeDataReader.sniff_format(str(path))
+
+
+def test_binary_archive_round_trip(tmp_path):
+    path = str(tmp_path / 'scan.mpb')
+    data = np.random.default_rng(3).normal(0, 0.001, (7, 9)).astype(np.float32)
+    ProbeDataReader.save_data(data, path, format='binary', spacing=(0.5, 0.25),
+                              metadata={'serial_number': 'VF2', 'scanned': '2026-03-12'})
+
+    mapped = ProbeDataReader.read_binary_format(path)
+    assert isinstance(mapped, np.memmap) and mapped.dtype == np.float32
+    np.testing.assert_array_equal(mapped, data)
+    np.testing.assert_array_equal(ProbeDataReader.read_binary_format(path, mmap=False), data)
+
+    mesh = ProbeDataReader.read_mesh(path)
+    assert mesh.metadata.serial_number == 'VF2'
+    assert mesh.metadata.scanned == '2026-03-12'
+    np.testing.assert_allclose(mesh.x_coords, np.arange(9) * 0.5)
+    np.testing.assert_allclose(mesh.y_coords, np.arange(7) * 0.25)
+
+
+@pytest.mark.parametrize('damage, message', [
+    (lambda raw: b'NOTAMESH' + raw[8:], 'Not a mesh archive'),
+    (lambda raw: raw[:8] + b'\x09' + raw[9:], 'Unsupported mesh archive version'),
+    (lambda raw: raw[:4], 'Truncated mesh archive header'),
+    (lambda raw: raw[:-8], 'body size mismatch'),
+])
+def test_binary_archive_rejects_bad_header(tmp_path, damage, message):
+    path = tmp_path / 'scan.mpb'
+    ProbeDataReader.save_data(np.zeros((3, 4)), str(path), format='binary')
+    path.write_bytes(damage(path.read_bytes()))
+    with pytest.raises(ProbeFormatError, match=message):
+        ProbeDataReader.read_binary_format(str(path))
+
+
+def test_read_many_parallel_matches_serial(tmp_path):
+    rng = np.random.default_rng(4)
+    for i in range(6):
+        ProbeDataReader.save_data(rng.normal(0, 0.001, (4, 5)), str(tmp_path / f'{i}.txt'))
+    (tmp_path / 'bad.txt').write_text("2\n2\n\n1\n")
+
+    serial = ProbeDataReader.read_many(str(tmp_path), workers=1)
+    parallel = ProbeDataReader.read_many(str(tmp_path), workers=3, chunksize=2)
+
+    assert parallel.paths == serial.paths and len(serial.paths) == 6
+    np.testing.assert_array_equal(parallel.stack, serial.stack)
+    assert parallel.status == serial.status
+    assert [s.path for s in serial.failed] == [str(tmp_path / 'bad.txt')]
+
+
+def test_read_many_with_metadata(tmp_path):
+    for i in range(3):
+        ProbeDataReader.save_data(np.full((2, 3), i / 1000), str(tmp_path / f'{i}.mpb'),
+                                  format='binary', metadata={'serial_number': f'm{i}'})
+    result = ProbeDataReader.read_many(str(tmp_path), workers=2, with_metadata=True, stack=False)
+    assert [m.metadata.serial_number for m in result.meshes] == ['m0', 'm1', 'm2']
+    assert result.stack is None
+
+
+@pytest.mark.parametrize('fmt', ['custom', 'csv', 'space'])
+def test_text_writers_round_trip(tmp_path, fmt):
+    path = str(tmp_path / f'scan.{fmt}')
+    data = np.random.default_rng(5).normal(0, 0.001, (600, 7))
+    ProbeDataReader.save_data(data, path, format=fmt)
+    assert ProbeDataReader.sniff_format(path).format == fmt
+    np.testing.assert_allclose(ProbeDataReader.read_file(path), data, atol=5e-7)
+
+
+def test_write_rows_formats_every_block():
+    out = io.StringIO()
+    data = np.arange(10.0).reshape(5, 2)
+    ProbeDataReader.write_rows(out, data, "%g %g\n", chunk_rows=2)
+    assert out.getvalue() == "0 1\n2 3\n4 5\n6 7\n8 9\n"
@@ -0,0 +1,84 @@
+"""Tests for per-point drift history."""
+
+import numpy as np
+import pytest
+
+from drift import DriftHistory
+from mesh_data import MeshData, ProbeMetadata
+
+DAY = 24 * 3600
+YEAR = 365.25 * DAY
+
+
+def _scan(data, serial='m1', x_dim=30.0, y_dim=16.0):
+    metadata = ProbeMetadata(serial_number=serial, x_dim=x_dim, y_dim=y_dim)
+    return MeshData.from_array(np.asarray(data, dtype=float), metadata)
+
+
+def _history(scans, times):
+    history = DriftHistory.from_mesh(scans[0], form_order=None)
+    for scan, when in zip(scans, times):
+        history.add(scan, when)
+    return history
+
+
+def test_trend_matches_polyfit():
+    rng = np.random.default_rng(0)
+    times = np.array([0.0, 40, 100, 250, 400]) * DAY
+    scans = [_scan(rng.normal(0, 0.001, (4, 5))) for _ in times]
+    slope, intercept = _history(scans, times).trend()
+
+    years = times / YEAR
+    heights = np.stack([scan.data for scan in scans])
+    expected = np.polyfit(years, heights.reshape(len(times), -1), 1)
+    np.testing.assert_allclose(slope.ravel(), expected[0])
+    np.testing.assert_allclose(intercept.ravel(), expected[1], atol=1e-12)
+
+
+def test_no_trend_over_less_than_a_day():
+    scans = [_scan(np.zeros((3, 3))), _scan(np.full((3, 3), 0.001))]
+    slope, _ = _history(scans, [0.0, 60.0]).trend()
+    assert np.isnan(slope).all()
+
+    slope, _ = _history(scans, [0.0, DAY]).trend()
+    np.testing.assert_allclose(slope, 0.001 * 365.25)
+
+
+def test_drift_is_latest_minus_earliest():
+    scans = [_scan(np.full((3, 3), z)) for z in (0.001, 0.003, 0.002)]
+    history = _history(scans, [10 * DAY, 0.0, 20 * DAY])
+    np.testing.assert_allclose(history.drift, 0.002 - 0.003)
+
+
+def test_save_and_load_round_trip(tmp_path):
+    scans = [_scan(np.full((3, 4), z)) for z in (0.0, 0.001)]
+    history = _history(scans, [0.0, 30 * DAY])
+    path = tmp_path / 'history.npz'
+    history.save(str(path))
+    loaded = DriftHistory.load(str(path))
+
+    assert loaded.serial_number == 'm1'
+    assert len(loaded) == 2
+    np.testing.assert_array_equal(loaded.trend()[0], history.trend()[0])
+    np.testing.assert_array_equal(loaded.x, history.x)
+
+
+def test_scan_of_another_machine_is_refused():
+    history = _history([_scan(np.zeros((3, 3)))], [0.0])
+    with pytest.raises(ValueError, match='m2'):
+        history.add(_scan(np.zeros((3, 3)), serial='m2'), DAY)
+
+
+def test_scan_without_serial_needs_force():
+    history = _history([_scan(np.zeros((3, 3)))], [0.0])
+    unknown = MeshData.from_array(np.zeros((3, 3)), ProbeMetadata(x_dim=30.0, y_dim=16.0))
+    with pytest.raises(ValueError, match='serial number unknown'):
+        history.add(unknown, DAY)
+    history.add(unknown, DAY, force=True)
+    assert len(history) == 2
+
+
+def test_scan_of_another_area_is_refused():
+    history = _history([_scan(np.zeros((3, 3)))], [0.0])
+    with pytest.raises(ValueError, match='covers X'):
+        history.add(_scan(np.zeros((3, 3)), x_dim=40.0), DAY)
@@ -0,0 +1,57 @@
+"""Tests for best-fit form removal."""
+
+import numpy as np
+import pytest
+
+from flatness import form_terms, remove_form, remove_form_batch
+
+
+def _lstsq_residual(data, x, y, order, mask=None):
+    yy, xx = np.meshgrid(y, x, indexing='ij')
+    known = np.ones(data.shape, dtype=bool) if mask is None else ~mask
+    design = np.column_stack([xx[known] ** px * yy[known] ** py for px, py in form_terms(order)])
+    coefficients = np.linalg.lstsq(design, data[known], rcond=None)[0]
+    residual = np.full(data.shape, np.nan)
+    residual[known] = data[known] - design @ coefficients
+    return residual
+
+
+@pytest.mark.parametrize('order', [1, 2, 3])
+def test_matches_lstsq(order):
+    rng = np.random.default_rng(order)
+    x, y = np.linspace(0, 30, 16), np.linspace(0, 16, 9)
+    data = rng.normal(0, 0.001, (9, 16)) + 0.0002 * x + 0.0005 * y[:, None]
+    result = remove_form(data, x, y, order)
+    expected = _lstsq_residual(data, x, y, order)
+    np.testing.assert_allclose(result.residual, expected, atol=1e-12)
+    assert result.rms == pytest.approx(np.sqrt(np.mean(expected ** 2)))
+    assert result.peak_valley == pytest.approx(np.ptp(expected))
+
+
+def test_missing_points_are_left_out():
+    rng = np.random.default_rng(4)
+    x, y = np.arange(10.0), np.arange(8.0)
+    data = rng.normal(0, 0.001, (8, 10))
+    mask = rng.random((8, 10)) < 0.2
+    data[mask] = 1e6      # would dominate the fit if used
+    result = remove_form(data, x, y, 1, mask)
+    np.testing.assert_allclose(result.residual, _lstsq_residual(data, x, y, 1, mask),
+                               atol=1e-12)
+
+
+def test_plane_is_removed_exactly():
+    x, y = np.linspace(0, 30, 7), np.linspace(0, 16, 5)
+    tilt = 0.001 + 0.0003 * x + 0.0002 * y[:, None]
+    result = remove_form(tilt, x, y, 1)
+    assert result.peak_valley == pytest.approx(0, abs=1e-15)
+
+
+def test_batch_matches_single_fits():
+    rng = np.random.default_rng(5)
+    x, y = np.arange(6.0), np.arange(5.0)
+    stack = rng.normal(0, 0.001, (4, 5, 6))
+    batch = remove_form_batch(stack, x, y, 2)
+    for mesh, residual, rms in zip(stack, batch.residual, batch.rms):
+        single = remove_form(mesh, x, y, 2)
+        np.testing.assert_allclose(residual, single.residual, atol=1e-15)
+        assert rms == pytest.approx(single.rms)
@@ -0,0 +1,77 @@
+"""Tests for the fleet flatness report."""
+
+import csv
+import os
+
+import numpy as np
+
+from data_reader import ProbeDataReader
+from flatness import remove_form
+from fleet_report import analyze_fleet, flatness_figures, load_fleet, rank_machines, write_report
+from mesh_data import MeshData, ProbeMetadata
+
+
+def _save(path, data, **metadata):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    ProbeDataReader.save_data(data, str(path), format='binary', metadata=metadata)
+    return str(path)
+
+
+def test_figures_match_per_mesh_results():
+    rng = np.random.default_rng(0)
+    meshes = [MeshData.from_array(rng.normal(0, 0.001, (6, 8))) for _ in range(5)]
+    meshes.append(MeshData.from_array(rng.normal(0, 0.001, (4, 5))))
+    figures = flatness_figures(meshes, batch=2)
+    for mesh, row in zip(meshes, figures):
+        fit = remove_form(mesh.data, mesh.x_coords, mesh.y_coords, 1)
+        expected = [np.ptp(mesh.data), np.std(mesh.data), fit.peak_valley, fit.rms]
+        np.testing.assert_allclose(row, expected)
+
+
+def test_report_orders_by_scan_date(tmp_path):
+    rng = np.random.default_rng(1)
+    flat, warped = rng.normal(0, 0.0001, (5, 6)), rng.normal(0, 0.002, (5, 6))
+    # File names and times run opposite to the recorded scan dates
+    _save(tmp_path / 'vf2' / 'a.mpb', flat, serial_number='VF2', scanned='2026-06-01')
+    _save(tmp_path / 'vf2' / 'b.mpb', warped, serial_number='VF2', scanned='2026-01-01')
+    _save(tmp_path / 'vf4' / 'a.mpb', warped, serial_number='VF4', scanned='2026-03-01')
+
+    loaded = load_fleet(str(tmp_path), workers=1)
+    results = analyze_fleet(loaded.meshes, loaded.paths, tolerance=0.001)
+    ranking = write_report(results, str(tmp_path / 'report'))
+
+    assert [s.serial_number for s in ranking] == ['VF4', 'VF2']
+    vf2 = ranking[1]
+    assert vf2.ordered_by == 'scan date'
+    assert vf2.last_scan.startswith('2026-06-01')
+    assert vf2.passed and vf2.change < 0
+    with open(tmp_path / 'report' / 'VF2.csv', newline='') as f:
+        rows = list(csv.DictReader(f))
+    assert [row['scanned'][:10] for row in rows] == ['2026-01-01', '2026-06-01']
+
+
+def test_undated_scans_fall_back_to_file_time(tmp_path):
+    data = np.zeros((3, 3))
+    older = _save(tmp_path / 'm' / 'b.mpb', data, serial_number='M')
+    newer = _save(tmp_path / 'm' / 'a.mpb', data, serial_number='M')
+    os.utime(older, (1e9, 1e9))
+    os.utime(newer, (2e9, 2e9))
+
+    loaded = load_fleet(str(tmp_path), workers=1)
+    [summary] = rank_machines(analyze_fleet(loaded.meshes, loaded.paths))
+    assert summary.ordered_by == 'file time'
+    assert summary.last_scan.startswith('2033')
+
+
+def test_unknown_flatness_ranks_last(tmp_path):
+    rng = np.random.default_rng(2)
+    meshes = [MeshData.from_array(rng.normal(0, s, (4, 4)), ProbeMetadata(serial_number=n))
+              for n, s in (('A', 0.001), ('B', 0.003), ('C', 0.002))]
+    meshes[0].mask = np.ones((4, 4), dtype=bool)
+    paths = [str(tmp_path / name) for name in 'abc']
+    for path in paths:
+        open(path, 'w').close()
+    ranking = rank_machines(analyze_fleet(meshes, paths))
+    assert [s.serial_number for s in ranking] == ['B', 'C', 'A']
+    assert np.isnan(ranking[-1].flatness_pv)
+
@@ -0,0 +1,44 @@
+"""Tests for separable tensor-grid evaluation."""
+
+import numpy as np
+import pytest
+from scipy.interpolate import RegularGridInterpolator
+
+from grid_eval import evaluate_grid, evaluate_tiled
+
+
+def _reference(x, y, values, xt, yt, method):
+    interp = RegularGridInterpolator((y, x), values, method=method, bounds_error=False)
+    yy, xx = np.meshgrid(yt, xt, indexing='ij')
+    return interp(np.stack([yy, xx], axis=-1))
+
+
+@pytest.mark.parametrize('method', ['nearest', 'linear'])
+def test_matches_regular_grid_interpolator(method):
+    rng = np.random.default_rng(0)
+    x = np.cumsum(rng.uniform(0.5, 1.5, 12))
+    y = np.cumsum(rng.uniform(0.5, 1.5, 9))
+    values = rng.normal(0, 0.001, (9, 12))
+    # Past both ends, on grid points, and midway between them
+    xt = np.concatenate([np.linspace(x[0] - 1, x[-1] + 1, 57), x, (x[:-1] + x[1:]) / 2])
+    yt = np.concatenate([np.linspace(y[0] - 1, y[-1] + 1, 41), y])
+    np.testing.assert_allclose(evaluate_grid(x, y, values, xt, yt, method),
+                               _reference(x, y, values, xt, yt, method), atol=1e-15)
+
+
+def test_float32_stays_float32():
+    values = np.ones((3, 4), dtype=np.float32)
+    result = evaluate_grid(np.arange(4.0), np.arange(3.0), values, [0.5, 1.5], [0.5])
+    assert result.dtype == np.float32
+
+
+def test_tiled_matches_whole_grid():
+    rng = np.random.default_rng(1)
+    x, y = np.arange(20.0), np.arange(15.0)
+    values = rng.normal(0, 0.001, (15, 20))
+    xt, yt = np.linspace(0, 19, 103), np.linspace(0, 14, 77)
+
+    def evaluate(a, b):
+        return evaluate_grid(x, y, values, a, b)
+    np.testing.assert_array_equal(evaluate_tiled(evaluate, xt, yt, tile=(16, 32)),
+                                  evaluate(xt, yt))
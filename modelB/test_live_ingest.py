@@ -0,0 +1,64 @@
+"""Tests for the incremental DPRNT stream parser and file following."""
+
+import time
+
+import numpy as np
+import pytest
+
+from data_reader import ProbeFormatError
+from live_ingest import DprntStreamParser, LiveIngest
+from mesh_data import ProbeMetadata
+
+
+def test_crlf_split_across_chunks():
+    parser = DprntStreamParser()
+    parser.feed("2\r\n2\r\n\r\n1.0\r\n2.0\r")
+    parser.feed("\n\r\n3.0\r\n4.0\r\n\r\n")
+    assert parser.complete
+    assert parser.line_no == 9
+    np.testing.assert_array_equal(parser.mesh.data, [[1.0, 2.0], [3.0, 4.0]])
+
+
+def test_error_line_after_split_crlf():
+    parser = DprntStreamParser()
+    parser.feed("2\r\n2\r\n\r\n1.0\r\n2.0\r")
+    with pytest.raises(ProbeFormatError) as error:
+        parser.feed("\n\r\nbad\r\n")
+    assert error.value.line == 7
+
+
+def test_lone_carriage_returns():
+    parser = DprntStreamParser()
+    parser.feed("1\r2\r\r5.0\r")
+    parser.feed("6.0\r")
+    parser.finish()
+    assert parser.complete
+    np.testing.assert_array_equal(parser.mesh.data, [[5.0, 6.0]])
+
+
+def _wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+def test_truncated_file_keeps_metadata(tmp_path):
+    path = tmp_path / 'scan.txt'
+    path.write_text("2\n2\n\n1.0\n2.0\n\n3.0\n")
+    metadata = ProbeMetadata(x_dim=30.0, y_dim=16.0)
+    ingest = LiveIngest(str(path), follow=True, poll_interval=0.01,
+                        metadata=metadata).start()
+    _wait_for(lambda: ingest.parser.filled == 3)
+
+    # The controller starts a new scan over the file
+    path.write_text("2\n2\n")
+    _wait_for(lambda: ingest.parser.filled == 0)
+    with open(path, 'a') as f:
+        f.write("\n5.0\n6.0\n\n7.0\n8.0\n\n")
+    _wait_for(lambda: ingest.finished)
+
+    assert ingest.error is None
+    assert ingest.parser.mesh.metadata == metadata
+    np.testing.assert_array_equal(ingest.parser.mesh.x_coords, [0.0, 30.0])
+    np.testing.assert_array_equal(ingest.parser.mesh.data, [[5.0, 6.0], [7.0, 8.0]])
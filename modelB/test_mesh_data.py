@@ -0,0 +1,69 @@
+"""Tests for the mesh container and its running statistics."""
+
+import numpy as np
+import pytest
+
+from mesh_data import MeshData, RunningStats
+
+
+def test_merged_chunks_match_numpy():
+    values = np.random.default_rng(0).normal(5, 0.001, 10007)
+    parts = []
+    for chunk in np.array_split(values, 7):
+        stats = RunningStats()
+        stats.update(chunk[:len(chunk) // 3])
+        stats.update(chunk[len(chunk) // 3:])
+        parts.append(stats)
+    total = RunningStats()
+    for part in parts:
+        total.merge(part)
+
+    assert total.count == values.size
+    assert total.mean == pytest.approx(values.mean(), rel=1e-15)
+    assert total.variance == pytest.approx(np.var(values), rel=1e-9)
+    assert (total.min, total.max) == (values.min(), values.max())
+
+
+def test_merge_with_empty_statistics():
+    stats = RunningStats()
+    stats.update([1.0, 2.0, 4.0])
+    assert RunningStats().merge(stats) == stats
+    assert stats.merge(RunningStats()) == stats
+    assert np.isnan(RunningStats().as_dict()['std'])
+
+
+def test_dict_round_trip_stays_mergeable():
+    a, b = np.arange(10.0), np.arange(5.0, 30.0)
+    stats = RunningStats()
+    stats.update(a)
+    rebuilt = RunningStats.from_dict(stats.as_dict(), a.size)
+    other = RunningStats()
+    other.update(b)
+    assert rebuilt.merge(other).std == pytest.approx(np.std(np.concatenate([a, b])))
+
+
+def test_statistics_leave_out_masked_points():
+    rng = np.random.default_rng(1)
+    mesh = MeshData.from_array(rng.normal(0, 0.001, (200, 150)))
+    mesh.mask = rng.random(mesh.shape) < 0.1
+    mesh.data[mesh.mask] = 1.0
+    known = mesh.data[~mesh.mask]
+    stats = mesh.statistics
+    assert stats['mean'] == pytest.approx(known.mean())
+    assert stats['std'] == pytest.approx(known.std())
+    assert stats['range'] == pytest.approx(np.ptp(known))
+
+
+def test_statistics_follow_touch():
+    mesh = MeshData.from_array(np.zeros((3, 3)))
+    assert mesh.statistics['max'] == 0
+    mesh.data[1, 1] = 0.002
+    assert mesh.statistics['max'] == 0     # cached until the change is announced
+    mesh.touch()
+    assert mesh.statistics['max'] == 0.002
+
+
+def test_running_stats_returns_a_copy():
+    mesh = MeshData.from_array(np.ones((2, 2)))
+    mesh.running_stats().update([100.0])
+    assert mesh.statistics['max'] == 1
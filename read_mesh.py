@@ -1,13 +1,22 @@
 import csv
+import sys
 import tkinter as tk
+from pathlib import Path
 import numpy as np
 import matplotlib.pyplot as plt
 from tkinter import filedialog
 from matplotlib import cm
 from mpl_toolkits.mplot3d import Axes3D
-from scipy.interpolate import RegularGridInterpolator
 from matplotlib.widgets import Slider, Button, CheckButtons, Cursor
 
+sys.path.insert(0, str(Path(__file__).resolve().parent / "modelB"))
+from grid_eval import evaluate_grid
+from surface_lod import (
+    INTERACTIVE_MAX_FACETS,
+    SurfacePyramid,
+    facet_budget,
+)
+
 
 def openfile():
     root = tk.Tk()
@@ -25,6 +34,34 @@ def update_scale_value(val):
     plt.draw()
 
 
+def draw_level(axes, max_facets):
+    # redraw a panel from the pyramid level that fits max_facets
+    pyramid, style = panels[axes]
+    level = pyramid.pick_level(max_facets)
+    if shown.get(axes, (None, None))[0] == level:
+        return
+    if axes in shown:
+        shown[axes][1].remove()
+    xt, yt, z = pyramid.level(level)
+    surf = axes.plot_surface(
+        xt[None, :], yt[:, None], z, rcount=len(yt), ccount=len(xt), **style
+    )
+    shown[axes] = (level, surf)
+
+
+def on_press(event):
+    # coarse surfaces while a panel is rotated or zoomed
+    if event.inaxes in panels:
+        draw_level(event.inaxes, INTERACTIVE_MAX_FACETS)
+        fig.canvas.draw_idle()
+
+
+def on_settle(event):
+    for n in panels:
+        draw_level(n, facet_budget(n))
+    fig.canvas.draw_idle()
+
+
 data = np.genfromtxt(openfile(), delimiter=",", skip_header=1)
 print("raw data:")
 print(data)
@@ -34,32 +71,33 @@ x, y = np.linspace(0, data.shape[1], data.shape[1]), np.linspace(
     0, data.shape[0], data.shape[0]
 )
 
-xg, yg = np.meshgrid(x, y, indexing="xy")
+scale_value = 2
 
-interp = RegularGridInterpolator(
-    (x, y),
-    data.T,
-    method="linear",
-    bounds_error=False,
+# only the levels actually displayed get evaluated, never the full x100 grid
+interp_pyramid = SurfacePyramid(
+    lambda xt, yt: evaluate_grid(x, y, data, xt, yt, method="linear"),
+    (x[0], x[-1]),
+    (y[0], y[-1]),
+    (data.shape[0] * 100, data.shape[1] * 100),
 )
-
-scale_value = 2
-xx, yy = np.meshgrid(
-    np.linspace(0, data.shape[1], int((data.shape[1] * 100))),
-    np.linspace(0, data.shape[0], int((data.shape[0] * 100))),
-    indexing="xy",
+# level 0 lands on the probe points, so it is the raw data itself
+raw_pyramid = SurfacePyramid(
+    lambda xt, yt: evaluate_grid(x, y, data, xt, yt, method="linear"),
+    (x[0], x[-1]),
+    (y[0], y[-1]),
+    data.shape,
 )
+norm = dict(cmap=cm.coolwarm, vmin=np.amin(data), vmax=np.amax(data))
+shown = {}
 
 fig = plt.figure(figsize=(20, 10))
 ax = fig.add_subplot(121, projection="3d")
-ax.plot_surface(xx, yy, interp((xx, yy)), cmap=cm.coolwarm)
 ax.set_xlabel("x")
 ax.set_ylabel("y")
 ax.set_zlabel("z")
 ax.set_box_aspect([data.shape[1], data.shape[0], scale_value])
 
 ax2 = fig.add_subplot(122, projection="3d")
-ax2.plot_surface(xg, yg, data, cmap=cm.coolwarm, linewidth=2, antialiased=True)
 ax2.set_xlabel("x")
 ax2.set_ylabel("y")
 ax2.set_zlabel("z")
@@ -70,6 +108,16 @@ for n in [ax, ax2]:
     n.set_ylim(0, data.shape[0])
     n.set_zlim(0, np.amax(data, axis=None))
 
+panels = {
+    ax: (interp_pyramid, norm),
+    ax2: (raw_pyramid, dict(norm, linewidth=2, antialiased=True)),
+}
+for n in panels:
+    draw_level(n, facet_budget(n))
+fig.canvas.mpl_connect("button_press_event", on_press)
+fig.canvas.mpl_connect("button_release_event", on_settle)
+fig.canvas.mpl_connect("resize_event", on_settle)
+
 # Create slider
 slider_ax = plt.axes([0.1, 0.05, 0.8, 0.03])
 c_slider = Slider(slider_ax, "Z axis exaggeration", 2, 12, valinit=2)
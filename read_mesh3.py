@@ -1,5 +1,7 @@
 import csv
+import sys
 import tkinter as tk
+from pathlib import Path
 import numpy as np
 import matplotlib.pyplot as plt
 from tkinter import filedialog
@@ -15,6 +17,10 @@ from matplotlib.widgets import (
     RadioButtons,
 )
 
+sys.path.insert(0, str(Path(__file__).resolve().parent / "modelB"))
+from mesh_cache import MeshCache
+from spline_surface import SPLINE_DEGREES, SplineSurface
+
 
 def openfile():
     root = tk.Tk()
@@ -40,15 +46,24 @@ def update_visibility(label):
     plt.draw()
 
 
-def interp_method(label):
-    global interp_method_, interp
-    interp_method_ = label
-    interp = RegularGridInterpolator(
+def make_interp(method):
+    if method in SPLINE_DEGREES:
+        # coefficients are fitted once; xx, yy are meshgrids so row 0 and
+        # column 0 hold the target axes
+        spline = SplineSurface(x, y, data, method)
+        return lambda pts: spline.evaluate_grid(pts[0][0], pts[1][:, 0])
+    return RegularGridInterpolator(
         (x, y),
         data.T,
-        method=interp_method_,
+        method=method,
         bounds_error=False,
     )
+
+
+def interp_method(label):
+    global interp_method_, interp
+    interp_method_ = label
+    interp = make_interp(interp_method_)
     ax.cla()
     ax.plot_surface(xx, yy, interp((xx, yy)), cmap=cm.plasma)
     ax.set_xlabel("x")
@@ -79,11 +94,8 @@ def update_mult_value(val):
 print("raw data:")
 print(data)"""
 file_path = openfile()
-with open(file_path, "r") as file:
-    num_rows = int(file.readline().strip())
-    num_cols = int(file.readline().strip())
-data = np.genfromtxt(file_path, skip_header=2)
-data = data.reshape(num_rows, num_cols)
+# Reopening an unchanged scan loads the parsed array from the mesh cache
+data = MeshCache().load(file_path).mesh.data
 print(data)
 
 # generate grid upon which z values are mapped
@@ -95,12 +107,7 @@ xg, yg = np.meshgrid(x, y, indexing="xy")
 
 interp_method_ = "nearest"
 
-interp = RegularGridInterpolator(
-    (x, y),
-    data.T,
-    method=interp_method_,
-    bounds_error=False,
-)
+interp = make_interp(interp_method_)
 
 global scale_value
 scale_value = 2